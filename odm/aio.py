@@ -0,0 +1,180 @@
+""" Module provides asyncio streaming of NDJSON documents, that keeps the event loop responsive.
+Lines are read from the `asyncio.StreamReader` in batches, and every CPU-bound stage - decoding, validation,
+the optional transform and encoding - runs on the executor rather than on the event loop. Stages are connected
+by bounded queues: once `concurrency` batches are in flight, reading stops until the consumer catches up,
+so that the memory stays bounded and the backpressure reaches the sender of the stream.
+Pipeline decode -> validate -> transform -> encode is composed as:
+
+    documents = aio.aiter_ndjson(Document, reader, transform=enrich, executor=pool)
+    await aio.write_ndjson(documents, writer, executor=pool)
+
+Thread pools keep the loop responsive; process pools also run the stages on multiple cores,
+in which case the Document class and the transform must be importable by the worker processes. """
+
+__author__ = 'Bohdan Mushkevych'
+
+import asyncio
+import collections
+import json
+
+from odm.errors import BatchError
+from odm.ndjson import DEFAULT_BATCH_SIZE, DEFAULT_BUFFER_SIZE, _decode_batch, _encode_batch
+
+DEFAULT_CONCURRENCY = 4
+
+# end of stream marker in the queue between the reading and the decoding stages
+_DONE = object()
+
+
+def _decode_lines(document_klass, lines, first_line, transform):
+    """ Executor stage: decodes and validates the batch of NDJSON lines, and applies the transform
+    :return: tuple (list of results, list of (line number, exception) of the failed lines) """
+    batch, line_numbers, errors = list(), list(), list()
+    for line_number, line in enumerate(lines, first_line):
+        if not line or line.isspace():
+            continue
+        try:
+            batch.append(line.decode('utf-8'))
+            line_numbers.append(line_number)
+        except UnicodeDecodeError as e:
+            errors.append((line_number, e))
+
+    results = _decode_batch(document_klass, batch, line_numbers, json.JSONDecoder().decode, errors)
+    errors.sort(key=lambda entry: entry[0])
+    if transform is not None:
+        results = [transform(document) for document in results]
+    return results, errors
+
+
+def _encode_documents(documents):
+    """ Executor stage: :return: UTF-8 encoded NDJSON lines of the batch of documents """
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+    return ''.join(_encode_batch(documents, encode)).encode('utf-8')
+
+
+async def _read_batches(reader, batch_size, chunk_size):
+    """ Async generator reads the stream in chunks, and yields tuples (first line number, list of bytes lines) """
+    lines, remainder, first_line = list(), b'', 0
+    while True:
+        chunk = await reader.read(chunk_size)
+        if not chunk:
+            break
+        chunk_lines = (remainder + chunk).split(b'\n')
+        remainder = chunk_lines.pop()
+        lines.extend(chunk_lines)
+        while len(lines) >= batch_size:
+            yield first_line, lines[:batch_size]
+            del lines[:batch_size]
+            first_line += batch_size
+
+    if remainder:
+        lines.append(remainder)
+    if lines:
+        yield first_line, lines
+
+
+async def aiter_ndjson(document_klass, reader, batch_size=DEFAULT_BATCH_SIZE, concurrency=DEFAULT_CONCURRENCY,
+                       executor=None, transform=None, errors=None, chunk_size=DEFAULT_BUFFER_SIZE):
+    """ Async generator reads NDJSON from the stream, and yields the documents, or the results of the `transform`,
+    one by one in the order of the lines. Decoding, validation and the transform run on the executor
+    :param document_klass: BaseDocument-derived class of the documents
+    :param reader: asyncio.StreamReader, or any object with the `read(n)` coroutine returning bytes
+    :param batch_size: number of lines decoded by a single executor call
+    :param concurrency: number of batches in flight; reading is suspended while all of them are pending
+    :param executor: (optional) concurrent.futures.Executor; defaults to the event loop's default executor
+    :param transform: (optional) function(document) -> value, applied to every document on the executor
+    :param chunk_size: number of bytes read from the stream at once
+    :param errors: (optional) list to which (line number, exception) tuples of the failed lines are appended.
+        Line numbers are 0-based. Failed lines are skipped and do not interrupt the stream
+    :raise BatchError once the batch that contains failed lines is reached, if `errors` is not given """
+    loop = asyncio.get_running_loop()
+
+    # futures of the batches in flight, in the order of the lines
+    queue = asyncio.Queue(maxsize=concurrency)
+
+    async def produce():
+        try:
+            async for first_line, lines in _read_batches(reader, batch_size, chunk_size):
+                await queue.put(loop.run_in_executor(executor, _decode_lines, document_klass, lines, first_line,
+                                                     transform))
+        except Exception as e:
+            # failure of the stream is raised by the consumer, once the preceding batches are yielded
+            failed = loop.create_future()
+            failed.set_exception(e)
+            await queue.put(failed)
+        else:
+            await queue.put(_DONE)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            future = await queue.get()
+            if future is _DONE:
+                break
+            results, batch_errors = await future
+            if batch_errors:
+                if errors is None:
+                    raise BatchError(batch_errors, results)
+                errors.extend(batch_errors)
+            for result in results:
+                yield result
+    finally:
+        producer.cancel()
+
+
+async def write_ndjson(documents, writer, batch_size=DEFAULT_BATCH_SIZE, concurrency=DEFAULT_CONCURRENCY,
+                       executor=None):
+    """ Writes documents as NDJSON: one compact JSON object per line. Encoding runs on the executor
+    :param documents: iterable or async iterable of documents
+    :param writer: asyncio.StreamWriter, or any object with the `write(bytes)` method;
+        its `drain()` coroutine, if present, is awaited after every write
+    :param batch_size: number of documents encoded by a single executor call
+    :param concurrency: number of batches in flight; reading of the documents is suspended while all of them
+        are pending
+    :param executor: (optional) concurrent.futures.Executor; defaults to the event loop's default executor
+    :return: number of written documents """
+    loop = asyncio.get_running_loop()
+    drain = getattr(writer, 'drain', None)
+
+    # futures of the batches in flight, in the order of the documents
+    pending = collections.deque()
+    count = 0
+
+    async def write_oldest():
+        writer.write(await pending.popleft())
+        if drain is not None:
+            await drain()
+
+    async def submit(batch):
+        if len(pending) >= concurrency:
+            await write_oldest()
+        pending.append(loop.run_in_executor(executor, _encode_documents, batch))
+
+    batch = list()
+    try:
+        if hasattr(documents, '__aiter__'):
+            async for document in documents:
+                batch.append(document)
+                if len(batch) >= batch_size:
+                    await submit(batch)
+                    count += len(batch)
+                    batch = list()
+        else:
+            for document in documents:
+                batch.append(document)
+                if len(batch) >= batch_size:
+                    await submit(batch)
+                    count += len(batch)
+                    batch = list()
+                    # documents of the synchronous iterable are produced on the loop: let other tasks run
+                    await asyncio.sleep(0)
+
+        if batch:
+            await submit(batch)
+            count += len(batch)
+        while pending:
+            await write_oldest()
+    finally:
+        for future in pending:
+            future.cancel()
+    return count
@@ -0,0 +1,312 @@
+""" Module provides compact binary serialization of documents, driven by the DocumentSchema.
+Layout of the serialized document:
+- header: 8-byte fingerprint of the schema; documents are decoded only by the schema with the same fingerprint
+- presence bitmap: one bit per field in the declaration order; set if the field value is serialized
+- boolean bitmap: one bit per BooleanField, holding its value
+- values of the present fields, except for the booleans, in the declaration order:
+  - IntegerField: zigzag varint
+  - DecimalField: zigzag varint of the value scaled by 10**precision; NaN and Infinity can not be encoded
+  - DateTimeField: 8-byte signed integer of microseconds since the epoch. As with the JSON conversion,
+    the timezone of aware datetimes is dropped and dates are converted into datetimes at midnight
+  - StringField, ObjectIdField: varint length followed by the UTF-8 bytes
+  - NestedDocumentField: presence bitmap, boolean bitmap and values of the nested document, without the header
+  - all other fields: varint length followed by the UTF-8 bytes of the JSON value
+Bitmaps are little-endian, and are as long as required to hold the bits of the given schema.
+The generated encoders and decoders are cached in the DocumentSchema, the same way as the odm.codegen functions """
+
+__author__ = 'Bohdan Mushkevych'
+
+import datetime
+import decimal
+import hashlib
+import json
+
+from odm import fields
+from odm.codegen import STANDARD_FIELDS, _compile, _indent, _is_virtual_default
+
+FINGERPRINT_SIZE = 8
+
+EPOCH = datetime.datetime(1970, 1, 1)
+MICROSECOND = datetime.timedelta(microseconds=1)
+
+# {field class: codec name}; fields of all other classes are serialized as JSON
+CODECS = {
+    fields.IntegerField: 'integer',
+    fields.DecimalField: 'decimal',
+    fields.DateTimeField: 'datetime',
+    fields.BooleanField: 'boolean',
+    fields.StringField: 'string',
+    fields.ObjectIdField: 'string',
+    fields.NestedDocumentField: 'nested',
+}
+
+
+def write_varint(buffer, value):
+    """ appends non-negative integer to the bytearray as a LEB128 varint """
+    while value >= 0x80:
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, position):
+    """ :return: tuple (non-negative integer, position after the varint) """
+    result = data[position] & 0x7f
+    shift = 7
+    while data[position] >= 0x80:
+        position += 1
+        result |= (data[position] & 0x7f) << shift
+        shift += 7
+    return result, position + 1
+
+
+def datetime_to_micros(value):
+    """ :return: number of microseconds since the epoch """
+    if value.__class__ is not datetime.datetime:
+        if isinstance(value, datetime.datetime):
+            value = value.replace(tzinfo=None)
+        else:
+            value = datetime.datetime(value.year, value.month, value.day)
+    elif value.tzinfo is not None:
+        value = value.replace(tzinfo=None)
+    return (value - EPOCH) // MICROSECOND
+
+
+def _codec(field_obj):
+    field_type = type(field_obj)
+    if field_type not in STANDARD_FIELDS:
+        return 'json'
+    return CODECS.get(field_type, 'json')
+
+
+def _describe(schema):
+    """ :return: string description of the schema; its hash is the schema fingerprint """
+    items = list()
+    for field_obj in schema.ordered_fields:
+        codec = _codec(field_obj)
+        if codec == 'decimal':
+            codec = f'decimal({field_obj.precision})'
+        elif codec == 'nested':
+            codec = f'nested({_describe(field_obj.nested_klass._schema)})'
+        items.append(f'{field_obj.name}:{codec}')
+    return ','.join(items)
+
+
+def compute_fingerprint(schema):
+    """ :return: 8 bytes identifying names, order and binary encoding of the schema's fields """
+    return hashlib.blake2b(_describe(schema).encode('utf-8'), digest_size=FINGERPRINT_SIZE).digest()
+
+
+def _has_constraints(field_obj):
+    """ :return: True if the values decoded by the field's codec may be invalid for the field, i.e. the field has
+        constraints beyond the value type. Decoded values are always of the type expected by the field """
+    if field_obj.choices:
+        return True
+    return any(getattr(field_obj, attribute, None) is not None
+               for attribute in ('min_value', 'max_value', 'min_length', 'max_length', 'regex'))
+
+
+def _bitmap_sizes(schema):
+    boolean_count = sum(1 for field_obj in schema.ordered_fields if _codec(field_obj) == 'boolean')
+    return (len(schema.ordered_fields) + 7) // 8, (boolean_count + 7) // 8
+
+
+def _write_zigzag(variable, level):
+    """ :return: lines appending the signed integer `variable` to the `buffer` as a zigzag varint """
+    return _indent([f'z = {variable} << 1 if {variable} >= 0 else ((-{variable}) << 1) - 1',
+                    f'if z < 0x80:',
+                    f'    buffer.append(z)',
+                    f'else:',
+                    f'    write_varint(buffer, z)'], level)
+
+
+def _read_zigzag(variable, level):
+    """ :return: lines reading the zigzag varint from the `data` into the signed integer `variable` """
+    return _indent([f'z = data[position]',
+                    f'if z < 0x80:',
+                    f'    position += 1',
+                    f'else:',
+                    f'    z, position = read_varint(data, position)',
+                    f'{variable} = (z >> 1) ^ -(z & 1)'], level)
+
+
+def _read_length(level):
+    return _indent([f'length = data[position]',
+                    f'if length < 0x80:',
+                    f'    position += 1',
+                    f'else:',
+                    f'    length, position = read_varint(data, position)',
+                    f'end = position + length'], level)
+
+
+def _scaler(field_obj):
+    """ :return: function(value) -> integer equal to the DecimalField value multiplied by 10**precision
+    :raise ValueError if the value can not be represented by the scaled integer, i.e. NaN or Infinity """
+    to_scaled, name = field_obj._to_scaled, field_obj.name
+
+    def scale(value):
+        try:
+            scaled = to_scaled(value)
+        except (ValueError, ArithmeticError):
+            scaled = None
+        if scaled.__class__ is not int:
+            raise ValueError(f'DecimalField {name} value {value} can not be encoded by the binary codec')
+        return scaled
+
+    return scale
+
+
+def compile_encoder(schema):
+    """ :return: function(document, buffer) appending the document's bitmaps and values to the bytearray """
+    presence_size, boolean_size = _bitmap_sizes(schema)
+    namespace = {'klass': schema.document_klass, 'write_varint': write_varint, 'dumps': json.dumps,
+                 'datetime_to_micros': datetime_to_micros, 'datetime': datetime.datetime, 'Decimal': decimal.Decimal,
+                 'EPOCH': EPOCH, 'MICROSECOND': MICROSECOND}
+    lines = ['def encode(document, buffer):',
+             '    data = document._data',
+             '    start = len(buffer)',
+             f'    buffer += bytes({presence_size + boolean_size})',
+             '    presence = 0',
+             '    booleans = 0']
+
+    boolean_index = 0
+    for i, field_obj in enumerate(schema.ordered_fields):
+        codec = _codec(field_obj)
+        name = repr(field_obj.name)
+        namespace[f'get_{i}'] = field_obj.__get__
+
+        lines.append(f'    value = data.get({name})')
+        if not field_obj.null and not _is_virtual_default(field_obj):
+            # None values of the non-nullable fields are replaced with the field's default
+            lines.append(f'    if value is None:')
+            lines.append(f'        get_{i}(document, klass)')
+            lines.append(f'        value = data.get({name})')
+
+        if codec == 'json':
+            namespace[f'conv_{i}'] = field_obj.to_json
+            lines.append(f'    if value is not None:')
+            lines.append(f'        value = conv_{i}(value)')
+
+        lines.append(f'    if value is not None:')
+        lines.append(f'        presence |= {1 << i}')
+        if codec == 'integer':
+            lines.append(f'        if value.__class__ is not int:')
+            lines.append(f'            value = int(value)')
+            lines += _write_zigzag('value', 2)
+        elif codec == 'decimal':
+            namespace[f'scale_{i}'] = _scaler(field_obj)
+            if field_obj.fixed_point:
+                lines.append(f'        if value.__class__ is not int:')
+                lines.append(f'            value = scale_{i}(value)')
+            else:
+                lines.append(f'        if value.__class__ is Decimal and value.is_finite():')
+                lines.append(f'            scaled = value.scaleb({field_obj.precision})')
+                lines.append(f'            value = int(scaled)')
+                lines.append(f'            if value != scaled:')
+                lines.append(f'                # value has more decimal places than the precision: round it')
+                lines.append(f'                value = scale_{i}(scaled.scaleb({-field_obj.precision}))')
+                lines.append(f'        else:')
+                lines.append(f'            value = scale_{i}(value)')
+            lines += _write_zigzag('value', 2)
+        elif codec == 'datetime':
+            lines.append(f'        if value.__class__ is datetime and value.tzinfo is None:')
+            lines.append(f'            value = (value - EPOCH) // MICROSECOND')
+            lines.append(f'        else:')
+            lines.append(f'            value = datetime_to_micros(value)')
+            lines.append(f'        buffer += value.to_bytes(8, "little", signed=True)')
+        elif codec == 'boolean':
+            lines.append(f'        if value:')
+            lines.append(f'            booleans |= {1 << boolean_index}')
+            boolean_index += 1
+        elif codec == 'nested':
+            namespace[f'encode_{i}'] = field_obj.nested_klass._schema.to_bytes
+            lines.append(f'        encode_{i}(value, buffer)')
+        else:
+            if codec == 'json':
+                lines.append(f'        value = dumps(value, separators=(",", ":"))')
+            lines.append(f'        encoded = value.encode("utf-8") if value.__class__ is not bytes else value')
+            lines.append(f'        write_varint(buffer, len(encoded))')
+            lines.append(f'        buffer += encoded')
+
+    lines.append(f'    buffer[start:start + {presence_size}] = presence.to_bytes({presence_size}, "little")')
+    if boolean_size:
+        lines.append(f'    buffer[start + {presence_size}:start + {presence_size + boolean_size}] = '
+                     f'booleans.to_bytes({boolean_size}, "little")')
+    return _compile('\n'.join(lines) + '\n', namespace, 'encode')
+
+
+def compile_decoder(schema):
+    """ :return: function(cls, data, position, validate) -> (document, position after the document),
+        decoding the document's bitmaps and values from the bytes-like `data` """
+    presence_size, boolean_size = _bitmap_sizes(schema)
+    namespace = {'read_varint': read_varint, 'loads': json.loads, 'Decimal': decimal.Decimal,
+                 'EPOCH': EPOCH, 'MICROSECOND': MICROSECOND}
+    lines = ['def decode(cls, data, position, validate):',
+             '    instance = cls()',
+             '    store = instance._data',
+             f'    presence = int.from_bytes(data[position:position + {presence_size}], "little")',
+             f'    booleans = int.from_bytes(data[position + {presence_size}:'
+             f'position + {presence_size + boolean_size}], "little")',
+             f'    position += {presence_size + boolean_size}']
+
+    boolean_index = 0
+    for i, field_obj in enumerate(schema.ordered_fields):
+        codec = _codec(field_obj)
+        name = repr(field_obj.name)
+        namespace[f'validate_{i}'] = field_obj.validate
+
+        lines.append(f'    if presence & {1 << i}:')
+        if codec == 'integer':
+            lines += _read_zigzag('value', 2)
+        elif codec == 'decimal':
+            lines += _read_zigzag('value', 2)
+            if not field_obj.fixed_point:
+                lines.append(f'        value = Decimal(value).scaleb({-field_obj.precision})')
+        elif codec == 'datetime':
+            lines.append(f'        value = EPOCH + int.from_bytes(data[position:position + 8], "little", signed=True) '
+                         f'* MICROSECOND')
+            lines.append(f'        position += 8')
+        elif codec == 'boolean':
+            lines.append(f'        value = booleans & {1 << boolean_index} != 0')
+            boolean_index += 1
+        elif codec == 'nested':
+            namespace[f'nested_{i}'] = field_obj.nested_klass
+            namespace[f'decode_{i}'] = field_obj.nested_klass._schema.from_bytes
+            lines.append(f'        value, position = decode_{i}(nested_{i}, data, position, validate)')
+        else:
+            lines += _read_length(2)
+            lines.append(f'        value = str(data[position:end], "utf-8")')
+            lines.append(f'        position = end')
+
+        if codec == 'json':
+            # custom fields, lists and dicts are converted once, and validated as any other value of unknown type
+            namespace[f'conv_{i}'] = field_obj.from_json
+            lines.append(f'        value = conv_{i}(loads(value))')
+        if codec == 'json' or _has_constraints(field_obj):
+            lines.append(f'        if validate:')
+            lines.append(f'            validate_{i}(value)')
+        lines.append(f'        store[{name}] = value')
+
+    lines.append('    return instance, position')
+    return _compile('\n'.join(lines) + '\n', namespace, 'decode')
+
+
+def to_bytes(document):
+    """ :return: bytes of the document, starting with the schema fingerprint """
+    schema = document._schema
+    buffer = bytearray(schema.fingerprint)
+    schema.to_bytes(document, buffer)
+    return bytes(buffer)
+
+
+def from_bytes(document_klass, data, validate=True):
+    """ :return: document decoded from the bytes-like `data`
+    :raise ValueError if the data was serialized by a different schema, or has trailing bytes """
+    schema = document_klass._schema
+    if bytes(data[:FINGERPRINT_SIZE]) != schema.fingerprint:
+        raise ValueError(f'Binary data does not match the schema of {document_klass.__name__}')
+
+    instance, position = schema.from_bytes(document_klass, data, FINGERPRINT_SIZE, validate)
+    if position != len(data):
+        raise ValueError(f'Binary data has {len(data) - position} trailing bytes')
+    return instance
@@ -0,0 +1,98 @@
+""" Module tracks changes of documents since they were loaded or last marked clean,
+and produces the MongoDB-style `$set`/`$unset` delta of those changes with dotted paths for the nested documents """
+
+__author__ = 'Bohdan Mushkevych'
+
+import copy
+
+from odm import fields
+
+SET = '$set'
+UNSET = '$unset'
+
+
+class ChangeSet(set):
+    """ Set of names of the fields assigned or deleted since the document was marked clean.
+    Values of the mutable fields (lists, dicts) may change in place, bypassing the descriptors;
+    their JSON copies taken at the moment the document was marked clean are kept in the `snapshot` """
+    __slots__ = ('snapshot',)
+
+    def __init__(self, names=()):
+        super(ChangeSet, self).__init__(names)
+
+        # {field name: deep copy of the JSON value}
+        self.snapshot = dict()
+
+
+def is_mutable(field):
+    """ :return: True if the field stores values that can be modified in place """
+    return isinstance(field, (fields.ListField, fields.DictField)) or type(field) is fields.BaseField
+
+
+def mark_clean(document):
+    """ starts tracking of the document changes; nested documents are marked clean recursively """
+    schema = document._schema
+    klass = document.__class__
+    changes = ChangeSet()
+    for field_name, field_obj in schema.fields.items():
+        if field_name in schema.nested_fields:
+            # unset nested documents are not populated with their defaults
+            nested_document = document._data.get(field_name)
+            if nested_document is not None:
+                mark_clean(nested_document)
+        elif is_mutable(field_obj):
+            value = field_obj.to_json(field_obj.__get__(document, klass))
+            if value is not None:
+                changes.snapshot[field_name] = copy.deepcopy(value)
+    document._changes = changes
+
+
+def collect_delta(document, prefix, set_values, unset_values):
+    """ appends changes of the tracked document to the {dotted path: value} `set_values`
+    and {dotted path: ''} `unset_values` """
+    schema = document._schema
+    klass = document.__class__
+    changes = document._changes
+    for field_name, field_obj in schema.fields.items():
+        path = prefix + field_name
+        is_assigned = field_name in changes
+
+        if field_name in schema.nested_fields:
+            nested_document = document._data.get(field_name)
+            if not is_assigned and nested_document is None:
+                continue
+            if not is_assigned and nested_document._changes is not None:
+                collect_delta(nested_document, path + '.', set_values, unset_values)
+                continue
+            # nested document was replaced, or was created after the parent was marked clean
+            value = None if nested_document is None else nested_document.to_json()
+        else:
+            if not is_assigned and not is_mutable(field_obj):
+                continue
+            value = field_obj.to_json(field_obj.__get__(document, klass))
+            if not is_assigned and changes.snapshot.get(field_name) == value:
+                continue
+
+        if value is None:
+            unset_values[path] = ''
+        else:
+            set_values[path] = value
+
+
+def to_json_delta(document):
+    """ :return: dict {'$set': {dotted path: value}, '$unset': {dotted path: ''}} with the document changes;
+        operators without changes are omitted, so the unchanged document produces an empty dict.
+        Documents that are not tracked produce `$set` of the whole document """
+    if document._changes is None:
+        json_data = document.to_json()
+        return {SET: json_data} if json_data else dict()
+
+    set_values, unset_values = dict(), dict()
+    collect_delta(document, '', set_values, unset_values)
+
+    delta = dict()
+    if set_values:
+        delta[SET] = set_values
+    if unset_values:
+        delta[UNSET] = unset_values
+    return delta
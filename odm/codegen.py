@@ -0,0 +1,526 @@
+""" Module generates straight-line serializer and deserializer functions for a given DocumentSchema.
+Generated code is equivalent to the generic loops in BaseDocument, but:
+- iterates over fields in an unrolled manner
+- has field methods (descriptor getters/setters, converters, validators) bound upfront
+- inlines the storage access for the standard fields, whose descriptor behavior is known """
+
+__author__ = 'Bohdan Mushkevych'
+
+import datetime
+import json
+from json.encoder import encode_basestring_ascii as encode_string, INFINITY
+
+from odm import fields
+from odm.errors import FieldDoesNotExist, ValidationError
+from odm.lazy import LazyData
+
+# standard fields, whose `__set__` is equivalent to `BaseField.__set__(instance, self.from_json(value))`
+# and whose `from_json` is idempotent, i.e. from_json(from_json(value)) == from_json(value)
+STANDARD_FIELDS = frozenset([
+    fields.BaseField,
+    fields.NestedDocumentField,
+    fields.ListField,
+    fields.DictField,
+    fields.StringField,
+    fields.IntegerField,
+    fields.DecimalField,
+    fields.BooleanField,
+    fields.DateTimeField,
+    fields.ObjectIdField,
+])
+
+# {field class: exact type, which is passed through by the field's `to_json` unchanged}
+PASS_THROUGH_TYPES = {
+    fields.StringField: str,
+    fields.IntegerField: int,
+    fields.BooleanField: bool,
+    fields.ObjectIdField: str,
+}
+
+# fields whose `__get__` differs from the BaseField.__get__ only by copying the value shared with a clone;
+# the generated code reads, but never modifies the value, so it reads the stored value directly
+COPY_ON_ACCESS_FIELDS = frozenset([
+    fields.NestedDocumentField,
+    fields.ListField,
+    fields.DictField,
+])
+
+# fields whose `to_json` is the identity function, unless the ListField or DictField declares its element field
+IDENTITY_FIELDS = frozenset([
+    fields.BaseField,
+    fields.ListField,
+    fields.DictField,
+])
+
+# fields whose `__get__` returns `to_json` of the stored value, and whose `to_json` is idempotent;
+# the generated code reads the stored value directly and converts it once
+CONVERTING_GETTER_FIELDS = frozenset([
+    fields.DecimalField,
+])
+
+# batch conversion: {field class: exact type of values, whose `to_json` result is memoized within a batch};
+# only naive datetimes are memoized
+MEMOIZED_TO_JSON = {
+    fields.DateTimeField: datetime.datetime,
+}
+
+# batch conversion: fields, whose `from_json` result for string values is memoized within a batch
+MEMOIZED_FROM_JSON = frozenset([
+    fields.DateTimeField,
+    fields.DecimalField,
+])
+
+
+def float_str(value):
+    """ :return: JSON text of the float; identical to the one produced by the json.JSONEncoder """
+    if value != value:
+        return 'NaN'
+    if value == INFINITY:
+        return 'Infinity'
+    if value == -INFINITY:
+        return '-Infinity'
+    return float.__repr__(value)
+
+
+def _is_identity(field_obj):
+    """ :return: True if the field's `to_json` and `from_json` are the identity functions """
+    return type(field_obj) in IDENTITY_FIELDS and getattr(field_obj, 'element_field', None) is None
+
+
+def _is_virtual_default(field_obj):
+    """ :return: True if the field's default is an empty view, that is skipped by the serializers """
+    return getattr(field_obj, 'virtual_default', False)
+
+
+# text serialization: {field class: exact type of the JSON values produced by the field's `to_json`}
+TEXT_TYPES = {
+    fields.StringField: str,
+    fields.ObjectIdField: str,
+    fields.DateTimeField: str,
+    fields.IntegerField: int,
+    fields.BooleanField: bool,
+}
+
+# text serialization: {JSON value type: name of the function in TEXT_NAMESPACE, producing its JSON text}
+TEXT_ENCODERS = {
+    str: 'encode_string',
+    int: 'int_repr',
+    bool: 'bool_str',
+    float: 'float_str',
+}
+
+TEXT_NAMESPACE = {
+    'encode': json.JSONEncoder().encode,
+    'encode_string': encode_string,
+    'int_repr': int.__repr__,
+    'bool_str': lambda value: 'true' if value else 'false',
+    'float_str': float_str,
+}
+
+
+def _compile(source, namespace, function_name):
+    exec(compile(source, f'<odm.codegen {function_name}>', 'exec'), namespace)
+    function = namespace[function_name]
+    function.__source__ = source
+    return function
+
+
+def _indent(lines, level):
+    return ['    ' * level + line for line in lines]
+
+
+def _store_json(i, field_name, field_obj, schema, namespace):
+    """ :return: lines storing the JSON `value` of the field into the `json_data` dict """
+    name = repr(field_name)
+    if field_name in schema.nested_fields:
+        return [f'json_data[{name}] = value.to_json()']
+    return [f'json_data[{name}] = value']
+
+
+def _text_type(field_obj):
+    """ :return: exact type of the field's JSON values, or None if the type is not known upfront """
+    field_type = type(field_obj)
+    if field_type is fields.DecimalField:
+        return str if field_obj.force_string else float
+    return TEXT_TYPES.get(field_type)
+
+
+def _store_text(i, field_name, field_obj, schema, namespace):
+    """ :return: lines appending the JSON text of the field's `"name": value` pair to the `parts` list """
+    namespace[f'key_{i}'] = encode_string(field_name) + ': '
+    if field_name in schema.nested_fields:
+        return [f'parts.append(key_{i} + value.to_json_str())']
+
+    text_type = _text_type(field_obj)
+    if text_type is None:
+        return [f'parts.append(key_{i} + encode(value))']
+
+    namespace[f'text_type_{i}'] = text_type
+    return [f'if value.__class__ is text_type_{i}:',
+            f'    parts.append(key_{i} + {TEXT_ENCODERS[text_type]}(value))',
+            f'else:',
+            f'    parts.append(key_{i} + encode(value))']
+
+
+def _to_json_body(schema, namespace, memoize=False, text=False, projection=None):
+    """ :return: lines converting `document` into `json_data` dict, or into the `parts` list of JSON text pairs
+    :param memoize: if True, DateTimeField values are formatted via the `memo_{i}` dicts
+    :param text: if True, the lines produce the `parts` list rather than the `json_data` dict
+    :param projection: (optional) {field name: tuple of the nested dotted paths, or None for the whole field};
+        only the fields of the projection are converted. See `resolve_projection` """
+    lines = ['data = document._data']
+    if text:
+        lines.append('parts = list()')
+        store = _store_text
+        namespace.update(TEXT_NAMESPACE)
+    else:
+        lines.append('json_data = dict()')
+        store = _store_json
+
+    for i, (field_name, field_obj) in enumerate(schema.fields.items()):
+        if projection is not None and field_name not in projection:
+            continue
+        field_type = type(field_obj)
+        name = repr(field_name)
+        namespace[f'get_{i}'] = field_obj.__get__
+        namespace[f'conv_{i}'] = field_obj.to_json
+        if projection is not None and projection[field_name] is not None:
+            namespace[f'only_{i}'] = projection[field_name]
+            store_lines = [f'json_data[{name}] = value.to_json(only=only_{i})']
+        else:
+            store_lines = store(i, field_name, field_obj, schema, namespace)
+
+        inline_get = field_type in STANDARD_FIELDS and (field_type.__get__ is fields.BaseField.__get__
+                                                        or field_type in COPY_ON_ACCESS_FIELDS)
+        if field_type in CONVERTING_GETTER_FIELDS:
+            lines.append(f'value = data.get({name})')
+            if not field_obj.null:
+                lines.append(f'if value is None:')
+                lines.append(f'    value = get_{i}(document, klass)')
+            lines.append(f'if value is not None:')
+            lines.append(f'    value = conv_{i}(value)')
+            lines += _indent(store_lines, 1)
+            continue
+        elif inline_get:
+            lines.append(f'value = data.get({name})')
+            if not field_obj.null and not _is_virtual_default(field_obj):
+                # None values of the non-nullable fields are replaced with the field's default
+                lines.append(f'if value is None:')
+                lines.append(f'    value = get_{i}(document, klass)')
+        else:
+            lines.append(f'value = get_{i}(document, klass)')
+
+        if field_name in schema.nested_fields or _is_identity(field_obj):
+            lines.append(f'if value is not None:')
+            lines += _indent(store_lines, 1)
+        elif field_type in PASS_THROUGH_TYPES:
+            namespace[f'type_{i}'] = PASS_THROUGH_TYPES[field_type]
+            lines.append(f'if value is not None:')
+            lines.append(f'    if value.__class__ is not type_{i}:')
+            lines.append(f'        value = conv_{i}(value)')
+            lines += _indent(store_lines, 1)
+        elif memoize and field_type in MEMOIZED_TO_JSON:
+            namespace[f'type_{i}'] = MEMOIZED_TO_JSON[field_type]
+            # aware datetimes of the same instant in different timezones are equal, but are formatted differently
+            lines.append(f'if value.__class__ is type_{i} and value.tzinfo is None:')
+            lines.append(f'    converted = memo_{i}.get(value)')
+            lines.append(f'    if converted is None:')
+            lines.append(f'        converted = memo_{i}[value] = conv_{i}(value)')
+            lines.append(f'    value = converted')
+            lines.append(f'else:')
+            lines.append(f'    value = conv_{i}(value)')
+            lines.append(f'if value is not None:')
+            lines += _indent(store_lines, 1)
+        else:
+            lines.append(f'value = conv_{i}(value)')
+            lines.append(f'if value is not None:')
+            lines += _indent(store_lines, 1)
+    return lines
+
+
+def _from_json_body(schema, namespace, memoize=False, deferred=False, projection=None):
+    """ :return: lines converting `json_data` into the `instance` of `cls`
+    :param memoize: if True, string values of DateTimeField and DecimalField are parsed via the `memo_{i}` dicts
+    :param deferred: if True, the values are not validated, but rather marked as pending in the `instance._pending`
+    :param projection: (optional) see `_to_json_body`; fields outside of the projection are left unset """
+    lines = ['instance = cls()',
+             'data = instance._data']
+    if deferred:
+        lines.append('pending = instance._pending = set()')
+
+    for i, (field_name, field_obj) in enumerate(schema.fields.items()):
+        if projection is not None and field_name not in projection:
+            continue
+        field_type = type(field_obj)
+        name = repr(field_name)
+        namespace[f'set_{i}'] = field_obj.__set__
+        namespace[f'validate_{i}'] = field_obj.validate
+
+        lines.append(f'if {name} in json_data:')
+        if field_name in schema.nested_fields and projection is not None and projection[field_name] is not None:
+            namespace[f'nested_{i}'] = field_obj.nested_klass
+            namespace[f'only_{i}'] = projection[field_name]
+            lines.append(f'    value = nested_{i}.from_json(json_data[{name}], deferred_validation={deferred}, '
+                         f'only=only_{i})')
+        elif field_name in schema.nested_fields:
+            namespace[f'nested_{i}'] = field_obj.nested_klass
+            lines.append(f'    value = nested_{i}.from_json(json_data[{name}], deferred_validation={deferred})')
+        elif _is_identity(field_obj):
+            lines.append(f'    value = json_data[{name}]')
+        elif memoize and field_type in MEMOIZED_FROM_JSON:
+            namespace[f'conv_{i}'] = field_obj.from_json
+            lines.append(f'    value = json_data[{name}]')
+            lines.append(f'    if value.__class__ is str:')
+            lines.append(f'        converted = memo_{i}.get(value)')
+            lines.append(f'        if converted is None:')
+            lines.append(f'            converted = memo_{i}[value] = conv_{i}(value)')
+            lines.append(f'        value = converted')
+            lines.append(f'    else:')
+            lines.append(f'        value = conv_{i}(value)')
+        else:
+            namespace[f'conv_{i}'] = field_obj.from_json
+            lines.append(f'    value = conv_{i}(json_data[{name}])')
+
+        if field_type in STANDARD_FIELDS:
+            lines.append(f'    if value is not None:')
+            if deferred:
+                lines.append(f'        pending.add({name})')
+            else:
+                lines.append(f'        validate_{i}(value)')
+            lines.append(f'        data[{name}] = value')
+            lines.append(f'    else:')
+            lines.append(f'        set_{i}(instance, value)')
+        else:
+            lines.append(f'    set_{i}(instance, value)')
+    return lines
+
+
+def _split_path(schema, path):
+    """ :return: tuple (field name, nested dotted path or empty string) of the projection path
+    :raise FieldDoesNotExist if the field is not known, or the path continues past a non-nested field """
+    field_name, _, nested_path = path.partition('.')
+    if field_name not in schema.fields:
+        raise FieldDoesNotExist(f"The field '{field_name}' of the projection {path} is not present "
+                                f"in document type '{schema.document_klass.__name__}'")
+    if nested_path and field_name not in schema.nested_fields:
+        raise FieldDoesNotExist(f'projection {path} continues past the non-nested field {field_name}')
+    return field_name, nested_path
+
+
+def _selection_tree(schema, paths):
+    """ :return: {field name: None for the whole field, or the selection tree of the nested document} """
+    # {field name: list of the nested paths, or None for the whole field}
+    grouped = dict()
+    for path in paths:
+        field_name, nested_path = _split_path(schema, path)
+        if not nested_path:
+            grouped[field_name] = None
+        elif grouped.get(field_name, ()) is not None:
+            grouped.setdefault(field_name, list()).append(nested_path)
+
+    return {field_name: None if nested_paths is None
+            else _selection_tree(schema.nested_fields[field_name].nested_klass._schema, nested_paths)
+            for field_name, nested_paths in grouped.items()}
+
+
+def _exclude(schema, tree, paths):
+    """ removes the dotted paths from the selection tree """
+    for path in paths:
+        field_name, nested_path = _split_path(schema, path)
+        if not nested_path:
+            tree.pop(field_name, None)
+        elif field_name in tree:
+            nested_schema = schema.nested_fields[field_name].nested_klass._schema
+            if tree[field_name] is None:
+                tree[field_name] = {nested_name: None for nested_name in nested_schema.fields}
+            _exclude(nested_schema, tree[field_name], [nested_path])
+
+
+def _to_paths(tree):
+    """ :return: list of the dotted paths of the selection tree """
+    paths = list()
+    for field_name, subtree in tree.items():
+        if subtree is None:
+            paths.append(field_name)
+        else:
+            paths += [f'{field_name}.{path}' for path in _to_paths(subtree)]
+    return paths
+
+
+def resolve_projection(schema, only=None, exclude=None):
+    """ :return: projection {field name: tuple of the nested dotted paths to convert, or None for the whole field}
+        in the order of the schema fields
+    :param only: (optional) iterable of the dotted paths to convert; all fields if not set
+    :param exclude: (optional) iterable of the dotted paths not to convert
+    :raise FieldDoesNotExist if any path is not known """
+    if only is None:
+        tree = {field_name: None for field_name in schema.fields}
+    else:
+        tree = _selection_tree(schema, only)
+    if exclude is not None:
+        _exclude(schema, tree, exclude)
+
+    projection = dict()
+    for field_name in schema.fields:
+        if field_name not in tree:
+            continue
+        subtree = tree[field_name]
+        projection[field_name] = None if subtree is None else tuple(_to_paths(subtree))
+    return projection
+
+
+def _memo_declarations(schema, memoized_fields):
+    return [f'memo_{i} = dict()' for i, field_obj in enumerate(schema.fields.values())
+            if type(field_obj) in memoized_fields]
+
+
+def compile_to_json(schema, projection=None):
+    """ :return: function(document) -> dict, equivalent to the generic BaseDocument.to_json
+    :param projection: (optional) projection of the fields to convert; see `resolve_projection` """
+    namespace = {'klass': schema.document_klass}
+    lines = ['def to_json(document):']
+    lines += _indent(_to_json_body(schema, namespace, projection=projection), 1)
+    lines.append('    return json_data')
+    return _compile('\n'.join(lines) + '\n', namespace, 'to_json')
+
+
+def compile_to_json_str(schema):
+    """ :return: function(document) -> str, equivalent to `json.dumps(document.to_json())`,
+        that writes the JSON text without building the intermediate dict """
+    namespace = {'klass': schema.document_klass}
+    lines = ['def to_json_str(document):']
+    lines += _indent(_to_json_body(schema, namespace, text=True), 1)
+    lines.append("    return '{' + ', '.join(parts) + '}'")
+    return _compile('\n'.join(lines) + '\n', namespace, 'to_json_str')
+
+
+def compile_from_json(schema, deferred=False, projection=None):
+    """ :return: function(cls, json_data) -> document, equivalent to the generic BaseDocument.from_json
+    :param deferred: if True, the function produces documents in the deferred validation mode
+    :param projection: (optional) projection of the fields to convert; see `resolve_projection` """
+    namespace = dict()
+    lines = ['def from_json(cls, json_data):']
+    lines += _indent(_from_json_body(schema, namespace, deferred=deferred, projection=projection), 1)
+    lines.append('    return instance')
+    return _compile('\n'.join(lines) + '\n', namespace, 'from_json')
+
+
+def compile_validate(schema):
+    """ :return: function(document), equivalent to the generic BaseDocument.validate
+        Validators of the fields are called directly, and the stored values of the standard fields are read
+        without the descriptors; the descriptor getters are called only to apply defaults to the missing values """
+    namespace = {'klass': schema.document_klass, 'ValidationError': ValidationError}
+    lines = ['def validate(document):',
+             '    data = document._data',
+             '    pending = document._pending']
+
+    for i, (field_name, field_obj) in enumerate(schema.fields.items()):
+        field_type = type(field_obj)
+        name = repr(field_name)
+        namespace[f'get_{i}'] = field_obj.__get__
+        namespace[f'validate_{i}'] = field_obj.validate
+
+        inline_get = field_type in STANDARD_FIELDS and (field_type.__get__ is fields.BaseField.__get__
+                                                        or field_type in COPY_ON_ACCESS_FIELDS
+                                                        or field_type in CONVERTING_GETTER_FIELDS
+                                                        or field_type is fields.ObjectIdField)
+        if inline_get:
+            lines.append(f'    value = data.get({name})')
+            if not field_obj.null:
+                lines.append(f'    if value is None:')
+                lines.append(f'        value = get_{i}(document, klass)')
+        else:
+            lines.append(f'    value = get_{i}(document, klass)')
+
+        if field_obj.null:
+            # no further validations are possible on NoneType field
+            lines.append(f'    if value is not None:')
+        else:
+            message = repr(f'Non-nullable field {field_name} is set to None')
+            lines.append(f'    if value is None:')
+            lines.append(f'        raise ValidationError({message})')
+            lines.append(f'    else:')
+
+        if field_name in schema.nested_fields:
+            lines.append(f'        if pending is not None and {name} in pending:')
+            lines.append(f'            validate_{i}(value)')
+            lines.append(f'        value.validate()')
+        else:
+            lines.append(f'        if pending is None or {name} in pending:')
+            lines.append(f'            validate_{i}(value)')
+
+    if schema.deferred_validation:
+        lines.append('    if pending:')
+        lines.append('        pending.clear()')
+    else:
+        # documents loaded by the `from_json(..., deferred_validation=True)` return to the immediate validation
+        lines.append('    if pending is not None:')
+        lines.append('        document._pending = None')
+    return _compile('\n'.join(lines) + '\n', namespace, 'validate')
+
+
+def compile_key(schema):
+    """ :return: function(document) -> key, equivalent to the generic BaseDocument.key:
+        a tuple of the key field values for the composite keys, and the value of the single key field otherwise.
+        Values of the fields with the plain getter are read from the `_data`; the getter is called only
+        to apply the default to the missing value """
+    namespace = {'klass': schema.document_klass}
+    lines = ['def key(document):',
+             '    data = document._data']
+    for i, field_name in enumerate(schema.key_fields):
+        field_obj = schema.fields[field_name]
+        field_type = type(field_obj)
+        namespace[f'get_{i}'] = field_obj.__get__
+        if field_type in STANDARD_FIELDS and field_type.__get__ is fields.BaseField.__get__:
+            lines.append(f'    value_{i} = data.get({field_name!r})')
+            if not field_obj.null:
+                lines.append(f'    if value_{i} is None:')
+                lines.append(f'        value_{i} = get_{i}(document, klass)')
+        else:
+            lines.append(f'    value_{i} = get_{i}(document, klass)')
+
+    values = [f'value_{i}' for i in range(len(schema.key_fields))]
+    if schema.composite_key:
+        lines.append(f'    return ({", ".join(values)},)')
+    else:
+        lines.append(f'    return {values[0]}')
+    return _compile('\n'.join(lines) + '\n', namespace, 'key')
+
+
+def compile_to_json_many(schema):
+    """ :return: function(documents, errors) -> list of dicts
+        Conversion errors are stored in the `errors` list as (row index, exception) tuples and the rows are skipped.
+        Documents of other classes (for instance subclasses) and lazy documents are converted by their own `to_json` """
+    namespace = {'klass': schema.document_klass, 'LazyData': LazyData}
+    lines = ['def to_json_many(documents, errors):']
+    lines += _indent(_memo_declarations(schema, MEMOIZED_TO_JSON), 1)
+    lines += ['    results = list()',
+              '    for index, document in enumerate(documents):',
+              '        try:',
+              '            if document.__class__ is not klass or document._data.__class__ is LazyData:',
+              '                results.append(document.to_json())',
+              '                continue']
+    lines += _indent(_to_json_body(schema, namespace, memoize=True), 3)
+    lines += ['            results.append(json_data)',
+              '        except Exception as e:',
+              '            errors.append((index, e))',
+              '    return results']
+    return _compile('\n'.join(lines) + '\n', namespace, 'to_json_many')
+
+
+def compile_from_json_many(schema, deferred=False):
+    """ :return: function(cls, json_iterable, errors) -> list of documents
+        Conversion errors are stored in the `errors` list as (row index, exception) tuples and the rows are skipped
+    :param deferred: if True, the function produces documents in the deferred validation mode """
+    namespace = dict()
+    lines = ['def from_json_many(cls, json_iterable, errors):']
+    lines += _indent(_memo_declarations(schema, MEMOIZED_FROM_JSON), 1)
+    lines += ['    results = list()',
+              '    for index, json_data in enumerate(json_iterable):',
+              '        try:']
+    lines += _indent(_from_json_body(schema, namespace, memoize=True, deferred=deferred), 3)
+    lines += ['            results.append(instance)',
+              '        except Exception as e:',
+              '            errors.append((index, e))',
+              '    return results']
+    return _compile('\n'.join(lines) + '\n', namespace, 'from_json_many')
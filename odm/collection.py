@@ -0,0 +1,243 @@
+""" Module provides the DocumentCollection: a container of documents indexed by their `key`.
+The collection registers itself as an observer of the Document's key fields (see BaseField.add_observer),
+so that the documents whose key fields are reassigned are re-indexed under their new key. """
+
+__author__ = 'Bohdan Mushkevych'
+
+from odm import fields
+from odm.indexes import HashIndex, SortedIndex
+
+# field classes indexed by the SortedIndex by default; other fields are indexed by the HashIndex
+SORTED_INDEX_FIELDS = (fields.IntegerField, fields.DecimalField, fields.DateTimeField)
+
+# field classes, whose values are not hashable nor ordered
+NON_INDEXABLE_FIELDS = (fields.NestedDocumentField, fields.ListField, fields.DictField)
+
+# {(collection class, Document class): parametrized collection class}
+_parametrized_klasses = dict()
+
+
+def merge_fields(existing, incoming):
+    """ Merge policy: fields set in the incoming document are assigned to the existing one
+    :return: the existing document, updated in place """
+    for field_name, field_obj in incoming._fields.items():
+        if field_obj.initialized(incoming):
+            existing[field_name] = incoming[field_name]
+    return existing
+
+
+class DocumentCollection:
+    """ Container of documents of the `document_klass`, indexed by their key:
+
+        users = DocumentCollection[User]()
+        users.upsert(User(name='john'))
+        user = users['john']
+
+    Get, upsert, delete and membership tests take O(1). The index holds no per-document data besides
+    the dict entry, so the memory overhead is that of a {key: document} dict.
+    Documents may be modified while held by the collection: assignment of a key field moves the document
+    to its new key. If another document is held under the new key, the two are resolved by the merge policy,
+    as if the moved document was upserted. Secondary indexes (see `create_index`) are updated likewise.
+    NOTE: while any collection of the Document class exists, assignments to its key and indexed fields
+    look up the assigned document in every such collection. """
+
+    # Document class of the collection; set by `DocumentCollection[Document]` or by a subclass
+    document_klass = None
+
+    def __class_getitem__(cls, document_klass):
+        """ :return: collection class of the given Document class """
+        klass = _parametrized_klasses.get((cls, document_klass))
+        if klass is None:
+            name = f'{cls.__name__}[{document_klass.__name__}]'
+            klass = type(name, (cls,), {'document_klass': document_klass})
+            _parametrized_klasses[(cls, document_klass)] = klass
+        return klass
+
+    def __init__(self, documents=None, merge=None):
+        """
+        :param documents: (optional) iterable of documents to upsert
+        :param merge: (optional) merge policy: function(existing, incoming) -> document to keep under the key,
+            applied when the upserted document's key is already taken by another document.
+            If not set, the last written document wins. See `merge_fields`
+        :raise TypeError if the collection class is not bound to a Document class
+        :raise NotImplementedError if the Document does not declare `key_fields`
+        """
+        if self.document_klass is None:
+            raise TypeError(f'{self.__class__.__name__} is not bound to a Document class: '
+                            f'use {self.__class__.__name__}[Document]()')
+        self.merge = merge
+
+        # {document key: document}
+        self._index = dict()
+
+        # {field name: odm.indexes.FieldIndex}
+        self._indexes = dict()
+
+        schema = self.document_klass._schema
+        self._key_fields = frozenset(schema.key_fields)
+        for field_name in schema.key_fields:
+            schema.fields[field_name].add_observer(self)
+
+        if documents is not None:
+            self.extend(documents)
+
+    def _index_document(self, document):
+        for index in self._indexes.values():
+            index.add(document)
+
+    def _unindex_document(self, document):
+        for index in self._indexes.values():
+            index.remove(document)
+
+    def _store(self, document, merge, is_held=False):
+        """ :return: document held under the document's key once the merge policy is applied
+        :param is_held: True if the document is already held by the secondary indexes, i.e. is being re-keyed """
+        key = document.key
+        existing = self._index.get(key)
+        if existing is document:
+            return document
+
+        stored = document
+        if existing is not None and merge is not None:
+            stored = merge(existing, document)
+        self._index[key] = stored
+
+        if existing is not None and existing is not stored:
+            self._unindex_document(existing)
+        if is_held and document is not stored:
+            self._unindex_document(document)
+        if stored is not existing and (stored is not document or not is_held):
+            self._index_document(stored)
+        return stored
+
+    def _release(self, document, field_names):
+        """ observer protocol: removes the document, whose fields are about to change, from the affected indexes
+        :return: True if the document is held by the collection """
+        key = document.key
+        if self._index.get(key) is not document:
+            return False
+        if not self._key_fields.isdisjoint(field_names):
+            del self._index[key]
+        for field_name in field_names:
+            index = self._indexes.get(field_name)
+            if index is not None:
+                index.remove(document)
+        return True
+
+    def _restore(self, document, field_names):
+        """ observer protocol: returns the released document to the affected indexes """
+        for field_name in field_names:
+            index = self._indexes.get(field_name)
+            if index is not None:
+                index.add(document)
+        if not self._key_fields.isdisjoint(field_names):
+            self._store(document, self.merge, is_held=True)
+
+    def create_index(self, field_name, ordered=None):
+        """ Creates the secondary index over the field, and populates it with the documents of the collection
+        :param field_name: name of the field (not the name of the Document's attribute)
+        :param ordered: (optional) if True, the SortedIndex supporting range lookups is created;
+            if False, the HashIndex is created. Defaults to the SortedIndex for the IntegerField, DecimalField
+            and DateTimeField, and to the HashIndex for other fields
+        :return: odm.indexes.FieldIndex
+        :raise KeyError if the field is not known
+        :raise TypeError if the field holds documents, lists or dicts """
+        field_obj = self.document_klass._schema.fields[field_name]
+        if isinstance(field_obj, NON_INDEXABLE_FIELDS):
+            raise TypeError(f'{type(field_obj).__name__} {field_name} can not be indexed')
+        if field_name in self._indexes:
+            return self._indexes[field_name]
+
+        if ordered is None:
+            ordered = isinstance(field_obj, SORTED_INDEX_FIELDS)
+        index = SortedIndex(field_obj) if ordered else HashIndex(field_obj)
+        index.extend(self._index.values())
+        self._indexes[field_name] = index
+        field_obj.add_observer(self)
+        return index
+
+    def drop_index(self, field_name):
+        """ :raise KeyError if the field is not indexed """
+        del self._indexes[field_name]
+        if field_name not in self._key_fields:
+            self.document_klass._schema.fields[field_name].remove_observer(self)
+
+    def get_index(self, field_name):
+        """ :return: odm.indexes.FieldIndex of the field, or None if the field is not indexed """
+        return self._indexes.get(field_name)
+
+    def find(self, field_name, value):
+        """ :return: list of documents whose field equals the value
+        :raise KeyError if the field is not indexed """
+        return self._indexes[field_name].find(value)
+
+    def find_range(self, field_name, min_value=None, max_value=None, include_min=True, include_max=True):
+        """ :return: list of documents with the field value within the range, ordered by the value.
+            See SortedIndex.range
+        :raise KeyError if the field is not indexed
+        :raise TypeError if the field is indexed by the HashIndex """
+        index = self._indexes[field_name]
+        if not isinstance(index, SortedIndex):
+            raise TypeError(f'field {field_name} is not indexed by the SortedIndex')
+        return index.range(min_value, max_value, include_min, include_max)
+
+    def upsert(self, document):
+        """ Stores the document under its key
+        :return: document held under the key, i.e. the given document or the result of the merge policy
+        :raise TypeError if the document is not an instance of the `document_klass` """
+        if not isinstance(document, self.document_klass):
+            raise TypeError(f'{self.__class__.__name__} does not accept {type(document)}')
+        return self._store(document, self.merge)
+
+    def extend(self, documents, merge=None):
+        """ Upserts every document of the iterable
+        :param merge: (optional) merge policy of this call; defaults to the collection's one """
+        merge = self.merge if merge is None else merge
+        document_klass = self.document_klass
+        for document in documents:
+            if not isinstance(document, document_klass):
+                raise TypeError(f'{self.__class__.__name__} does not accept {type(document)}')
+            self._store(document, merge)
+
+    def get(self, key, default=None):
+        return self._index.get(key, default)
+
+    def delete(self, key):
+        """ :return: removed document
+        :raise KeyError if no document is held under the key """
+        document = self._index.pop(key)
+        self._unindex_document(document)
+        return document
+
+    def discard(self, key):
+        """ removes the document held under the key, if any """
+        document = self._index.pop(key, None)
+        if document is not None:
+            self._unindex_document(document)
+
+    def clear(self):
+        self._index.clear()
+        for index in self._indexes.values():
+            index.clear()
+
+    def keys(self):
+        return self._index.keys()
+
+    def __getitem__(self, key):
+        return self._index[key]
+
+    def __delitem__(self, key):
+        self.delete(key)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def __iter__(self):
+        """ :return: iterator over the documents """
+        return iter(self._index.values())
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {len(self._index)} documents>'
@@ -0,0 +1,215 @@
+""" Module converts lists of documents into NumPy columns and back.
+Each field of the document class becomes a NumPy array:
+- IntegerField: int64
+- DecimalField: float64, or int64 holding the value scaled by 10**precision
+- BooleanField: bool
+- DateTimeField: datetime64[us]
+- StringField, ObjectIdField: object, or fixed-width unicode
+- all other fields: object
+Nullable fields (null=True) are returned as numpy.ma.MaskedArray, with None values masked.
+NumPy is an optional dependency of the synergy_odm, and is required only by this module. """
+
+__author__ = 'Bohdan Mushkevych'
+
+import decimal
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from odm import fields
+from odm.errors import ValidationError
+
+DATETIME_DTYPE = 'datetime64[us]'
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('odm.columns requires NumPy: pip install numpy')
+
+
+def _column_values(documents, field):
+    """ :return: list of raw field values; defaults are applied to the missing values of non-nullable fields """
+    name = field.name
+    values = [document._data.get(name) for document in documents]
+    if not field.null and field.default is not None and None in values:
+        values = [field.from_json(field.__get__(document, document.__class__)) if value is None else value
+                  for document, value in zip(documents, values)]
+    return values
+
+
+def _to_array(field, values, decimal_scaled, fixed_width_strings):
+    """ :return: numpy array of the dtype corresponding to the field type """
+    field_type = type(field)
+    if isinstance(field, fields.IntegerField):
+        return np.array([0 if v is None else v for v in values], dtype=np.int64)
+    elif isinstance(field, fields.DecimalField):
+        if field.fixed_point:
+            # values are stored as the scaled integers
+            if decimal_scaled:
+                return np.array([0 if v is None else v for v in values], dtype=np.int64)
+            return np.array([np.nan if v is None else v for v in values], dtype=np.float64) / 10 ** field.precision
+        if decimal_scaled:
+            scale = decimal.Decimal(10) ** field.precision
+            return np.array([0 if v is None else int(field.from_json(v) * scale) for v in values], dtype=np.int64)
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+    elif isinstance(field, fields.BooleanField):
+        return np.array([False if v is None else v for v in values], dtype=np.bool_)
+    elif isinstance(field, fields.DateTimeField):
+        return np.array(values, dtype=DATETIME_DTYPE)
+    elif field_type in (fields.StringField, fields.ObjectIdField) and fixed_width_strings:
+        return np.array(['' if v is None else v for v in values], dtype=np.str_)
+
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def to_columns(documents, document_klass=None, decimal_scaled=False, fixed_width_strings=False):
+    """ Converts list of documents into the {field name: numpy array} columns.
+    :param documents: list of documents of the same class
+    :param document_klass: (optional) document class; if not given, the class of the first document is used
+    :param decimal_scaled: if True, DecimalField values are stored as int64 scaled by 10**precision;
+        otherwise as float64
+    :param fixed_width_strings: if True, StringField and ObjectIdField are stored as the fixed-width unicode arrays;
+        otherwise as object arrays
+    :return: dict {field name: numpy array}, ordered by the field declaration order """
+    _require_numpy()
+    documents = list(documents)
+    if document_klass is None:
+        if not documents:
+            raise ValueError('to_columns requires either non-empty documents or the document_klass')
+        document_klass = documents[0].__class__
+
+    columns = dict()
+    for field in document_klass._schema.ordered_fields:
+        values = _column_values(documents, field)
+        array = _to_array(field, values, decimal_scaled, fixed_width_strings)
+        if field.null:
+            mask = np.fromiter((v is None for v in values), dtype=np.bool_, count=len(values))
+            array = np.ma.MaskedArray(array, mask=mask)
+        columns[field.name] = array
+    return columns
+
+
+def _validate_range(field, column, mask):
+    """ vectorised min_value/max_value check of the numeric column """
+    if column.dtype.kind not in 'iuf':
+        return
+    if isinstance(field, fields.DecimalField) and column.dtype.kind in 'iu':
+        column = column / 10 ** field.precision
+
+    for limit, violations in ((field.min_value, lambda c, v: c < v), (field.max_value, lambda c, v: c > v)):
+        if limit is None:
+            continue
+        invalid = violations(column, float(limit))
+        if mask is not None:
+            invalid &= ~mask
+        if invalid.any():
+            row = int(np.argmax(invalid))
+            field.raise_error(f'Row {row}: value {column[row]} is out of range [{field.min_value}, {field.max_value}]')
+
+
+def _from_array(field, column):
+    """ :return: list of Python values of the given field converted from the numpy column """
+    if column.dtype.kind == 'O':
+        # object columns hold arbitrary Python values: convert them the same way as the JSON values
+        return [None if v is None else field.from_json(v) for v in column.tolist()]
+    elif isinstance(field, fields.DecimalField):
+        if column.dtype.kind in 'iu':
+            # scaled int64 column
+            if field.fixed_point:
+                return column.tolist()
+            exponent = -field.precision
+            return [decimal.Decimal(v).scaleb(exponent) for v in column.tolist()]
+        return list(map(field.from_json, column.tolist()))
+    elif isinstance(field, fields.DateTimeField) and column.dtype.kind == 'M':
+        return column.astype(DATETIME_DTYPE).astype(object).tolist()
+    return column.tolist()
+
+
+def from_columns(document_klass, columns, validate=True):
+    """ Converts {field name: numpy array} columns into the list of documents.
+    :param document_klass: BaseDocument-derived class
+    :param columns: dict {field name: numpy array or numpy.ma.MaskedArray}; all columns must be of the same length
+        masked values are treated as None
+    :param validate: if True, the values are validated: numeric ranges in a vectorised manner,
+        other constraints value by value. If False, documents of the `deferred_validation` class
+        keep the loaded fields pending until `validate()` is called
+    :return: list of documents """
+    _require_numpy()
+    schema = document_klass._schema
+
+    names, value_lists, length = list(), list(), None
+    for name, column in columns.items():
+        if name not in schema.fields:
+            raise KeyError(name)
+        field = schema.fields[name]
+
+        mask = None
+        if isinstance(column, np.ma.MaskedArray):
+            mask = np.ma.getmaskarray(column)
+            column = column.data
+        if length is None:
+            length = len(column)
+        elif len(column) != length:
+            raise ValueError(f'Column {name} has {len(column)} rows vs expected {length}')
+
+        if validate:
+            _validate_range(field, column, mask)
+        values = _from_array(field, column)
+        if mask is not None and mask.any():
+            for row in np.flatnonzero(mask).tolist():
+                values[row] = None
+        if validate:
+            _validate_values(field, values, typed=column.dtype.kind != 'O')
+
+        names.append(name)
+        value_lists.append(values)
+
+    documents = list()
+    if length is None:
+        return documents
+
+    dict_backed = schema.data_klass is dict
+    mark_pending = not validate and schema.deferred_validation
+    for row in zip(*value_lists):
+        instance = document_klass()
+        if dict_backed:
+            data = dict(zip(names, row))
+            if None in row:
+                data = {k: v for k, v in data.items() if v is not None}
+            instance._data = data
+        else:
+            data = instance._data
+            for name, value in zip(names, row):
+                if value is not None:
+                    data[name] = value
+        if mark_pending:
+            instance._pending.update(name for name, value in zip(names, row) if value is not None)
+        if schema.track_changes:
+            instance.mark_clean()
+        documents.append(instance)
+    return documents
+
+
+def _validate_values(field, values, typed):
+    """ value-by-value check of the constraints, that can not be vectorised
+    :param typed: True if the values come from a typed numpy column; in this case
+        the type and range checks are skipped, as they have been verified by the dtype and _validate_range """
+    if typed:
+        has_constraints = field.choices or \
+            getattr(field, 'regex', None) is not None or \
+            getattr(field, 'min_length', None) is not None or \
+            getattr(field, 'max_length', None) is not None
+        if not has_constraints:
+            return
+
+    for row, value in enumerate(values):
+        if value is None:
+            continue
+        try:
+            field.validate(value)
+        except ValidationError as e:
+            field.raise_error(f'Row {row}: {e}')
@@ -1,18 +1,66 @@
 __author__ = 'Bohdan Mushkevych'
 
-from odm.errors import FieldDoesNotExist, ValidationError
-from odm.fields import NestedDocumentField, BaseField
+import copy
+import json
+
+from odm import binary, changes, fields, query
+from odm.errors import FieldDoesNotExist, BatchError
+from odm.lazy import LazyData
+from odm.schema import DocumentSchema
 
 
 class BaseDocument(object):
+    # subclasses without `__slots__` keep the instance `__dict__`;
+    # subclasses declaring `__slots__ = ()` are compact: see DocumentSchema.compact
+    __slots__ = ('_data', '_pending', '_changes', '_shared', '_key', '__weakref__')
+
+    # if True, assignments skip the validation and mark the fields as pending;
+    # the pending fields are verified by a single `validate()` call. See also `from_json(deferred_validation=...)`
+    deferred_validation = False
+
+    # if True, documents loaded by `from_json`, `from_json_many` and `from_json_lazy` are marked clean,
+    # i.e. track their changes for the `to_json_delta()`. Any other document is tracked once `mark_clean()` is called
+    track_changes = False
+
+    # if True, the document's key is computed once, and is kept until any of the document's fields is assigned
+    # or deleted; this makes hashing of the documents, used in sets and as dict keys, as cheap as hashing the key
+    cache_key = False
+
+    # per-class DocumentSchema; rebuilt by `__init_subclass__` for every subclass
+    _schema = None
+
+    # class-level {field name: field} and {attribute name: field} maps, shared by all instances
+    _fields = None
+    _attributes = None
+
+    def __init_subclass__(cls, **kwargs):
+        super(BaseDocument, cls).__init_subclass__(**kwargs)
+        cls._build_schema()
+
+    @classmethod
+    def _build_schema(cls):
+        cls._schema = DocumentSchema(cls)
+        cls._fields = cls._schema.fields
+        cls._attributes = cls._schema.attributes
+
     def __init__(self, **values):
         """
         :param values: list of <Document's attribute name>-<attribute value> pairs
         """
-        self._fields = self._get_fields()
-        self._attributes = self._get_attributes()
+        self._data = self._schema.data_klass()
+
+        # set of the field names pending validation in the deferred validation mode; None otherwise
+        self._pending = set() if self._schema.deferred_validation else None
+
+        # odm.changes.ChangeSet of the tracked documents; None otherwise
+        self._changes = None
+
+        # set of the field names, whose values are shared with a clone of the document; None otherwise
+        self._shared = None
+
+        # cached key of the document in the `cache_key` mode; None otherwise
+        self._key = None
 
-        self._data = dict()
         for field_name in values.keys():
             if field_name not in self._attributes:
                 msg = f"The attribute '{field_name}' is not present in document type '{self.__class__.__name__}'"
@@ -119,27 +167,33 @@ class BaseDocument(object):
 
     @property
     def key(self):
-        if isinstance(self.key_fields(), str):
-            return self[self.key_fields()]
-        elif isinstance(self.key_fields(), (list, tuple)):
-            key_list = list()
-            for field_name in self.key_fields():
-                key_list.append(self[field_name])
-            return tuple(key_list)
-        else:
-            raise TypeError('classmethod {0}.key_fields of type {1} is not of supported types: list, tuple'.
-                            format(self.__class__.__name__, type(self.key_fields())))
+        """ :return: tuple of the key field values for the composite keys, and the key field value otherwise.
+            See odm.codegen for the generated key extractor """
+        key = self._key
+        if key is None:
+            key = self._schema.key(self)
+            if self._schema.cache_key:
+                self._key = key
+        return key
 
     @key.setter
     def key(self, value):
-        if isinstance(self.key_fields(), str):
-            self[self.key_fields()] = value
-        elif isinstance(self.key_fields(), (list, tuple)):
-            for i, field_name in enumerate(self.key_fields()):
+        schema = self._schema
+        if not schema.composite_key:
+            self[schema.key_fields[0]] = value
+            return
+
+        # collections holding the document re-index it once, after all key fields are assigned,
+        # rather than after every key field
+        observers = set()
+        for field_name in schema.key_fields:
+            observers.update(schema.fields[field_name]._observers or ())
+        released = fields.release_observed(observers, self, schema.key_fields)
+        try:
+            for i, field_name in enumerate(schema.key_fields):
                 self[field_name] = value[i]
-        else:
-            raise TypeError('classmethod {0}.key_fields of type {1} is not of supported types: list, tuple'.
-                            format(self.__class__.__name__, type(self.key_fields())))
+        finally:
+            fields.restore_observed(released, self, schema.key_fields)
 
     @classmethod
     def key_fields(cls):
@@ -150,91 +204,272 @@ class BaseDocument(object):
         return self.to_json()
 
     def validate(self):
-        """Ensure that all fields' values are valid and that non-nullable fields are present. """
-        for field_name, field_obj in self._fields.items():
-            value = field_obj.__get__(self, self.__class__)
-
-            if value is None and field_obj.null is False:
-                raise ValidationError(f'Non-nullable field {field_name} is set to None')
-            elif value is None and field_obj.null is True:
-                # no further validations are possible on NoneType field
+        """Ensure that all fields' values are valid and that non-nullable fields are present.
+        In the deferred validation mode, only values of the pending fields are validated,
+        while the presence of the non-nullable fields is verified for all fields. Documents of the classes without
+        `deferred_validation`, loaded in the deferred mode per call, return to the immediate validation once valid.
+        See odm.codegen for the generated validator """
+        self._schema.validate(self)
+
+    def to_json(self, only=None, exclude=None):
+        """Converts given document to JSON dict.
+        Fields with None value are skipped. See odm.codegen for the generated serializer
+        :param only: (optional) list of the field names, or dotted paths into the nested documents, to convert;
+            all fields are converted if not set
+        :param exclude: (optional) list of the field names, or dotted paths into the nested documents, to skip
+        :raise FieldDoesNotExist if any of the paths is not known """
+        if only is not None or exclude is not None:
+            return self._schema.projected_to_json(only, exclude)(self)
+        data = self._data
+        if data.__class__ is LazyData and data._raw:
+            return data.to_json(self)
+        return self._schema.to_json(self)
+
+    def to_json_str(self):
+        """ :return: JSON text of the document; identical to `json.dumps(document.to_json())`, but written
+            directly from the field values with the keys pre-escaped once per class. See odm.codegen """
+        data = self._data
+        if data.__class__ is LazyData and data._raw:
+            return json.dumps(data.to_json(self))
+        return self._schema.to_json_str(self)
+
+    def to_json_bytes(self):
+        """ :return: UTF-8 encoded `to_json_str()` """
+        return self.to_json_str().encode('utf-8')
+
+    def clone(self):
+        """ :return: new document of the same class with the same field values.
+        Immutable values (strings, numbers, datetimes) are shared. Values of the ListField, DictField and
+        NestedDocumentField are shared too, and are copied by the document or the clone on the first read
+        through the descriptor. Values of any other fields are copied immediately.
+        NOTE: the clone is not a snapshot with respect to the lists, dicts and nested documents read from the document
+        before the cloning: the caller's references to them still point to the values shared with the clone,
+        so that their in-place modifications are visible in both. Read the field again after the cloning to modify
+        the document's own copy, or use `copy.deepcopy` for an independent snapshot.
+        NOTE: the clone is not tracked for changes, i.e. its `to_json_delta()` contains the whole document """
+        schema = self._schema
+        klass = self.__class__
+        data = self._data.copy()
+
+        is_lazy = data.__class__ is LazyData
+        shared = set()
+        for field_name in list(dict.keys(data) if is_lazy else data.keys()):
+            value = data[field_name]
+            if value is None or value.__class__ in fields.IMMUTABLE_TYPES:
                 continue
-
-            if isinstance(field_obj, NestedDocumentField):
-                value.validate()
+            field_obj = schema.fields[field_name]
+            if isinstance(field_obj, fields.CopyOnAccessField):
+                shared.add(field_name)
             else:
-                field_obj.validate(value)
-
-    def to_json(self):
-        """Converts given document to JSON dict. """
-        json_data = dict()
-
-        for field_name, field_obj in self._fields.items():
-            if isinstance(field_obj, NestedDocumentField):
-                nested_document = field_obj.__get__(self, self.__class__)
-                value = None if nested_document is None else nested_document.to_json()
-            elif isinstance(field_obj, BaseField):
-                value = field_obj.__get__(self, self.__class__)
-                value = field_obj.to_json(value)
-            else:
-                # ignore fields not derived from BaseField or NestedDocument
-                continue
+                data[field_name] = field_obj.copy_value(value)
+
+        if is_lazy:
+            # pending raw values are JSON scalars, lists and dicts
+            for field_name, value in data._raw.items():
+                if value.__class__ in fields.IMMUTABLE_TYPES:
+                    continue
+                if isinstance(schema.fields[field_name], fields.CopyOnAccessField):
+                    shared.add(field_name)
+                else:
+                    data._raw[field_name] = copy.deepcopy(value)
+
+        new_instance = klass.__new__(klass)
+        new_instance._data = data
+        new_instance._pending = None if self._pending is None else set(self._pending)
+        new_instance._changes = None
+        new_instance._shared = shared or None
+        new_instance._key = self._key
+        if shared:
+            if self._shared is None:
+                self._shared = set()
+            self._shared.update(shared)
+        return new_instance
 
-            if value is None:
-                # skip fields with None value 
-                continue
+    def mark_clean(self):
+        """ Resets the change tracking: the current state of the document, including its nested documents,
+        becomes the base of the `to_json_delta()`. Starts the tracking, if the document was not tracked before """
+        changes.mark_clean(self)
 
-            json_data[field_name] = value
+    def to_json_delta(self):
+        """ :return: changes since the document was loaded or marked clean as
+            {'$set': {dotted path: JSON value}, '$unset': {dotted path: ''}}. Assigned and deleted fields are
+            detected by the descriptors; lists and dicts modified in place are detected by comparison
+            with their snapshots. See odm.changes """
+        return changes.to_json_delta(self)
 
-        return json_data
+    def to_bytes(self):
+        """ :return: compact binary representation of the document; see odm.binary for the layout """
+        return binary.to_bytes(self)
+
+    @classmethod
+    def from_bytes(cls, data, validate=True):
+        """ Converts the output of `to_bytes` into a new document instance
+        :param data: bytes-like object
+        :param validate: if True, decoded values are validated the same way as the values assigned to the fields
+        :raise ValueError if the data was serialized by a document class with a different schema """
+        new_instance = binary.from_bytes(cls, data, validate)
+        if cls._schema.track_changes:
+            new_instance.mark_clean()
+        return new_instance
 
     @classmethod
     def _get_fields(cls):
-        _fields = dict()
-        for field_name in dir(cls):
-            field_obj = getattr(cls, field_name)
-            if isinstance(field_obj, BaseField):
-                _fields[field_obj.name] = field_obj
-            else:
-                continue
-        return _fields
+        """ :return: {field name: field} map from the class schema. NOTE: the map is shared and must not be modified """
+        return cls._schema.fields
 
     @classmethod
     def _get_attributes(cls):
-        _attributes = dict()
-        for attribute_name in dir(cls):
-            attribute_obj = getattr(cls, attribute_name)
-            if isinstance(attribute_obj, BaseField):
-                _attributes[attribute_name] = attribute_obj
-            else:
-                continue
-        return _attributes
+        """ :return: {attribute name: field} map from the class schema.
+            NOTE: the map is shared and must not be modified """
+        return cls._schema.attributes
 
     @classmethod
     def _get_ordered_field_names(cls):
-        _fields = cls._get_fields()
-        return [f[1].name for f in sorted(_fields.items(), key=lambda entry: entry[1].creation_counter)]
+        return list(cls._schema.ordered_field_names)
+
+    @classmethod
+    def from_json(cls, json_data, deferred_validation=None, only=None, exclude=None):
+        """ Converts json data to a new document instance. See odm.codegen for the generated deserializer
+        :param deferred_validation: (optional) if True, the values are not validated until `validate()` is called;
+            if False, the values are validated immediately. Defaults to the class' `deferred_validation`
+        :param only: (optional) list of the field names, or dotted paths into the nested documents, to convert;
+            other fields are left unset. All fields are converted if not set
+        :param exclude: (optional) list of the field names, or dotted paths into the nested documents, to skip
+        :raise FieldDoesNotExist if any of the paths is not known """
+        if deferred_validation is None:
+            deferred_validation = cls._schema.deferred_validation
+        if only is not None or exclude is not None:
+            new_instance = cls._schema.projected_from_json(only, exclude, deferred_validation)(cls, json_data)
+        elif deferred_validation:
+            new_instance = cls._schema.from_json_deferred(cls, json_data)
+        else:
+            new_instance = cls._schema.from_json(cls, json_data)
+        if cls._schema.track_changes:
+            new_instance.mark_clean()
+        return new_instance
+
+    @classmethod
+    def from_json_str(cls, text, deferred_validation=None):
+        """ Converts JSON text to a new document instance. The text is parsed by the C-accelerated stdlib decoder,
+        that shares the key strings repeated within the text. Known fields are picked by the generated deserializer,
+        nested objects are routed to the nested Document classes, and unknown keys are ignored
+        :param text: str, bytes or bytearray; bytes are decoded from UTF-8, UTF-16 or UTF-32
+        :param deferred_validation: (optional) see `from_json`
+        :raise ValueError if the text is not a valid JSON, or if it is not a JSON object """
+        json_data = json.loads(text)
+        if json_data.__class__ is not dict:
+            raise ValueError(f'{cls.__name__}.from_json_str expects JSON object, rather than {type(json_data)}')
+        return cls.from_json(json_data, deferred_validation=deferred_validation)
 
     @classmethod
-    def from_json(cls, json_data):
-        """ Converts json data to a new document instance"""
+    def from_json_lazy(cls, json_data):
+        """ Converts json data to a new document instance, that defers conversion and validation of every field
+        until the field is first read. Raw values of the fields that were never read are passed by `to_json` as is.
+        NOTE: errors in the raw values are reported on the field access, rather than by this method """
         new_instance = cls()
-        for field_name, field_obj in cls._get_fields().items():
-            if isinstance(field_obj, NestedDocumentField):
-                if field_name in json_data:
-                    nested_field = field_obj.__get__(new_instance, new_instance.__class__)
-                    if not nested_field:
-                        # here, we have to create an instance of the nested document,
-                        # since we have a JSON object for it
-                        nested_field = field_obj.nested_klass()
-
-                    nested_document = nested_field.from_json(json_data[field_name])
-                    field_obj.__set__(new_instance, nested_document)
-            elif isinstance(field_obj, BaseField):
-                if field_name in json_data:
-                    value = field_obj.from_json(json_data[field_name])
-                    field_obj.__set__(new_instance, value)
-            else:
+        raw, nullified = dict(), list()
+        for field_name in cls._schema.fields:
+            if field_name not in json_data:
                 continue
-
+            value = json_data[field_name]
+            if value is None:
+                nullified.append(field_name)
+            else:
+                raw[field_name] = value
+
+        new_instance._data = LazyData(cls, raw)
+        for field_name in nullified:
+            # None values are cheap to apply, and are subject to the field's `null` and `default` rules
+            cls._schema.fields[field_name].__set__(new_instance, None)
+        if cls._schema.track_changes:
+            new_instance.mark_clean()
         return new_instance
+
+    @staticmethod
+    def _complete_batch(results, errors, collected_errors):
+        if collected_errors is not None:
+            collected_errors.extend(errors)
+        elif errors:
+            raise BatchError(errors, results)
+        return results
+
+    @classmethod
+    def from_json_many(cls, json_iterable, errors=None, deferred_validation=None):
+        """ Converts iterable of json dicts into a list of new document instances.
+        :param json_iterable: list or iterable of json dicts
+        :param errors: (optional) list to which (row index, exception) tuples of the failed rows are appended.
+            Failed rows are skipped and do not interrupt the batch
+        :param deferred_validation: (optional) see `from_json`
+        :return: list of documents
+        :raise BatchError after the whole batch is processed, if any row failed and `errors` is not given """
+        if deferred_validation is None:
+            deferred_validation = cls._schema.deferred_validation
+        batch_errors = list()
+        if deferred_validation:
+            results = cls._schema.from_json_many_deferred(cls, json_iterable, batch_errors)
+        else:
+            results = cls._schema.from_json_many(cls, json_iterable, batch_errors)
+        if cls._schema.track_changes:
+            for document in results:
+                document.mark_clean()
+        return cls._complete_batch(results, batch_errors, errors)
+
+    @classmethod
+    def compile_query(cls, query_spec):
+        """ :return: function(json_data) -> bool, matching the raw JSON dicts of the class against
+            the MongoDB-style query. See odm.query for the supported operators
+        :raise FieldDoesNotExist if any path of the query is not known
+        :raise ValueError if the query is malformed """
+        return query.compile_query(cls, query_spec)
+
+    @classmethod
+    def from_json_where(cls, json_iterable, query_spec, errors=None, deferred_validation=None):
+        """ Converts only the JSON dicts matching the query into a list of new document instances.
+        Rows that do not match are neither converted nor validated
+        :param query_spec: MongoDB-style query, or the predicate returned by `compile_query`
+        :param errors: (optional) see `from_json_many`; row indexes refer to the `json_iterable`
+        :param deferred_validation: (optional) see `from_json`
+        :return: list of documents """
+        predicate = query_spec if callable(query_spec) else query.compile_query(cls, query_spec)
+        matching_rows, row_indexes = list(), list()
+        for index, json_data in enumerate(json_iterable):
+            if predicate(json_data):
+                matching_rows.append(json_data)
+                row_indexes.append(index)
+
+        batch_errors = list()
+        results = cls.from_json_many(matching_rows, errors=batch_errors, deferred_validation=deferred_validation)
+        batch_errors = [(row_indexes[index], e) for index, e in batch_errors]
+        return cls._complete_batch(results, batch_errors, errors)
+
+    @classmethod
+    def to_json_many(cls, documents, errors=None):
+        """ Converts iterable of documents into a list of JSON dicts.
+        :param documents: list or iterable of documents
+        :param errors: (optional) list to which (row index, exception) tuples of the failed rows are appended.
+            Failed rows are skipped and do not interrupt the batch
+        :return: list of JSON dicts
+        :raise BatchError after the whole batch is processed, if any row failed and `errors` is not given """
+        batch_errors = list()
+        results = cls._schema.to_json_many(documents, batch_errors)
+        return cls._complete_batch(results, batch_errors, errors)
+
+    @classmethod
+    def validate_many(cls, documents, errors=None):
+        """ Validates every document in the iterable.
+        :param documents: list or iterable of documents
+        :param errors: (optional) list to which (row index, exception) tuples of the invalid rows are appended
+        :return: list of valid documents
+        :raise BatchError after the whole batch is processed, if any row is invalid and `errors` is not given """
+        batch_errors = list()
+        results = list()
+        for index, document in enumerate(documents):
+            try:
+                document.validate()
+                results.append(document)
+            except Exception as e:
+                batch_errors.append((index, e))
+        return cls._complete_batch(results, batch_errors, errors)
+
+
+BaseDocument._build_schema()
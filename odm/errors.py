@@ -24,3 +24,20 @@ class ValidationError(AssertionError):
             if self.errors:
                 message = f'{message}({self._format_errors()})'
         return message
+
+
+class BatchError(Exception):
+    """ Batch processing exception: raised once the whole batch is processed, if any of its rows has failed. """
+
+    def __init__(self, errors, results=None):
+        """
+        :param errors: list of (row index, exception) tuples
+        :param results: list of successfully processed rows
+        """
+        super(BatchError, self).__init__(errors)
+        self.errors = errors
+        self.results = results if results is not None else list()
+
+    def __str__(self):
+        details = '; '.join(f'#{index}: {e}' for index, e in self.errors[:10])
+        return f'{len(self.errors)} row(s) failed: {details}'
@@ -1,12 +1,116 @@
 __author__ = 'Bohdan Mushkevych'
 
 import re
+import copy
 import decimal
 import datetime
+import functools
+import weakref
 
+from odm import views
 from odm.errors import ValidationError
 DEFAULT_DT_FORMAT = '%Y-%m-%d %H:%M:%S'
 
+# {ISO-like datetime format: regex of the exact string shape, that is parsed identically by the fromisoformat}
+ISO_DT_FORMATS = {
+    '%Y-%m-%d %H:%M:%S': r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}',
+    '%Y-%m-%dT%H:%M:%S': r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}',
+    '%Y-%m-%d %H:%M:%S.%f': r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{6}',
+    '%Y-%m-%dT%H:%M:%S.%f': r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{6}',
+    '%Y-%m-%d %H:%M': r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}',
+    '%Y-%m-%d': r'\d{4}-\d{2}-\d{2}',
+}
+
+
+# types of values, that are shared rather than copied by the copy-on-access fields
+IMMUTABLE_TYPES = frozenset([str, bytes, int, float, bool, decimal.Decimal, datetime.datetime, datetime.date])
+
+
+def _copy_item(value):
+    return value if value.__class__ in IMMUTABLE_TYPES else copy.deepcopy(value)
+
+
+def _memoized(convert):
+    """ :return: function(iterable) -> list, converting every distinct string value of the iterable only once """
+    def convert_many(values):
+        memo = dict()
+        results = list()
+        for value in values:
+            if value.__class__ is str:
+                converted = memo.get(value)
+                if converted is None:
+                    converted = memo[value] = convert(value)
+                results.append(converted)
+            else:
+                results.append(convert(value))
+        return results
+
+    return convert_many
+
+
+def _compile_element_converters(element_field):
+    """ :return: tuple of functions (from_json_many, to_json_many), converting an iterable of the container's elements
+        into the list of Python values, and into the list of JSON values accordingly """
+    if isinstance(element_field, NestedDocumentField):
+        nested_klass = element_field.nested_klass
+
+        def from_json_many(values):
+            values = list(values)
+            if all(value.__class__ is dict for value in values):
+                errors = list()
+                results = nested_klass.from_json_many(values, errors)
+                if errors:
+                    raise errors[0][1]
+                return results
+            return [value if value is None or isinstance(value, nested_klass) else nested_klass.from_json(value)
+                    for value in values]
+
+        def to_json_many(values):
+            values = list(values)
+            if None in values:
+                return [None if value is None else value.to_json() for value in values]
+            errors = list()
+            results = nested_klass.to_json_many(values, errors)
+            if errors:
+                raise errors[0][1]
+            return results
+
+        return from_json_many, to_json_many
+
+    from_json, to_json = element_field.from_json, element_field.to_json
+    if isinstance(element_field, DecimalField) and element_field.fixed_point:
+        # elements are read through the container rather than the element's descriptor, so they are kept as
+        # quantized Decimals: scaled integers would be scaled again once the container is read and assigned back
+        from_json = element_field._to_decimal
+    if isinstance(element_field, (DateTimeField, DecimalField)):
+        from_json_many = _memoized(from_json)
+    else:
+        def from_json_many(values):
+            return [from_json(value) for value in values]
+
+    def to_json_many(values):
+        return [to_json(value) for value in values]
+
+    return from_json_many, to_json_many
+
+
+def release_observed(observers, instance, field_names):
+    """ Offers the document, whose observed fields are about to change, to the observers (see odm.collection)
+    :param field_names: tuple of names of the changing fields
+    :return: list of observers that hold the document, and have released it for the duration of the change """
+    return [observer for observer in list(observers) if observer._release(instance, field_names)]
+
+
+def restore_observed(released, instance, field_names):
+    """ Returns the changed document to the observers that have released it """
+    for observer in released:
+        observer._restore(instance, field_names)
+
+
+def _accept(value):
+    """ validator of the fields without constraints """
+    pass
+
 
 class BaseField:
     """A base class for fields in a Synergy ODM document. Instances of this class
@@ -16,6 +120,12 @@ class BaseField:
     # Each time a Field instance is created the counter should be increased
     creation_counter = 0
 
+    # weakref.WeakSet of objects indexing the documents by the value of this field, i.e. odm.collection; None otherwise
+    _observers = None
+
+    # validator function compiled on the first use by the `validate`; reset once any public attribute changes
+    _validator = None
+
     def __init__(self, name:str=None, default=None, choices=None, verbose_name:str=None, null:bool=False):
         """
         :param name: (optional) name of the field in the JSON document
@@ -47,6 +157,10 @@ class BaseField:
             value = value()
         return value
 
+    def _stored_default(self):
+        """ :return: default value in the form it is kept in the document's `_data` """
+        return self.default
+
     def initialized(self, instance):
         if instance is None:
             # Document class being used rather than a document object. Guessing True
@@ -65,35 +179,91 @@ class BaseField:
             return value
 
         # value is None at this point
-        if self.default is not None:
-            value = self.default
+        value = self._stored_default()
+        if value is not None:
             self.validate(value)
             instance._data[self.name] = value
         return value
 
     def __set__(self, instance, value):
-        """ Descriptor for assigning a value to a field in a document. """
-        if value is not None:
-            self.validate(value)
-            instance._data[self.name] = value
-        elif self.null:
-            # value is None and self.null is True
-            # skip validation; force setting value to None
-            instance._data[self.name] = value
-        elif self.default is not None:
-            # value is None and self.null is False and self.default is not None
-            value = self.default
-            self.validate(value)
-            instance._data[self.name] = value
-        else:
-            # value is None and self.null is False and self.default is None
-            # let the self.validate take care of reporting the exception
-            self.validate(value)
-            instance._data[self.name] = value
+        """ Descriptor for assigning a value to a field in a document.
+        Documents in the deferred validation mode skip the validation and mark the field as pending instead.
+        Tracked documents register the field as changed, and observed documents are re-indexed by their observers """
+        observers = self._observers
+        released = release_observed(observers, instance, (self.name,)) if observers else None
+        try:
+            # the cached key of the document is invalidated by the assignment of any field
+            instance._key = None
+            changes = instance._changes
+            if changes is not None:
+                changes.add(self.name)
+
+            pending = instance._pending
+            if value is not None:
+                if pending is None:
+                    self.validate(value)
+                else:
+                    pending.add(self.name)
+                instance._data[self.name] = value
+            elif self.null:
+                # value is None and self.null is True
+                # skip validation; force setting value to None
+                instance._data[self.name] = value
+            elif self.default is not None:
+                # value is None and self.null is False and self.default is not None
+                value = self._stored_default()
+                self.validate(value)
+                instance._data[self.name] = value
+            elif pending is not None:
+                # value is None and self.null is False and self.default is None
+                # BaseDocument.validate() will report the non-nullable field set to None
+                pending.add(self.name)
+                instance._data[self.name] = value
+            else:
+                # value is None and self.null is False and self.default is None
+                # let the self.validate take care of reporting the exception
+                self.validate(value)
+                instance._data[self.name] = value
+        finally:
+            if released:
+                restore_observed(released, instance, (self.name,))
 
     def __delete__(self, instance):
         if self.name in instance._data:
-            del instance._data[self.name]
+            observers = self._observers
+            released = release_observed(observers, instance, (self.name,)) if observers else None
+            try:
+                instance._key = None
+                del instance._data[self.name]
+            finally:
+                if released:
+                    restore_observed(released, instance, (self.name,))
+            changes = instance._changes
+            if changes is not None:
+                changes.add(self.name)
+
+    def add_observer(self, observer):
+        """ Registers the observer of the field changes in any document; the observer is referenced weakly.
+        Observers implement `_release(document, field_names) -> bool`, called before the fields of the document
+        are changed, and `_restore(document, field_names)`, called after the change for the observers
+        that have released the document """
+        if self._observers is None:
+            self._observers = weakref.WeakSet()
+        self._observers.add(observer)
+
+    def remove_observer(self, observer):
+        if self._observers is not None:
+            self._observers.discard(observer)
+
+    def copy_value(self, value):
+        """ :return: copy of the value, that can be modified independently of the original """
+        return copy.deepcopy(value)
+
+    def __setattr__(self, name, value):
+        super(BaseField, self).__setattr__(name, value)
+        if not name.startswith('_'):
+            # constraints may have changed: the validator is re-compiled on its next use
+            self.__dict__.pop('_validator', None)
 
     def __set_name__(self, owner, name):
         if hasattr(self, 'name') and self.name is not None:
@@ -116,23 +286,88 @@ class BaseField:
 
     def validate(self, value):
         """Performs validation of the value.
+        All constraints of the field are compiled into a single validator function on its first use;
+        see `_compile_validator`
         :param value: value to validate
         :raise ValidationError if the value is invalid"""
+        validator = self._validator
+        if validator is None:
+            validator = self._validator = self._compile_validator()
+        validator(value)
+
+    def _compile_choices(self):
+        """ :return: function(value) verifying that the value is listed among the choices,
+            or None if the field has no choices """
+        if not self.choices:
+            return None
+
+        if isinstance(self.choices[0], (list, tuple)):
+            option_keys = [k for k, v in self.choices]
+            displayed = option_keys
+        else:
+            option_keys = list(self.choices)
+            displayed = self.choices
+
+        try:
+            options = frozenset(option_keys)
+        except TypeError:
+            # unhashable choices
+            options = option_keys
+        raise_error = self.raise_error
+
+        def check_choices(value):
+            try:
+                is_valid = value in options
+            except TypeError:
+                # unhashable value
+                is_valid = value in option_keys
+            if not is_valid:
+                raise_error(f'Value {value} is not listed among valid choices {displayed}')
+
+        return check_choices
+
+    def _compile_validator(self):
+        """ :return: function(value) performing all validations of the field.
+            The function captures the constraints' values; it is re-compiled once any public attribute changes """
+        check_choices = self._compile_choices()
+        return check_choices if check_choices is not None else _accept
+
+
+class CopyOnAccessField(BaseField):
+    """ Base class for fields holding mutable values: lists, dicts and nested documents.
+    Values of these fields are shared between the document and its clone, until either of them accesses the field
+    through the descriptor. The copy is made on the first read, rather than on the first mutation, since in-place
+    modifications of the returned list or dict can not be intercepted; assignments and deletions replace the shared
+    value without copying it. See BaseDocument.clone """
+
+    def __get__(self, instance, owner):
+        if instance is not None and instance._shared and self.name in instance._shared:
+            self._unshare(instance)
+        return super(CopyOnAccessField, self).__get__(instance, owner)
+
+    def __set__(self, instance, value):
+        if instance._shared:
+            instance._shared.discard(self.name)
+        super(CopyOnAccessField, self).__set__(instance, value)
 
-        # check choices
-        if self.choices:
-            if isinstance(self.choices[0], (list, tuple)):
-                option_keys = [k for k, v in self.choices]
-                if value not in option_keys:
-                    msg = f'Value {value} is not listed among valid choices {option_keys}'
-                    self.raise_error(msg)
-            elif value not in self.choices:
-                msg = f'Value {value} is not listed among valid choices {self.choices}'
-                self.raise_error(msg)
+    def __delete__(self, instance):
+        if instance._shared:
+            instance._shared.discard(self.name)
+        super(CopyOnAccessField, self).__delete__(instance)
+
+    def _unshare(self, instance):
+        """ replaces the value shared between the document and its clone with a private copy """
+        instance._shared.discard(self.name)
+        value = instance._data.get(self.name)
+        if value is not None:
+            instance._data[self.name] = self.copy_value(value)
 
 
-class NestedDocumentField(BaseField):
-    """ Field wraps a stand-alone Document """
+class NestedDocumentField(CopyOnAccessField):
+    """ Field wraps a stand-alone Document.
+    Unless the `default` is given, the default of the non-nullable field is virtual: reading the unset field
+    returns an empty view of the nested Document, which is replaced by a real document on the first write into it.
+    Until then, the field remains unset and is skipped by the `to_json`. See odm.views """
 
     def __init__(self, nested_klass, **kwargs):
         """
@@ -140,44 +375,168 @@ class NestedDocumentField(BaseField):
         :param kwargs: standard set of arguments from the BaseField
         """
         self.nested_klass = nested_klass
+        self.virtual_default = 'default' not in kwargs
         kwargs.setdefault('default', lambda: nested_klass())
         super(NestedDocumentField, self).__init__(**kwargs)
 
-    def validate(self, value):
+    def __get__(self, instance, owner):
+        if instance is not None and self.virtual_default and not self.null \
+                and instance._data.get(self.name) is None:
+            return views.get_view(self.nested_klass, instance, self)
+        return super(NestedDocumentField, self).__get__(instance, owner)
+
+    def copy_value(self, value):
+        return value.clone()
+
+    def _compile_validator(self):
         """Make sure that value is of the right type """
-        if not isinstance(value, self.nested_klass):
-            self.raise_error('NestedClass is of the wrong type: {0} vs expected {1}'
-                             .format(value.__class__.__name__, self.nested_klass.__name__))
-        super(NestedDocumentField, self).validate(value)
+        nested_klass = self.nested_klass
+        check_choices = self._compile_choices()
+        raise_error = self.raise_error
 
+        def validate(value):
+            if not isinstance(value, nested_klass):
+                raise_error('NestedClass is of the wrong type: {0} vs expected {1}'
+                            .format(value.__class__.__name__, nested_klass.__name__))
+            if check_choices is not None:
+                check_choices(value)
 
-class ListField(BaseField):
-    """ Field represents standard Python collection `list` """
+        return validate
 
-    def __init__(self, **kwargs):
+
+class ListField(CopyOnAccessField):
+    """ Field represents standard Python collection `list`.
+    If the element field is given, i.e. `ListField(DateTimeField())`, every element of the list is converted
+    and validated by the element field. Conversions process the whole list in a single pass """
+
+    def __init__(self, field=None, **kwargs):
+        """
+        :param field: (optional) BaseField-derived instance describing elements of the list
+        :param kwargs: standard set of arguments from the BaseField
+        """
+        self.element_field = field
+        if field is not None:
+            self._from_json_many, self._to_json_many = _compile_element_converters(field)
         kwargs.setdefault('default', lambda: [])
         super(ListField, self).__init__(**kwargs)
 
-    def validate(self, value):
-        """Make sure that the inspected value is of type `list` or `tuple` """
-        if not isinstance(value, (list, tuple)):
-            self.raise_error(f'Only lists and tuples may be used in the ListField vs provided {type(value).__name__}')
-        super(ListField, self).validate(value)
+    def __set__(self, instance, value):
+        if self.element_field is not None:
+            value = self.from_json(value)
+        super(ListField, self).__set__(instance, value)
 
+    def from_json(self, value):
+        if self.element_field is None or not isinstance(value, (list, tuple)):
+            # values of the wrong type are reported by the `validate`
+            return value
+        return self._from_json_many(value)
 
-class DictField(BaseField):
+    def to_json(self, value):
+        if self.element_field is None or not isinstance(value, (list, tuple)):
+            return value
+        return self._to_json_many(value)
+
+    def copy_value(self, value):
+        if isinstance(self.element_field, NestedDocumentField):
+            return [None if item is None else item.clone() for item in value]
+        if value.__class__ is list:
+            return [_copy_item(item) for item in value]
+        return copy.deepcopy(value)
+
+    def _compile_validator(self):
+        """Make sure that the inspected value is of type `list` or `tuple`, and its elements are valid """
+        check_choices = self._compile_choices()
+        raise_error = self.raise_error
+        element_field = self.element_field
+
+        def validate(value):
+            if not isinstance(value, (list, tuple)):
+                raise_error(f'Only lists and tuples may be used in the ListField vs provided {type(value).__name__}')
+            if check_choices is not None:
+                check_choices(value)
+            if element_field is None:
+                return
+
+            validate_element, null = element_field.validate, element_field.null
+            for index, element in enumerate(value):
+                if element is None:
+                    if not null:
+                        raise_error(f'Element {index} is None')
+                    continue
+                try:
+                    validate_element(element)
+                except ValidationError as e:
+                    raise_error(f'Element {index}: {e}')
+
+        return validate
+
+
+class DictField(CopyOnAccessField):
     """A dictionary field that wraps a standard Python dictionary. This is
-    similar to an embedded document, but the structure is not defined. """
+    similar to an embedded document, but the structure is not defined.
+    If the value field is given, i.e. `DictField(value=DecimalField())`, every value of the dictionary is converted
+    and validated by the value field. Conversions process the whole dictionary in a single pass """
 
-    def __init__(self, **kwargs):
+    def __init__(self, value=None, **kwargs):
+        """
+        :param value: (optional) BaseField-derived instance describing values of the dictionary
+        :param kwargs: standard set of arguments from the BaseField
+        """
+        self.element_field = value
+        if value is not None:
+            self._from_json_many, self._to_json_many = _compile_element_converters(value)
         kwargs.setdefault('default', lambda: {})
         super(DictField, self).__init__(**kwargs)
 
-    def validate(self, value):
-        """Make sure that the inspected value is of type `dict` """
-        if not isinstance(value, dict):
-            self.raise_error(f'Only Python dict may be used in the DictField vs provided {type(value).__name__}')
-        super(DictField, self).validate(value)
+    def __set__(self, instance, value):
+        if self.element_field is not None:
+            value = self.from_json(value)
+        super(DictField, self).__set__(instance, value)
+
+    def from_json(self, value):
+        if self.element_field is None or not isinstance(value, dict):
+            # values of the wrong type are reported by the `validate`
+            return value
+        return dict(zip(value.keys(), self._from_json_many(value.values())))
+
+    def to_json(self, value):
+        if self.element_field is None or not isinstance(value, dict):
+            return value
+        return dict(zip(value.keys(), self._to_json_many(value.values())))
+
+    def copy_value(self, value):
+        if isinstance(self.element_field, NestedDocumentField):
+            return {key: None if item is None else item.clone() for key, item in value.items()}
+        if value.__class__ is dict:
+            return {key: _copy_item(item) for key, item in value.items()}
+        return copy.deepcopy(value)
+
+    def _compile_validator(self):
+        """Make sure that the inspected value is of type `dict`, and its values are valid """
+        check_choices = self._compile_choices()
+        raise_error = self.raise_error
+        element_field = self.element_field
+
+        def validate(value):
+            if not isinstance(value, dict):
+                raise_error(f'Only Python dict may be used in the DictField vs provided {type(value).__name__}')
+            if check_choices is not None:
+                check_choices(value)
+            if element_field is None:
+                return
+
+            validate_element, null = element_field.validate, element_field.null
+            for key, element in value.items():
+                if element is None:
+                    if not null:
+                        raise_error(f'Value of the key {key} is None')
+                    continue
+                try:
+                    validate_element(element)
+                except ValidationError as e:
+                    raise_error(f'Value of the key {key}: {e}')
+
+        return validate
 
 
 class StringField(BaseField):
@@ -208,22 +567,30 @@ class StringField(BaseField):
                 pass
             return value
 
-    def validate(self, value):
-        if not isinstance(value, (bytes, str)):
-            self.raise_error(f'Only string types may be used in the StringField vs provided {type(value).__name__}')
+    def _compile_validator(self):
+        min_length, max_length, regex = self.min_length, self.max_length, self.regex
+        check_choices = self._compile_choices()
+        raise_error = self.raise_error
+
+        def validate(value):
+            if not isinstance(value, (bytes, str)):
+                raise_error(f'Only string types may be used in the StringField vs provided {type(value).__name__}')
 
-        if self.max_length is not None and len(value) > self.max_length:
-            self.raise_error('StringField value {0} length {1} is longer than max_length {2}'
-                             .format(value, len(value), self.max_length))
+            if max_length is not None and len(value) > max_length:
+                raise_error('StringField value {0} length {1} is longer than max_length {2}'
+                            .format(value, len(value), max_length))
 
-        if self.min_length is not None and len(value) < self.min_length:
-            self.raise_error('StringField value {0} length {1} is shorter than min_length {2}'
-                             .format(value, len(value), self.min_length))
+            if min_length is not None and len(value) < min_length:
+                raise_error('StringField value {0} length {1} is shorter than min_length {2}'
+                            .format(value, len(value), min_length))
 
-        if self.regex is not None and self.regex.match(value) is None:
-            self.raise_error(f'StringField value "{value}" did not match validation regex "{self.regex}"')
+            if regex is not None and regex.match(value) is None:
+                raise_error(f'StringField value "{value}" did not match validation regex "{regex}"')
 
-        super(StringField, self).validate(value)
+            if check_choices is not None:
+                check_choices(value)
+
+        return validate
 
 
 class IntegerField(BaseField):
@@ -250,26 +617,39 @@ class IntegerField(BaseField):
             pass
         return value
 
-    def validate(self, value):
-        try:
-            value = int(value)
-        except:
-            self.raise_error(f'Could not parse {value} into an Integer')
+    def _compile_validator(self):
+        min_value, max_value = self.min_value, self.max_value
+        check_choices = self._compile_choices()
+        raise_error = self.raise_error
 
-        if self.min_value is not None and value < self.min_value:
-            self.raise_error(f'IntegerField value {value} is lower than min value {self.min_value}')
+        def validate(value):
+            if value.__class__ is not int:
+                try:
+                    value = int(value)
+                except:
+                    raise_error(f'Could not parse {value} into an Integer')
 
-        if self.max_value is not None and value > self.max_value:
-            self.raise_error(f'IntegerField value {value} is larger than max value {self.max_value}')
+            if min_value is not None and value < min_value:
+                raise_error(f'IntegerField value {value} is lower than min value {min_value}')
 
-        super(IntegerField, self).validate(value)
+            if max_value is not None and value > max_value:
+                raise_error(f'IntegerField value {value} is larger than max value {max_value}')
+
+            if check_choices is not None:
+                check_choices(value)
+
+        return validate
 
 
 class DecimalField(BaseField):
-    """A fixed-point decimal number field. """
+    """A fixed-point decimal number field.
+    By default, the value is stored as `decimal.Decimal`. With `fixed_point=True` the value is stored as an integer
+    scaled by 10**precision, i.e. 123.45 with precision=2 is stored as 12345. In this mode, the conversions to and from
+    the Decimal happen only at the JSON boundary, while the validation compares plain integers.
+    In both modes, reading the field returns a float (or a string if `force_string` is set). """
 
     def __init__(self, min_value=None, max_value=None, force_string=False,
-                 precision=2, rounding=decimal.ROUND_HALF_UP, **kwargs):
+                 precision=2, rounding=decimal.ROUND_HALF_UP, fixed_point=False, **kwargs):
         """
         :param min_value: Validation rule for the minimum acceptable value.
         :param max_value: Validation rule for the maximum acceptable value.
@@ -288,16 +668,27 @@ class DecimalField(BaseField):
                                   otherwise towards zero)
 
             Defaults to: ``decimal.ROUND_HALF_UP``
+        :param fixed_point: Store the value as an integer scaled by 10**precision.
 
         """
         self.force_string = force_string
         self.precision = precision
         self.rounding = rounding
-        self.min_value = self.from_json(min_value)
-        self.max_value = self.from_json(max_value)
+        self.fixed_point = fixed_point
+
+        # quantize exponent, i.e. Decimal('0.01') for precision=2, and the integer scale, i.e. 100 for precision=2
+        self._exponent = decimal.Decimal(1).scaleb(-precision)
+        self._scale = 10 ** precision
+
+        self.min_value = self._to_decimal(min_value)
+        self.max_value = self._to_decimal(max_value)
 
         super(DecimalField, self).__init__(**kwargs)
 
+    def _stored_default(self):
+        # default values are stored in the same form as the assigned ones, i.e. scaled in the fixed_point mode
+        return self.from_json(self.default)
+
     def __get__(self, instance, owner):
         value = super(DecimalField, self).__get__(instance, owner)
         if value is self:
@@ -308,48 +699,124 @@ class DecimalField(BaseField):
         value = self.from_json(value)
         super(DecimalField, self).__set__(instance, value)
 
+    def _to_decimal(self, value):
+        """ :return: Decimal quantized to the precision; non-finite Decimals (NaN, Infinity) are returned as is;
+            values that can not be parsed are returned as is too, to be reported by the `validate` """
+        if value is None:
+            return value
+        if isinstance(value, decimal.Decimal):
+            if not value.is_finite():
+                return value
+        elif value.__class__ is int:
+            value = decimal.Decimal(value)
+        else:
+            try:
+                value = decimal.Decimal(str(value))
+            except decimal.InvalidOperation:
+                return value
+        return value.quantize(self._exponent, rounding=self.rounding)
+
+    def _to_scaled(self, value):
+        """ :return: integer equal to the value multiplied by 10**precision;
+            values that can not be parsed are returned as is, to be reported by the `validate` """
+        if value.__class__ is int:
+            return value * self._scale
+        if isinstance(value, decimal.Decimal):
+            value = value.quantize(self._exponent, rounding=self.rounding)
+        else:
+            value = self._to_decimal(value)
+            if not isinstance(value, decimal.Decimal):
+                return value
+        return int(value.scaleb(self.precision))
+
     def from_json(self, value):
         if value is None:
             # NoneType values are not jsonified by BaseDocument
             return value
 
-        if isinstance(value, decimal.Decimal):
-            return value
-        try:
-            value = decimal.Decimal(str(value))
-        except decimal.InvalidOperation:
-            return value
-        return value.quantize(decimal.Decimal('.{0}'.format('0' * self.precision)), rounding=self.rounding)
+        if self.fixed_point:
+            return self._to_scaled(value)
+        return self._to_decimal(value)
 
     def to_json(self, value):
+        """ NOTE: in the fixed_point mode, integer values are considered to be the stored scaled values,
+            while all other types represent the actual number """
         if value is None:
             # NoneType values are not jsonified by BaseDocument
             return value
 
+        if self.fixed_point:
+            if value.__class__ is not int:
+                value = self._to_scaled(value)
+            if self.force_string:
+                return str(decimal.Decimal(value).scaleb(-self.precision))
+            return value / self._scale
+
         if self.force_string:
-            return str(value)
+            # values that were not assigned through the descriptor, i.e. the defaults, are quantized too
+            return str(self._to_decimal(value))
+        elif isinstance(value, decimal.Decimal):
+            return float(value)
         else:
             return float(self.from_json(value))
 
-    def validate(self, value):
-        if not isinstance(value, decimal.Decimal):
-            if not isinstance(value, (bytes, str)):
-                value = str(value)
-            try:
-                value = decimal.Decimal(value)
-            except Exception:
-                self.raise_error(f'Could not parse {value} into a Decimal')
+    def _compile_validator(self):
+        if self.fixed_point:
+            return self._compile_scaled_validator()
+
+        min_value, max_value = self.min_value, self.max_value
+        check_choices = self._compile_choices()
+        raise_error = self.raise_error
 
-        if self.min_value is not None and value < self.min_value:
-            self.raise_error(f'DecimalField value {value} is lower than min value {self.min_value}')
+        def validate(value):
+            if not isinstance(value, decimal.Decimal):
+                if not isinstance(value, (bytes, str)):
+                    value = str(value)
+                try:
+                    value = decimal.Decimal(value)
+                except Exception:
+                    raise_error(f'Could not parse {value} into a Decimal')
 
-        if self.max_value is not None and value > self.max_value:
-            self.raise_error(f'DecimalField value {value} is larger than max value {self.max_value}')
+            if min_value is not None and value < min_value:
+                raise_error(f'DecimalField value {value} is lower than min value {min_value}')
 
-        # super.validate() checks if the value is among the list of allowed choices
-        # most likely, it will be the list of floats and integers
-        # as the Decimal does not support automatic comparison with the float, we will cast it
-        super(DecimalField, self).validate(float(value))
+            if max_value is not None and value > max_value:
+                raise_error(f'DecimalField value {value} is larger than max value {max_value}')
+
+            # choices are most likely the list of floats and integers
+            # as the Decimal does not support automatic comparison with the float, we will cast it
+            if check_choices is not None:
+                check_choices(float(value))
+
+        return validate
+
+    def _compile_scaled_validator(self):
+        """ validator of the fixed_point mode: all comparisons are performed on the scaled integers """
+        min_value, max_value, choices = self.min_value, self.max_value, self.choices
+        scaled_min_value = None if min_value is None else self._to_scaled(min_value)
+        scaled_max_value = None if max_value is None else self._to_scaled(max_value)
+        scaled_choices = None
+        if choices:
+            option_keys = [k for k, v in choices] if isinstance(choices[0], (list, tuple)) else choices
+            scaled_choices = frozenset(self._to_scaled(k) for k in option_keys)
+        to_scaled, to_json, raise_error = self._to_scaled, self.to_json, self.raise_error
+
+        def validate(value):
+            if value.__class__ is not int:
+                value = to_scaled(value)
+                if value.__class__ is not int:
+                    raise_error(f'Could not parse {value} into a Decimal')
+
+            if scaled_min_value is not None and value < scaled_min_value:
+                raise_error(f'DecimalField value {to_json(value)} is lower than min value {min_value}')
+
+            if scaled_max_value is not None and value > scaled_max_value:
+                raise_error(f'DecimalField value {to_json(value)} is larger than max value {max_value}')
+
+            if scaled_choices is not None and value not in scaled_choices:
+                raise_error(f'Value {to_json(value)} is not listed among valid choices {choices}')
+
+        return validate
 
 
 class BooleanField(BaseField):
@@ -383,9 +850,14 @@ class BooleanField(BaseField):
         else:
             raise ValueError(f'Could not parse {value} into a bool')
 
-    def validate(self, value):
-        if not isinstance(value, bool):
-            self.raise_error(f'Only boolean type may be used in the BooleanField vs provided {type(value).__name__}')
+    def _compile_validator(self):
+        raise_error = self.raise_error
+
+        def validate(value):
+            if not isinstance(value, bool):
+                raise_error(f'Only boolean type may be used in the BooleanField vs provided {type(value).__name__}')
+
+        return validate
 
 
 class DateTimeField(BaseField):
@@ -397,18 +869,64 @@ class DateTimeField(BaseField):
       in UTC and converted to the datetime object
     - During json serialization, value is converted to the string accordingly to dt_format. """
 
-    def __init__(self, dt_format=DEFAULT_DT_FORMAT, **kwargs):
+    def __init__(self, dt_format=DEFAULT_DT_FORMAT, cache_size=None, **kwargs):
+        """
+        :param dt_format: strptime/strftime format of the string values
+        :param cache_size: (optional) number of the most recently parsed string values to cache.
+            Useful when the same timestamps are repeated, for instance in bucketed data
+        """
         self.dt_format = dt_format
+        self.cache_size = cache_size
+        self._parse = self._select_parser(dt_format)
+        if cache_size:
+            self._parse = functools.lru_cache(maxsize=cache_size)(self._parse)
         super(DateTimeField, self).__init__(**kwargs)
 
+    @staticmethod
+    def _select_parser(dt_format):
+        """ :return: function(str) -> datetime, specialised for the given format
+            ISO-like formats are parsed by `datetime.fromisoformat`, once the string is verified to have the exact
+            shape of the format. Strings of any other shape, as well as all other formats, are parsed by `strptime`,
+            so the results and errors are the same as of `strptime` """
+
+        def parse_strptime(value):
+            return datetime.datetime.strptime(value, dt_format)
+
+        if dt_format not in ISO_DT_FORMATS:
+            return parse_strptime
+
+        match = re.compile(ISO_DT_FORMATS[dt_format], re.ASCII).fullmatch
+        fromisoformat = datetime.datetime.fromisoformat
+
+        def parse_iso(value):
+            if match(value) is not None:
+                try:
+                    return fromisoformat(value)
+                except ValueError:
+                    # out of range values: let the strptime report them
+                    pass
+            return parse_strptime(value)
+
+        return parse_iso
+
     def __set__(self, instance, value):
         value = self.from_json(value)
         super(DateTimeField, self).__set__(instance, value)
 
-    def validate(self, value):
-        new_value = self.to_json(value)
-        if not isinstance(new_value, (bytes, str)):
-            self.raise_error(f'Could not parse "{value}" into a date')
+    def _compile_validator(self):
+        to_json = self.to_json
+        raise_error = self.raise_error
+
+        def validate(value):
+            if isinstance(value, (datetime.datetime, datetime.date)):
+                # datetime objects are always representable in the dt_format
+                return
+
+            new_value = to_json(value)
+            if not isinstance(new_value, (bytes, str)):
+                raise_error(f'Could not parse "{value}" into a date')
+
+        return validate
 
     def to_json(self, value):
         if value is None:
@@ -429,8 +947,10 @@ class DateTimeField(BaseField):
 
         if isinstance(value, (datetime.datetime, datetime.date)):
             return value
-        if isinstance(value, (bytes, str)):
-            return datetime.datetime.strptime(value, self.dt_format)
+        if isinstance(value, str):
+            return self._parse(value)
+        if isinstance(value, bytes):
+            return self._parse(value.decode('utf-8'))
         if isinstance(value, (int, float)):
             return datetime.datetime.utcfromtimestamp(value)
         raise ValueError(f'DateTimeField.from_json expects data of string/int/float types vs {type(value).__name__}')
@@ -458,8 +978,13 @@ class ObjectIdField(BaseField):
             value = str(value)
         return value
 
-    def validate(self, value):
-        try:
-            str(value)
-        except:
-            self.raise_error(f'Could not parse {value} into a unicode')
+    def _compile_validator(self):
+        raise_error = self.raise_error
+
+        def validate(value):
+            try:
+                str(value)
+            except:
+                raise_error(f'Could not parse {value} into a unicode')
+
+        return validate
@@ -0,0 +1,230 @@
+""" Module provides secondary indexes of the DocumentCollection over a single field of its documents:
+the HashIndex answers equality lookups, and the SortedIndex answers both equality and range lookups
+in O(log n + k). Documents are held by identity, so that their own `__eq__`/`__hash__`, based on the key,
+play no role. Indexes are maintained by the collection, see DocumentCollection.create_index """
+
+__author__ = 'Bohdan Mushkevych'
+
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+
+
+class FieldIndex:
+    """ Base class of the secondary indexes """
+
+    def __init__(self, field):
+        """
+        :param field: BaseField-derived instance whose values are indexed
+        """
+        self.field = field
+
+    def value_of(self, document):
+        """ :return: indexed value of the document, i.e. the stored value of the field. Unlike the value read through
+            the descriptor, the stored value keeps its type, i.e. the Decimal of the DecimalField(force_string=True) """
+        name = self.field.name
+        value = document._data.get(name)
+        if value is None and not self.field.null:
+            # the descriptor applies the default to the missing value
+            self.field.__get__(document, document.__class__)
+            value = document._data.get(name)
+        return value
+
+    def convert(self, value):
+        """ :return: value of the lookup converted into the stored form, i.e. the string into the datetime """
+        return None if value is None else self.field.from_json(value)
+
+    def add(self, document):
+        raise NotImplementedError(f'method add is not implemented by {self.__class__.__name__}')
+
+    def extend(self, documents):
+        for document in documents:
+            self.add(document)
+
+    def remove(self, document):
+        """ :return: True if the document was held by the index """
+        raise NotImplementedError(f'method remove is not implemented by {self.__class__.__name__}')
+
+    def find(self, value):
+        """ :return: list of documents whose field equals the value, converted by the field's `from_json` """
+        raise NotImplementedError(f'method find is not implemented by {self.__class__.__name__}')
+
+    def clear(self):
+        raise NotImplementedError(f'method clear is not implemented by {self.__class__.__name__}')
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.field.name}>'
+
+
+class HashIndex(FieldIndex):
+    """ Index of the documents by the hashable field value """
+
+    def __init__(self, field):
+        super(HashIndex, self).__init__(field)
+
+        # {field value: {id(document): document}}
+        self._buckets = dict()
+
+    def add(self, document):
+        value = self.value_of(document)
+        bucket = self._buckets.get(value)
+        if bucket is None:
+            bucket = self._buckets[value] = dict()
+        bucket[id(document)] = document
+
+    def remove(self, document):
+        value = self.value_of(document)
+        bucket = self._buckets.get(value)
+        if bucket is None or bucket.pop(id(document), None) is None:
+            return False
+        if not bucket:
+            del self._buckets[value]
+        return True
+
+    def find(self, value):
+        bucket = self._buckets.get(self.convert(value))
+        return list(bucket.values()) if bucket else list()
+
+    def values(self):
+        """ :return: distinct indexed values """
+        return self._buckets.keys()
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class SortedIndex(FieldIndex):
+    """ Index of the documents ordered by the field value. Documents with None value are kept aside,
+    and are returned only by the `find(None)`.
+    Values are held in a list of sorted blocks of at most 2 * BLOCK_SIZE values each, along with the list of
+    the blocks' maximums. Lookups bisect the maximums and then the block, while an insertion or a deletion shifts
+    the items of a single block only, so that the updates cost O(log n + BLOCK_SIZE) rather than O(n) """
+
+    # number of values per block, once the index is built by the `extend`; blocks are split at twice that size
+    BLOCK_SIZE = 1000
+
+    def __init__(self, field):
+        super(SortedIndex, self).__init__(field)
+
+        # list of the sorted blocks of non-None values, the parallel list of the blocks of their documents,
+        # and the list of the last (maximum) value of every block
+        self._values = list()
+        self._documents = list()
+        self._maxes = list()
+
+        # {id(document): document} for documents with None value
+        self._nulls = dict()
+
+    def add(self, document):
+        value = self.value_of(document)
+        if value is None:
+            self._nulls[id(document)] = document
+            return
+
+        maxes = self._maxes
+        if not maxes:
+            self._values.append([value])
+            self._documents.append([document])
+            maxes.append(value)
+            return
+
+        i = bisect_right(maxes, value)
+        if i == len(maxes):
+            # the value is larger than or equal to all the present ones: it goes to the end of the last block
+            i -= 1
+        values, documents = self._values[i], self._documents[i]
+        position = bisect_right(values, value)
+        values.insert(position, value)
+        documents.insert(position, document)
+        maxes[i] = values[-1]
+
+        if len(values) > 2 * self.BLOCK_SIZE:
+            half = len(values) // 2
+            self._values[i:i + 1] = [values[:half], values[half:]]
+            self._documents[i:i + 1] = [documents[:half], documents[half:]]
+            maxes[i:i + 1] = [values[half - 1], values[-1]]
+
+    def extend(self, documents):
+        """ adds the documents at the cost of a single sort, rather than of an insertion per document """
+        pairs = [pair for values, block in zip(self._values, self._documents) for pair in zip(values, block)]
+        for document in documents:
+            value = self.value_of(document)
+            if value is None:
+                self._nulls[id(document)] = document
+            else:
+                pairs.append((value, document))
+        pairs.sort(key=itemgetter(0))
+
+        size = self.BLOCK_SIZE
+        self._values = [[value for value, _ in pairs[i:i + size]] for i in range(0, len(pairs), size)]
+        self._documents = [[document for _, document in pairs[i:i + size]] for i in range(0, len(pairs), size)]
+        self._maxes = [values[-1] for values in self._values]
+
+    def remove(self, document):
+        value = self.value_of(document)
+        if value is None:
+            return self._nulls.pop(id(document), None) is not None
+
+        # equal values may span several blocks, starting with the first block whose maximum is not lower
+        maxes = self._maxes
+        for i in range(bisect_left(maxes, value), len(maxes)):
+            values, documents = self._values[i], self._documents[i]
+            if values[0] > value:
+                break
+            for position in range(bisect_left(values, value), bisect_right(values, value)):
+                if documents[position] is document:
+                    del values[position]
+                    del documents[position]
+                    if values:
+                        maxes[i] = values[-1]
+                    else:
+                        del self._values[i]
+                        del self._documents[i]
+                        del maxes[i]
+                    return True
+        return False
+
+    def _locate(self, value, right):
+        """ :return: tuple (block index, position within the block) of the value, as found by the
+            `bisect_right` if `right` is True, and by the `bisect_left` otherwise """
+        bisect = bisect_right if right else bisect_left
+        i = bisect(self._maxes, value)
+        if i == len(self._maxes):
+            return i, 0
+        return i, bisect(self._values[i], value)
+
+    def _slice(self, start, end):
+        """ :return: list of documents between the (block index, position) locations """
+        (i, position), (j, end_position) = start, end
+        if (i, position) >= (j, end_position):
+            return list()
+        if i == j:
+            return self._documents[i][position:end_position]
+        result = self._documents[i][position:]
+        for documents in self._documents[i + 1:j]:
+            result.extend(documents)
+        if j < len(self._documents):
+            result.extend(self._documents[j][:end_position])
+        return result
+
+    def find(self, value):
+        if value is None:
+            return list(self._nulls.values())
+        value = self.convert(value)
+        return self._slice(self._locate(value, False), self._locate(value, True))
+
+    def range(self, min_value=None, max_value=None, include_min=True, include_max=True):
+        """ :return: list of documents with the field value within the range, ordered by the value
+        Bounds are converted by the field's `from_json`, i.e. the strings into the datetimes
+        :param min_value: (optional) lower bound of the range; unbounded if None
+        :param max_value: (optional) upper bound of the range; unbounded if None
+        :param include_min: if True, the lower bound is inclusive
+        :param include_max: if True, the upper bound is inclusive """
+        start = (0, 0) if min_value is None else self._locate(self.convert(min_value), not include_min)
+        end = (len(self._maxes), 0) if max_value is None else self._locate(self.convert(max_value), include_max)
+        return self._slice(start, end)
+
+    def clear(self):
+        self._values.clear()
+        self._documents.clear()
+        self._maxes.clear()
+        self._nulls.clear()
@@ -0,0 +1,118 @@
+__author__ = 'Bohdan Mushkevych'
+
+
+class LazyData(dict):
+    """ Replacement for the per-instance `_data` dict of documents created by `BaseDocument.from_json_lazy`.
+    Holds raw JSON values of the fields and converts (and validates) each of them
+    only when it is first read through the field descriptor. Converted values are cached in the dict itself.
+    Raw values of the never-read fields are passed by the `BaseDocument.to_json` straight through. """
+    __slots__ = ('_document_klass', '_raw')
+
+    def __init__(self, document_klass, raw):
+        """
+        :param document_klass: BaseDocument-derived class, whose fields describe the raw values
+        :param raw: dict {field name: raw JSON value}; must not contain None values
+        """
+        super(LazyData, self).__init__()
+        self._document_klass = document_klass
+        self._raw = raw
+
+    @property
+    def pending(self):
+        """ :return: tuple of names of the fields that are not yet converted """
+        return tuple(self._raw)
+
+    def _convert(self, name):
+        schema = self._document_klass._schema
+        field = schema.fields[name]
+        raw_value = self._raw[name]
+        if name in schema.nested_fields:
+            value = field.nested_klass.from_json_lazy(raw_value)
+        else:
+            value = field.from_json(raw_value)
+        field.validate(value)
+
+        # raw value is discarded only once the conversion has succeeded
+        del self._raw[name]
+        dict.__setitem__(self, name, value)
+        return value
+
+    def materialize(self):
+        """ converts all pending raw values """
+        for name in list(self._raw):
+            self._convert(name)
+
+    def get(self, name, default=None):
+        if name in self._raw:
+            return self._convert(name)
+        return dict.get(self, name, default)
+
+    def __getitem__(self, name):
+        if name in self._raw:
+            return self._convert(name)
+        return dict.__getitem__(self, name)
+
+    def __setitem__(self, name, value):
+        self._raw.pop(name, None)
+        dict.__setitem__(self, name, value)
+
+    def __delitem__(self, name):
+        if name in self._raw:
+            del self._raw[name]
+        else:
+            dict.__delitem__(self, name)
+
+    def __contains__(self, name):
+        return name in self._raw or dict.__contains__(self, name)
+
+    def __len__(self):
+        return dict.__len__(self) + len(self._raw)
+
+    def __iter__(self):
+        self.materialize()
+        return dict.__iter__(self)
+
+    def keys(self):
+        self.materialize()
+        return dict.keys(self)
+
+    def values(self):
+        self.materialize()
+        return dict.values(self)
+
+    def items(self):
+        self.materialize()
+        return dict.items(self)
+
+    def __eq__(self, other):
+        self.materialize()
+        return dict.__eq__(self, other)
+
+    def copy(self):
+        """ :return: shallow copy, that keeps pending raw values unconverted """
+        duplicate = LazyData(self._document_klass, dict(self._raw))
+        dict.update(duplicate, dict.items(self))
+        return duplicate
+
+    def __reduce__(self):
+        self.materialize()
+        return dict, (dict(self),)
+
+    def to_json(self, document):
+        """ :return: JSON dict of the document, where raw values of the pending fields are passed as is """
+        schema = self._document_klass._schema
+        klass = document.__class__
+        json_data = dict()
+        for field_name, field_obj in schema.fields.items():
+            if field_name in self._raw:
+                value = self._raw[field_name]
+            elif field_name in schema.nested_fields:
+                # unset nested documents are skipped, rather than populated with their defaults
+                nested_document = dict.get(self, field_name)
+                value = None if nested_document is None else nested_document.to_json()
+            else:
+                value = field_obj.to_json(field_obj.__get__(document, klass))
+
+            if value is not None:
+                json_data[field_name] = value
+        return json_data
@@ -0,0 +1,168 @@
+""" Module provides streaming NDJSON (newline-delimited JSON) reader and writer for documents.
+Both keep the memory bounded by the batch size, regardless of the file size, and support gzip-compressed streams. """
+
+__author__ = 'Bohdan Mushkevych'
+
+import gzip
+import io
+import json
+import os
+
+from odm.errors import BatchError
+
+GZIP_MAGIC = b'\x1f\x8b'
+DEFAULT_BATCH_SIZE = 1024
+DEFAULT_BUFFER_SIZE = 1 << 16
+
+
+def _is_path(source):
+    return isinstance(source, (str, bytes, os.PathLike))
+
+
+def _is_gzip(fileobj):
+    """ :return: True if the binary stream starts with the gzip magic number. Stream position is not changed """
+    if hasattr(fileobj, 'peek'):
+        return fileobj.peek(2)[:2] == GZIP_MAGIC
+    if fileobj.seekable():
+        position = fileobj.tell()
+        magic = fileobj.read(2)
+        fileobj.seek(position)
+        return magic == GZIP_MAGIC
+    return False
+
+
+def _open_lines(source):
+    """ :return: tuple (iterable of text or bytes lines, file object to close or None) """
+    if _is_path(source):
+        fileobj = open(source, 'rb')
+        if _is_gzip(fileobj):
+            fileobj = gzip.GzipFile(fileobj=fileobj, mode='rb')
+        return fileobj, fileobj
+
+    if isinstance(source, io.TextIOBase) or not hasattr(source, 'read'):
+        # text stream or an iterable of lines
+        return source, None
+
+    # binary stream
+    if _is_gzip(source):
+        return gzip.GzipFile(fileobj=source, mode='rb'), None
+    return source, None
+
+
+def _decode_batch(document_klass, lines, line_numbers, decode, errors):
+    """ :return: list of documents converted from the batch of lines """
+    json_batch, json_line_numbers, batch_errors = list(), list(), list()
+    for line, line_number in zip(lines, line_numbers):
+        try:
+            json_data = decode(line)
+        except ValueError as e:
+            batch_errors.append((line_number, e))
+            continue
+        if json_data.__class__ is not dict:
+            batch_errors.append((line_number, ValueError(f'NDJSON line of {document_klass.__name__} must be '
+                                                         f'a JSON object, rather than {type(json_data)}')))
+            continue
+        json_batch.append(json_data)
+        json_line_numbers.append(line_number)
+
+    # conversion goes through the classmethod, that honors the class-level deferred validation and change tracking
+    conversion_errors = list()
+    documents = document_klass.from_json_many(json_batch, errors=conversion_errors)
+    batch_errors.extend((json_line_numbers[index], e) for index, e in conversion_errors)
+
+    if batch_errors:
+        batch_errors.sort(key=lambda entry: entry[0])
+        if errors is None:
+            raise BatchError(batch_errors, documents)
+        errors.extend(batch_errors)
+    return documents
+
+
+def iter_ndjson(document_klass, source, batch_size=DEFAULT_BATCH_SIZE, errors=None):
+    """ Generator reads NDJSON and yields documents one by one.
+    :param document_klass: BaseDocument-derived class of the documents
+    :param source: path to the file, text or binary file object, or an iterable of lines.
+        Gzip-compressed input is detected automatically for paths and binary streams
+    :param batch_size: number of lines decoded at once; defines the upper bound of the memory consumption
+    :param errors: (optional) list to which (line number, exception) tuples of the failed lines are appended.
+        Line numbers are 0-based. Failed lines are skipped and do not interrupt the stream
+    :raise BatchError at the end of the batch that contains failed lines, if `errors` is not given """
+    lines, to_close = _open_lines(source)
+    decode = json.JSONDecoder().decode
+
+    try:
+        batch, line_numbers = list(), list()
+        for line_number, line in enumerate(lines):
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line or line.isspace():
+                continue
+
+            batch.append(line)
+            line_numbers.append(line_number)
+            if len(batch) >= batch_size:
+                yield from _decode_batch(document_klass, batch, line_numbers, decode, errors)
+                batch.clear()
+                line_numbers.clear()
+
+        if batch:
+            yield from _decode_batch(document_klass, batch, line_numbers, decode, errors)
+    finally:
+        if to_close is not None:
+            to_close.close()
+
+
+def write_ndjson(documents, destination, batch_size=DEFAULT_BATCH_SIZE, buffer_size=DEFAULT_BUFFER_SIZE):
+    """ Writes documents as NDJSON: one compact JSON object per line.
+    :param documents: iterable of documents
+    :param destination: path to the file, or text or binary file object.
+        Paths ending with `.gz` are written gzip-compressed; file objects are written as is,
+        so wrap them with `gzip.open` to compress
+    :param batch_size: number of documents converted at once
+    :param buffer_size: number of characters accumulated before they are written to the destination
+    :return: number of written documents """
+    if _is_path(destination):
+        path = os.fsdecode(destination)
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as fileobj:
+            return write_ndjson(documents, fileobj, batch_size, buffer_size)
+
+    is_text = isinstance(destination, io.TextIOBase)
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+
+    buffer, buffered_size, count = list(), 0, 0
+
+    def flush():
+        chunk = ''.join(buffer)
+        destination.write(chunk if is_text else chunk.encode('utf-8'))
+        buffer.clear()
+
+    batch = list()
+    for document in documents:
+        batch.append(document)
+        if len(batch) < batch_size:
+            continue
+
+        for line in _encode_batch(batch, encode):
+            buffer.append(line)
+            buffered_size += len(line)
+        count += len(batch)
+        batch.clear()
+        if buffered_size >= buffer_size:
+            flush()
+            buffered_size = 0
+
+    if batch:
+        for line in _encode_batch(batch, encode):
+            buffer.append(line)
+        count += len(batch)
+    if buffer:
+        flush()
+    return count
+
+
+def _encode_batch(batch, encode):
+    """ :return: list of NDJSON lines for the batch of documents """
+    document_klass = batch[0].__class__
+    json_batch = document_klass.to_json_many(batch)
+    return [encode(json_data) + '\n' for json_data in json_batch]
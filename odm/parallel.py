@@ -0,0 +1,208 @@
+""" Module provides parallel NDJSON decoding on a pool of worker processes.
+Input is split into chunks on the line boundaries. Plain files are split by byte offsets, and every worker reads its
+own byte range from the file, so that the input data never travels between the processes. Gzip-compressed files,
+streams and iterables of lines are read by the calling process, and their chunks are sent to the workers.
+The Document class and the transform function are sent to every worker once, when the worker starts.
+Decoded documents, or their transformed values, are sent back to the calling process; when they are large,
+the transform that reduces them to what the caller needs makes the largest difference to the throughput. """
+
+__author__ = 'Bohdan Mushkevych'
+
+import collections
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from odm.errors import BatchError
+from odm.ndjson import _decode_batch, _is_gzip, _is_path, _open_lines
+
+DEFAULT_CHUNK_SIZE = 1 << 22
+
+# Document class and transform function of the worker process; set once by the `_initialize_worker`
+_document_klass = None
+_transform = None
+
+
+def _initialize_worker(document_klass, transform):
+    global _document_klass, _transform
+    _document_klass = document_klass
+    _transform = transform
+
+
+def _decode_chunk(data):
+    """ Worker: decodes the chunk of NDJSON lines
+    :return: tuple (list of results, list of (0-based line number within the chunk, exception), number of lines) """
+    lines = data.split(b'\n')
+    if lines[-1] == b'':
+        # chunk ends with the line separator
+        lines.pop()
+
+    batch, line_numbers, errors = list(), list(), list()
+    for line_number, line in enumerate(lines):
+        if not line or line.isspace():
+            continue
+        try:
+            batch.append(line.decode('utf-8'))
+            line_numbers.append(line_number)
+        except UnicodeDecodeError as e:
+            errors.append((line_number, e))
+
+    results = _decode_batch(_document_klass, batch, line_numbers, json.JSONDecoder().decode, errors)
+    errors.sort(key=lambda entry: entry[0])
+    if _transform is not None:
+        results = [_transform(document) for document in results]
+    return results, errors, len(lines)
+
+
+def _decode_range(path, start, end):
+    """ Worker: reads and decodes the byte range of the file. See `_decode_chunk` """
+    with open(path, 'rb') as fileobj:
+        fileobj.seek(start)
+        return _decode_chunk(fileobj.read(end - start))
+
+
+def _file_ranges(path, chunk_size):
+    """ Generator yields (start, end) byte ranges of the file, that end on the line boundaries """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as fileobj:
+        start = 0
+        while start < file_size:
+            fileobj.seek(min(start + chunk_size, file_size))
+            fileobj.readline()
+            end = min(fileobj.tell(), file_size)
+            yield start, end
+            start = end
+
+
+def _line_chunks(source, chunk_size):
+    """ Generator yields chunks of NDJSON lines as bytes, each holding approximately `chunk_size` bytes """
+    lines, to_close = _open_lines(source)
+    try:
+        chunk, size = list(), 0
+        for line in lines:
+            if isinstance(line, str):
+                line = line.encode('utf-8')
+            if not line.endswith(b'\n'):
+                line += b'\n'
+            chunk.append(line)
+            size += len(line)
+            if size >= chunk_size:
+                yield b''.join(chunk)
+                chunk, size = list(), 0
+        if chunk:
+            yield b''.join(chunk)
+    finally:
+        if to_close is not None:
+            to_close.close()
+
+
+def _is_plain_file(source):
+    if not _is_path(source):
+        return False
+    with open(source, 'rb') as fileobj:
+        return not _is_gzip(fileobj)
+
+
+def iter_ndjson(document_klass, source, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, ordered=True,
+                transform=None, errors=None):
+    """ Generator reads NDJSON, decodes and validates its documents on the pool of worker processes,
+    and yields the documents, or the results of the `transform`, one by one.
+    :param document_klass: BaseDocument-derived class of the documents; must be importable by the workers
+    :param source: path to the file, text or binary file object, or an iterable of lines.
+        Gzip-compressed input is detected automatically for paths and binary streams
+    :param workers: (optional) number of worker processes; defaults to the number of CPUs
+    :param chunk_size: approximate number of bytes decoded by a worker at once. At most two chunks per worker
+        are in flight, which defines the upper bound of the memory consumption
+    :param ordered: if True, results are yielded in the order of the input lines; if False, chunks are yielded
+        in the order of their completion, while the order within the chunk is kept
+    :param transform: (optional) function(document) -> value, applied to every document by the worker;
+        must be picklable, i.e. defined at the module level
+    :param errors: (optional) list to which (line number, exception) tuples of the failed lines are appended.
+        Line numbers are 0-based. Failed lines are skipped and do not interrupt the stream. In the unordered mode,
+        the errors are appended once all chunks are decoded
+    :raise BatchError if any line fails and `errors` is not given: in the ordered mode, once the chunk with
+        the failed lines is reached; in the unordered mode, once all chunks are decoded """
+    workers = workers or os.cpu_count() or 1
+    if _is_plain_file(source):
+        path = os.fsdecode(source)
+        tasks = ((_decode_range, path, start, end) for start, end in _file_ranges(path, chunk_size))
+    else:
+        tasks = ((_decode_chunk, chunk) for chunk in _line_chunks(source, chunk_size))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initialize_worker,
+                             initargs=(document_klass, transform)) as executor:
+        if ordered:
+            yield from _iter_ordered(executor, tasks, 2 * workers, errors)
+        else:
+            yield from _iter_unordered(executor, tasks, 2 * workers, errors)
+
+
+def _submit(executor, tasks, pending, limit):
+    """ submits the tasks until `limit` futures are pending
+    :return: False if the tasks are exhausted """
+    while len(pending) < limit:
+        task = next(tasks, None)
+        if task is None:
+            return False
+        function, *args = task
+        pending.append(executor.submit(function, *args))
+    return True
+
+
+def _iter_ordered(executor, tasks, limit, errors):
+    pending = collections.deque()
+    first_line = 0
+    has_tasks = True
+    while pending or has_tasks:
+        if has_tasks:
+            has_tasks = _submit(executor, tasks, pending, limit)
+        if not pending:
+            break
+
+        results, chunk_errors, line_count = pending.popleft().result()
+        if chunk_errors:
+            chunk_errors = [(first_line + line_number, e) for line_number, e in chunk_errors]
+            if errors is None:
+                raise BatchError(chunk_errors, results)
+            errors.extend(chunk_errors)
+        first_line += line_count
+        yield from results
+
+
+def _iter_unordered(executor, tasks, limit, errors):
+    # {future: chunk index}
+    pending = dict()
+    submitted = 0
+
+    # {chunk index: (number of lines, list of (line number within the chunk, exception))}
+    completed = dict()
+
+    has_tasks = True
+    while pending or has_tasks:
+        while has_tasks and len(pending) < limit:
+            task = next(tasks, None)
+            if task is None:
+                has_tasks = False
+                break
+            function, *args = task
+            pending[executor.submit(function, *args)] = submitted
+            submitted += 1
+        if not pending:
+            break
+
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            chunk_index = pending.pop(future)
+            results, chunk_errors, line_count = future.result()
+            completed[chunk_index] = (line_count, chunk_errors)
+            yield from results
+
+    batch_errors, first_line = list(), 0
+    for chunk_index in range(submitted):
+        line_count, chunk_errors = completed[chunk_index]
+        batch_errors.extend((first_line + line_number, e) for line_number, e in chunk_errors)
+        first_line += line_count
+    if batch_errors:
+        if errors is None:
+            raise BatchError(batch_errors)
+        errors.extend(batch_errors)
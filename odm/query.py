@@ -0,0 +1,150 @@
+""" Module compiles MongoDB-style queries into predicates over the raw JSON dicts of a Document class.
+Query is a dict {path: condition}, where the path is a field name, or a dotted path of field names leading through
+the NestedDocumentField, i.e. 'field_nested.field_string'. Condition is either a value, matched by equality,
+or a dict of operators:
+- $eq, $ne: equality and inequality
+- $in, $nin: membership in the list of values
+- $gt, $gte, $lt, $lte: comparisons
+- $exists: True if the field must be present and not None, False if it must be missing or None
+All conditions must hold for the row to match. Operands are converted once by the field's `from_json`,
+and so are the raw values of the touched fields, so that the comparisons happen between Python values,
+i.e. between datetimes rather than their strings. Raw values that can not be converted or compared do not match.
+NOTE: as with MongoDB, conditions apply to the values present in the raw data, i.e. field defaults are not applied """
+
+__author__ = 'Bohdan Mushkevych'
+
+from odm import fields
+from odm.codegen import _compile, _indent
+from odm.errors import FieldDoesNotExist
+
+# {operator: Python comparison of the `value` and the `operand`}
+COMPARISONS = {
+    '$eq': '==',
+    '$ne': '!=',
+    '$gt': '>',
+    '$gte': '>=',
+    '$lt': '<',
+    '$lte': '<=',
+    '$in': 'in',
+    '$nin': 'not in',
+}
+
+OPERATORS = frozenset(COMPARISONS) | {'$exists'}
+
+
+def _resolve_path(document_klass, path):
+    """ :return: list of field names of the dotted path, and the field at the end of the path
+    :raise FieldDoesNotExist if any field of the path is not known """
+    field_names = path.split('.')
+    klass = document_klass
+    field_obj = None
+    for position, field_name in enumerate(field_names):
+        if klass is None:
+            raise FieldDoesNotExist(f'path {path} continues past the non-nested field {field_names[position - 1]}')
+        field_obj = klass._schema.fields.get(field_name)
+        if field_obj is None:
+            raise FieldDoesNotExist(f"The field '{field_name}' of the path {path} is not present "
+                                    f"in document type '{klass.__name__}'")
+        klass = field_obj.nested_klass if isinstance(field_obj, fields.NestedDocumentField) else None
+    return field_names, field_obj
+
+
+def _parse_condition(path, condition):
+    """ :return: list of (operator, operand) tuples """
+    if isinstance(condition, dict) and condition and all(str(key).startswith('$') for key in condition):
+        for operator in condition:
+            if operator not in OPERATORS:
+                raise ValueError(f'unsupported operator {operator} of the path {path}')
+        return list(condition.items())
+    return [('$eq', condition)]
+
+
+def _convert_operand(path, field_obj, operator, operand):
+    if operator == '$exists':
+        return bool(operand)
+    if operator in ('$in', '$nin'):
+        if not isinstance(operand, (list, tuple, set, frozenset)):
+            raise ValueError(f'operand of {operator} of the path {path} must be a list')
+        values = [None if value is None else field_obj.from_json(value) for value in operand]
+        try:
+            return frozenset(values)
+        except TypeError:
+            # unhashable values, i.e. lists
+            return tuple(values)
+    if operand is None:
+        if operator not in ('$eq', '$ne'):
+            raise ValueError(f'operand of {operator} of the path {path} must not be None')
+        return None
+    return field_obj.from_json(operand)
+
+
+def _matches_none(operator, operand):
+    """ :return: True if the missing (or None) value satisfies the condition """
+    if operator == '$exists':
+        return not operand
+    if operator == '$eq':
+        return operand is None
+    if operator == '$ne':
+        return operand is not None
+    if operator == '$in':
+        return None in operand
+    if operator == '$nin':
+        return None not in operand
+    return False
+
+
+def compile_query(document_klass, query):
+    """ :return: function(json_data) -> bool, True if the raw JSON dict of the `document_klass` matches the query
+    :raise FieldDoesNotExist if any path of the query is not known
+    :raise ValueError if the query is malformed """
+    namespace = dict()
+    lines = ['def predicate(json_data):',
+             '    try:']
+    body = list()
+    for i, (path, condition) in enumerate(query.items()):
+        field_names, field_obj = _resolve_path(document_klass, path)
+        conditions = [(operator, _convert_operand(path, field_obj, operator, operand))
+                      for operator, operand in _parse_condition(path, condition)]
+        is_nested = isinstance(field_obj, fields.NestedDocumentField)
+        if is_nested and any(operator != '$exists' for operator, _ in conditions):
+            raise ValueError(f'nested document {path} supports only the $exists operator')
+
+        body.append(f'value = json_data.get({field_names[0]!r})')
+        for field_name in field_names[1:]:
+            body.append(f'value = value.get({field_name!r}) if value.__class__ is dict else None')
+
+        # missing values are resolved at the compile time
+        body.append(f'if value is None:')
+        if all(_matches_none(operator, operand) for operator, operand in conditions):
+            body.append(f'    pass')
+        else:
+            body.append(f'    return False')
+
+        present = list()
+        for k, (operator, operand) in enumerate(conditions):
+            if operator == '$exists':
+                if not operand:
+                    present.append(f'return False')
+                continue
+            if operand is None:
+                # `$eq: None` fails, and `$ne: None` holds for the present value
+                if operator == '$eq':
+                    present.append(f'return False')
+                continue
+            namespace[f'operand_{i}_{k}'] = operand
+            present.append(f'if not (value {COMPARISONS[operator]} operand_{i}_{k}):')
+            present.append(f'    return False')
+
+        if present:
+            body.append(f'else:')
+            if not is_nested and any(line.startswith('if') for line in present):
+                namespace[f'conv_{i}'] = field_obj.from_json
+                body.append(f'    value = conv_{i}(value)')
+            body += _indent(present, 1)
+
+    body.append('return True')
+    lines += _indent(body, 2)
+    lines.append('    except (TypeError, ValueError, ArithmeticError, AttributeError):')
+    lines.append('        # raw values that can not be converted or compared do not match')
+    lines.append('        return False')
+    return _compile('\n'.join(lines) + '\n', namespace, 'predicate')
@@ -0,0 +1,287 @@
+__author__ = 'Bohdan Mushkevych'
+
+from odm import binary, codegen, views
+from odm.fields import BaseField, NestedDocumentField
+
+
+class SlotData:
+    """ Compact replacement for the per-instance `_data` dict.
+    Subclasses are generated per Document class by the DocumentSchema and keep every field value in its own slot,
+    while exposing the subset of the dict interface used by the fields and the BaseDocument. """
+    __slots__ = ()
+
+    # {field name: slot name}; populated for every generated subclass
+    _slot_names = dict()
+
+    # Document class this storage is generated for; used for pickling
+    _document_klass = None
+
+    def get(self, name, default=None):
+        slot_name = self._slot_names.get(name)
+        if slot_name is None:
+            return default
+        return getattr(self, slot_name, default)
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, self._slot_names[name])
+        except AttributeError:
+            raise KeyError(name)
+
+    def __setitem__(self, name, value):
+        setattr(self, self._slot_names[name], value)
+
+    def __delitem__(self, name):
+        try:
+            delattr(self, self._slot_names[name])
+        except AttributeError:
+            raise KeyError(name)
+
+    def __contains__(self, name):
+        slot_name = self._slot_names.get(name)
+        return slot_name is not None and hasattr(self, slot_name)
+
+    def __iter__(self):
+        return (name for name, slot_name in self._slot_names.items() if hasattr(self, slot_name))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(name, self[name]) for name in self]
+
+    def copy(self):
+        """ :return: shallow copy of the storage """
+        duplicate = self.__class__()
+        for slot_name in self.__slots__:
+            if hasattr(self, slot_name):
+                setattr(duplicate, slot_name, getattr(self, slot_name))
+        return duplicate
+
+    def __eq__(self, other):
+        if isinstance(other, (dict, SlotData)):
+            return dict(self.items()) == dict(other.items())
+        return False
+
+    def __reduce__(self):
+        return _restore_slot_data, (self._document_klass, dict(self.items()))
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({dict(self.items())})'
+
+
+def _restore_slot_data(document_klass, values):
+    """ Unpickling helper: re-creates the SlotData of the given Document class """
+    data = document_klass._schema.data_klass()
+    for name, value in values.items():
+        data[name] = value
+    return data
+
+
+class DocumentSchema:
+    """ Per-class description of the Document's fields.
+    Schema is built once, when the Document class is created, and is shared by all instances of that class.
+    Every subclass of the Document receives its own schema, so that fields added or overridden by
+    the subclass are never mixed with the schema of the parent class. """
+
+    def __init__(self, document_klass):
+        """
+        :param document_klass: BaseDocument-derived class to describe
+        """
+        self.document_klass = document_klass
+
+        # {field name: field} in the order of `dir(document_klass)`, i.e. sorted by the attribute name
+        self.fields = dict()
+
+        # {Document's attribute name: field}
+        self.attributes = dict()
+
+        for attribute_name in dir(document_klass):
+            attribute_obj = getattr(document_klass, attribute_name)
+            if isinstance(attribute_obj, BaseField):
+                self.fields[attribute_obj.name] = attribute_obj
+                self.attributes[attribute_name] = attribute_obj
+
+        # fields in the order of their declaration
+        self.ordered_fields = tuple(sorted(self.fields.values(), key=lambda field: field.creation_counter))
+        self.ordered_field_names = tuple(field.name for field in self.ordered_fields)
+
+        # {field name: field} for fields wrapping stand-alone Documents
+        self.nested_fields = {name: field for name, field in self.fields.items()
+                              if isinstance(field, NestedDocumentField)}
+
+        # {field name: field} for all other fields
+        self.plain_fields = {name: field for name, field in self.fields.items()
+                             if name not in self.nested_fields}
+
+        # Documents declaring `__slots__` (and derived from slotted bases only) have no instance `__dict__`;
+        # their field values are kept in a generated SlotData subclass rather than in a dict
+        self.compact = document_klass.__dictoffset__ == 0
+        self.data_klass = self._build_data_klass() if self.compact else dict
+
+        # documents of classes declaring `deferred_validation = True` do not validate assigned values
+        # until BaseDocument.validate() is called
+        self.deferred_validation = getattr(document_klass, 'deferred_validation', False) is True
+
+        # documents of classes declaring `track_changes = True` are marked clean once loaded
+        self.track_changes = getattr(document_klass, 'track_changes', False) is True
+
+        # documents of classes declaring `cache_key = True` keep their key until any of their fields is assigned
+        self.cache_key = getattr(document_klass, 'cache_key', False) is True
+
+        self._key_fields = None
+        self._composite_key = None
+        self._view_klass = None
+
+        # {name: function} generated by odm.codegen on the first use
+        self._compiled = dict()
+
+        # {(only, exclude): projection} resolved by odm.codegen on the first use
+        self._projections = dict()
+
+    def _get_compiled(self, name, compiler):
+        function = self._compiled.get(name)
+        if function is None:
+            function = self._compiled[name] = compiler(self)
+        return function
+
+    @property
+    def to_json(self):
+        """ :return: generated function(document) -> JSON dict """
+        return self._get_compiled('to_json', codegen.compile_to_json)
+
+    @property
+    def to_json_str(self):
+        """ :return: generated function(document) -> JSON text """
+        return self._get_compiled('to_json_str', codegen.compile_to_json_str)
+
+    @property
+    def from_json(self):
+        """ :return: generated function(cls, json_data) -> document """
+        return self._get_compiled('from_json', codegen.compile_from_json)
+
+    @property
+    def from_json_deferred(self):
+        """ :return: generated function(cls, json_data) -> document in the deferred validation mode """
+        return self._get_compiled('from_json_deferred', lambda schema: codegen.compile_from_json(schema, deferred=True))
+
+    @property
+    def validate(self):
+        """ :return: generated function(document) validating the document """
+        return self._get_compiled('validate', codegen.compile_validate)
+
+    @property
+    def key(self):
+        """ :return: generated function(document) -> key
+        :raise NotImplementedError if the Document does not declare `key_fields` """
+        return self._get_compiled('key', codegen.compile_key)
+
+    @property
+    def to_json_many(self):
+        """ :return: generated function(documents, errors) -> list of JSON dicts """
+        return self._get_compiled('to_json_many', codegen.compile_to_json_many)
+
+    @property
+    def from_json_many(self):
+        """ :return: generated function(cls, json_iterable, errors) -> list of documents """
+        return self._get_compiled('from_json_many', codegen.compile_from_json_many)
+
+    @property
+    def from_json_many_deferred(self):
+        """ :return: generated function(cls, json_iterable, errors) -> list of documents
+            in the deferred validation mode """
+        return self._get_compiled('from_json_many_deferred',
+                                  lambda schema: codegen.compile_from_json_many(schema, deferred=True))
+
+    def projection(self, only=None, exclude=None):
+        """ :return: projection {field name: tuple of the nested dotted paths, or None for the whole field}
+        :param only: (optional) iterable of the dotted paths to convert
+        :param exclude: (optional) iterable of the dotted paths not to convert
+        :raise FieldDoesNotExist if any path is not known """
+        if isinstance(only, str):
+            only = (only,)
+        if isinstance(exclude, str):
+            exclude = (exclude,)
+        cache_key = (None if only is None else tuple(only), None if exclude is None else tuple(exclude))
+        projection = self._projections.get(cache_key)
+        if projection is None:
+            projection = self._projections[cache_key] = codegen.resolve_projection(self, *cache_key)
+        return projection
+
+    def projected_to_json(self, only=None, exclude=None):
+        """ :return: generated function(document) -> JSON dict of the projected fields """
+        projection = self.projection(only, exclude)
+        name = ('to_json', tuple(projection.items()))
+        return self._get_compiled(name, lambda schema: codegen.compile_to_json(schema, projection=projection))
+
+    def projected_from_json(self, only=None, exclude=None, deferred=False):
+        """ :return: generated function(cls, json_data) -> document with the projected fields """
+        projection = self.projection(only, exclude)
+        name = ('from_json', deferred, tuple(projection.items()))
+        return self._get_compiled(name, lambda schema: codegen.compile_from_json(schema, deferred=deferred,
+                                                                                  projection=projection))
+
+    @property
+    def fingerprint(self):
+        """ :return: 8 bytes identifying the binary layout of the documents. See odm.binary """
+        return self._get_compiled('fingerprint', binary.compute_fingerprint)
+
+    @property
+    def to_bytes(self):
+        """ :return: generated function(document, buffer) appending the binary document to the bytearray """
+        return self._get_compiled('to_bytes', binary.compile_encoder)
+
+    @property
+    def from_bytes(self):
+        """ :return: generated function(cls, data, position, validate) -> (document, position) """
+        return self._get_compiled('from_bytes', binary.compile_decoder)
+
+    @property
+    def view_klass(self):
+        """ :return: class of the empty views, returned for the virtual defaults of the NestedDocumentField.
+            See odm.views """
+        if self._view_klass is None:
+            self._view_klass = views.build_view_klass(self.document_klass)
+        return self._view_klass
+
+    def _build_data_klass(self):
+        slot_names = {field.name: f'_f{i}' for i, field in enumerate(self.ordered_fields)}
+        namespace = {
+            '__slots__': tuple(slot_names.values()),
+            '_slot_names': slot_names,
+            '_document_klass': self.document_klass,
+        }
+        return type(f'{self.document_klass.__name__}Data', (SlotData,), namespace)
+
+    def _resolve_key_fields(self):
+        """ NOTE: `key_fields` is resolved lazily, since its implementation commonly refers to the Document class,
+            that is not yet bound to its name at the moment the schema is built """
+        key_fields = self.document_klass.key_fields()
+        if isinstance(key_fields, str):
+            self._key_fields, self._composite_key = (key_fields,), False
+        elif isinstance(key_fields, (list, tuple)):
+            self._key_fields, self._composite_key = tuple(key_fields), True
+        else:
+            raise TypeError('classmethod {0}.key_fields of type {1} is not of supported types: list, tuple'.
+                            format(self.document_klass.__name__, type(key_fields)))
+
+    @property
+    def key_fields(self):
+        """ :return: tuple of field names forming the Document's key
+        :raise NotImplementedError if the Document does not declare `key_fields` """
+        if self._key_fields is None:
+            self._resolve_key_fields()
+        return self._key_fields
+
+    @property
+    def composite_key(self):
+        """ :return: True if the Document's key is a tuple of values, and False if it is a single value """
+        if self._key_fields is None:
+            self._resolve_key_fields()
+        return self._composite_key
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.document_klass.__name__} {list(self.ordered_field_names)}>'
@@ -0,0 +1,206 @@
+""" Module provides virtual defaults of the NestedDocumentField.
+Non-nullable nested fields without an explicit default are not populated on read. Instead, reads return
+an empty view: an instance of the generated subclass of the nested Document class, that is allocated without
+the `__init__` and is not stored in the parent. The view reads as an empty document, and is materialized, i.e.
+replaced by a real nested document stored in the parent, only on the first write into it.
+While any reference to the view is held, the parent returns the same view from the field, so that writes through
+several references end up in the same document. If the field was assigned in the meantime, the view adopts
+the assigned document rather than replacing it.
+NOTE: the view is an instance of the nested Document class, but its type is the generated subclass, i.e.
+`isinstance(parent.field, Nested)` holds while `type(parent.field) is Nested` does not. Pickling, copying and
+`clone()` of the view produce instances of the nested Document class itself. """
+
+__author__ = 'Bohdan Mushkevych'
+
+import copy
+import weakref
+
+from odm import fields
+
+# {(id of the parent document, field name): view}; entries live as long as the views are referenced,
+# and the view references its parent, so that the id of the parent can not be reused in the meantime
+_views = weakref.WeakValueDictionary()
+
+# slots of the BaseDocument holding the state of the document; the view delegates them to the materialized document
+_STATE_SLOTS = ('_data', '_pending', '_changes', '_shared', '_key')
+
+
+class _MaterializingAttribute:
+    """ Descriptor replacing the Document's field in the view class.
+    Writes, and reads of the mutable fields, materialize the view before they are delegated to the field """
+
+    def __init__(self, field):
+        self.field = field
+        if isinstance(field, fields.NestedDocumentField):
+            # reads of the nested documents return either None, or their own views chained to this one
+            self.is_mutable = not field.null and not field.virtual_default
+        else:
+            self.is_mutable = isinstance(field, fields.CopyOnAccessField)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self.field
+        if self.is_mutable:
+            # lists, dicts and nested documents may be modified in place by the reader
+            instance._materialize()
+        return self.field.__get__(instance, owner)
+
+    def __set__(self, instance, value):
+        instance._materialize()
+        self.field.__set__(instance, value)
+
+    def __delete__(self, instance):
+        instance._materialize()
+        self.field.__delete__(instance)
+
+
+class _DelegatedSlot:
+    """ Descriptor replacing the BaseDocument's state slot in the view class.
+    Until the view is materialized, the slot of the view itself is used; afterwards, the slot of the document """
+
+    def __init__(self, slot):
+        self.slot = slot
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        document = instance._document
+        return self.slot.__get__(instance if document is None else document, owner)
+
+    def __set__(self, instance, value):
+        document = instance._document
+        self.slot.__set__(instance if document is None else document, value)
+
+
+class EmptyView:
+    """ Mixin of the generated view classes. NOTE: once materialized, the view delegates its state to
+    the real nested document, so that the references to the view held by the caller remain valid """
+    __slots__ = ()
+
+    def _materialize(self):
+        if self._document is not None:
+            return
+
+        parent, parent_field = self._parent, self._parent_field
+        if isinstance(parent, EmptyView):
+            parent._materialize()
+
+        document = parent._data.get(parent_field.name)
+        if document is None:
+            document = self._document_klass()
+            # values read from the view so far, i.e. the applied defaults, become values of the real document
+            document._data = self._data
+            parent_field.__set__(parent, document)
+        elif parent._shared and parent_field.name in parent._shared:
+            # the document assigned in the meantime is shared with a clone of the parent
+            parent_field._unshare(parent)
+            document = parent._data[parent_field.name]
+
+        self._document = document
+        key = (id(parent), parent_field.name)
+        if _views.get(key) is self:
+            del _views[key]
+
+    def _detached(self):
+        """ :return: materialized document, or a new document of the nested class holding the values of the view """
+        if self._document is not None:
+            return self._document
+        document = self._document_klass()
+        document._data = self._data.copy()
+        return document
+
+    def __reduce_ex__(self, protocol):
+        # the generated view class can not be looked up by pickle
+        return _as_is, (self._detached(),)
+
+    def __copy__(self):
+        return copy.copy(self._detached())
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self._detached(), memo)
+
+    def clone(self):
+        return self._detached().clone()
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, EmptyView):
+            other = other._detached()
+        return self._detached() == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self._detached())
+
+    def __setitem__(self, name, value):
+        self._materialize()
+        return super(EmptyView, self).__setitem__(name, value)
+
+    def __delitem__(self, name):
+        self._materialize()
+        return super(EmptyView, self).__delitem__(name)
+
+    def __delattr__(self, name):
+        if name in self._attributes:
+            self._materialize()
+        super(EmptyView, self).__delattr__(name)
+
+
+def build_view_klass(document_klass):
+    """ :return: view class of the given BaseDocument-derived class """
+    schema = document_klass._schema
+    namespace = {
+        '__slots__': ('_parent', '_parent_field', '_document'),
+        '_document_klass': document_klass,
+    }
+    for attribute_name, field_obj in schema.attributes.items():
+        namespace[attribute_name] = _MaterializingAttribute(field_obj)
+    for slot_name in _STATE_SLOTS:
+        namespace[slot_name] = _DelegatedSlot(_find_slot(document_klass, slot_name))
+
+    view_klass = type(f'Empty{document_klass.__name__}View', (EmptyView, document_klass), namespace)
+
+    # the view shares the schema of the document class, as the generated serializers and validators
+    # operate on the real fields rather than on their replacements
+    view_klass._schema = schema
+    view_klass._fields = schema.fields
+    view_klass._attributes = schema.attributes
+    return view_klass
+
+
+def _as_is(document):
+    """ unpickles the view as the document of the nested class """
+    return document
+
+
+def _find_slot(document_klass, slot_name):
+    """ :return: member descriptor of the slot, declared by the document class or any of its bases """
+    for klass in document_klass.__mro__:
+        if slot_name in klass.__dict__.get('__slots__', ()):
+            return klass.__dict__[slot_name]
+    raise AttributeError(f'slot {slot_name} is not declared by {document_klass.__name__}')
+
+
+def get_view(document_klass, parent, parent_field):
+    """ :return: empty view of the document class, that is materialized into the `parent_field` of the `parent`.
+        The view is reused while it is referenced and not materialized """
+    key = (id(parent), parent_field.name)
+    view = _views.get(key)
+    if view is not None and view._document is None:
+        return view
+
+    view_klass = document_klass._schema.view_klass
+    view = view_klass.__new__(view_klass)
+    view._document = None
+    view._data = document_klass._schema.data_klass()
+    view._pending = None
+    view._changes = None
+    view._shared = None
+    view._key = None
+    view._parent = parent
+    view._parent_field = parent_field
+    _views[key] = view
+    return view
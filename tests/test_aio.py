@@ -0,0 +1,172 @@
+__author__ = 'Bohdan Mushkevych'
+
+import asyncio
+import io
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+from odm import aio, ndjson
+from odm.errors import BatchError, ValidationError
+from tests.test_document_operations import SimpleContainer
+from tests.test_ndjson import DEFERRED_LINES, NON_OBJECT_LINES, TRACKED_LINES, DeferredContainer, TrackedContainer
+
+
+def integer_of(document):
+    return document.field_integer
+
+
+class BufferWriter:
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.drained = 0
+
+    def write(self, data):
+        self.buffer.write(data)
+
+    async def drain(self):
+        self.drained += 1
+
+
+class FailingReader:
+    def __init__(self, data):
+        self.data = data
+
+    async def read(self, size):
+        if self.data:
+            data, self.data = self.data, b''
+            return data
+        raise ConnectionResetError('connection lost')
+
+
+def stream_of(data):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+async def collect(async_iterable):
+    return [item async for item in async_iterable]
+
+
+class TestAio(unittest.TestCase):
+    def setUp(self):
+        self.models = [SimpleContainer(field_string=f'string {i}',
+                                       field_integer=i,
+                                       field_datetime=datetime(2020, 1, 1, 10, 0, i % 60),
+                                       field_decimal=i / 8) for i in range(100)]
+        stream = io.BytesIO()
+        ndjson.write_ndjson(self.models, stream)
+        self.data = stream.getvalue()
+
+    def assert_models(self, models):
+        self.assertEqual([model.to_json() for model in models], [model.to_json() for model in self.models])
+
+    def test_aiter_ndjson(self):
+        async def run():
+            documents = aio.aiter_ndjson(SimpleContainer, stream_of(self.data), batch_size=7, concurrency=2,
+                                         chunk_size=100)
+            return await collect(documents)
+
+        self.assert_models(asyncio.run(run()))
+
+    def test_roundtrip(self):
+        async def run(executor):
+            writer = BufferWriter()
+            documents = aio.aiter_ndjson(SimpleContainer, stream_of(self.data), batch_size=10, executor=executor)
+            count = await aio.write_ndjson(documents, writer, batch_size=8, concurrency=2, executor=executor)
+            return count, writer
+
+        with ThreadPoolExecutor(2) as executor:
+            count, writer = asyncio.run(run(executor))
+        self.assertEqual(count, 100)
+        self.assertEqual(writer.drained, 13)
+        self.assertEqual(writer.buffer.getvalue(), self.data)
+
+    def test_process_pool(self):
+        async def run(executor):
+            documents = aio.aiter_ndjson(SimpleContainer, stream_of(self.data), batch_size=30, executor=executor,
+                                         transform=integer_of)
+            return await collect(documents)
+
+        with ProcessPoolExecutor(2) as executor:
+            self.assertEqual(asyncio.run(run(executor)), list(range(100)))
+
+    def test_write_iterable(self):
+        writer = BufferWriter()
+        self.assertEqual(asyncio.run(aio.write_ndjson(self.models, writer, batch_size=30)), 100)
+        self.assertEqual(writer.buffer.getvalue(), self.data)
+
+    def test_errors(self):
+        data = b'{"field_integer": 1}\nnot a json\n\n{"field_integer": "text"}\n\xff\n{"field_integer": 2}'
+
+        async def run(errors):
+            documents = aio.aiter_ndjson(SimpleContainer, stream_of(data), batch_size=2, errors=errors)
+            return await collect(documents)
+
+        errors = list()
+        values = [model.field_integer for model in asyncio.run(run(errors))]
+        self.assertEqual(values, [1, 2])
+        self.assertEqual([line_number for line_number, _ in errors], [1, 3, 4])
+        self.assertRaises(BatchError, asyncio.run, run(None))
+
+    def test_reader_failure(self):
+        async def run():
+            return await collect(aio.aiter_ndjson(SimpleContainer, FailingReader(self.data[:200])))
+
+        self.assertRaises(ConnectionResetError, asyncio.run, run())
+
+    def test_backpressure(self):
+        async def run():
+            reader = stream_of(self.data)
+            documents = aio.aiter_ndjson(SimpleContainer, reader, batch_size=1, concurrency=2, chunk_size=50)
+            first = await documents.__anext__()
+            # the reader is suspended once the queue of the batches in flight is full
+            for _ in range(10):
+                await asyncio.sleep(0)
+            remaining = len(reader._buffer)
+            await documents.aclose()
+            return first, remaining
+
+        first, remaining = asyncio.run(run())
+        self.assertEqual(first.field_integer, 0)
+        self.assertGreater(remaining, len(self.data) // 2)
+
+    def test_non_object_lines(self):
+        data = ''.join(NON_OBJECT_LINES).encode('utf-8')
+        errors = list()
+
+        async def run():
+            return await collect(aio.aiter_ndjson(TrackedContainer, stream_of(data), batch_size=2, errors=errors))
+
+        self.assertEqual([model.field_integer for model in asyncio.run(run())], [1])
+        self.assertEqual([line_number for line_number, e in errors if isinstance(e, ValueError)], [0, 1, 2, 3])
+
+    def test_change_tracking(self):
+        data = ''.join(TRACKED_LINES).encode('utf-8')
+
+        async def run(executor):
+            return await collect(aio.aiter_ndjson(TrackedContainer, stream_of(data), batch_size=7, executor=executor))
+
+        for executor in (ThreadPoolExecutor(max_workers=2), ProcessPoolExecutor(max_workers=2)):
+            with executor:
+                models = asyncio.run(run(executor))
+            self.assertEqual(len(models), 20)
+            for model in models:
+                self.assertDictEqual(model.to_json_delta(), {})
+
+    def test_deferred_validation(self):
+        data = ''.join(DEFERRED_LINES).encode('utf-8')
+
+        async def run():
+            return await collect(aio.aiter_ndjson(DeferredContainer, stream_of(data), batch_size=7))
+
+        models = asyncio.run(run())
+        self.assertEqual([model.field_integer for model in models], [-1, 2] * 10)
+        self.assertRaises(ValidationError, models[0].validate)
+        models[1].validate()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+__author__ = 'Bohdan Mushkevych'
+
+import json
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from odm import document, fields
+from odm.errors import BatchError, ValidationError
+from tests.test_document_operations import SimpleContainer
+
+
+class DerivedContainer(SimpleContainer):
+    field_extra = fields.StringField(null=True)
+
+
+class AwareContainer(document.BaseDocument):
+    field_datetime = fields.DateTimeField(dt_format='%Y-%m-%d %H:%M:%S%z')
+
+
+class TestBatchOperations(unittest.TestCase):
+    def setUp(self):
+        self.json_rows = [{'field_string': f'row {i}',
+                           'field_integer': i,
+                           'field_boolean': i % 2 == 0,
+                           'field_datetime': f'2020-01-01 10:00:0{i % 3}',
+                           'field_decimal': '12.345'} for i in range(10)]
+
+    def test_from_json_many(self):
+        models = SimpleContainer.from_json_many(iter(self.json_rows))
+        self.assertEqual(len(models), 10)
+        for json_data, model in zip(self.json_rows, models):
+            expected = SimpleContainer.from_json(json_data)
+            self.assertEqual(json.dumps(model.to_json()), json.dumps(expected.to_json()))
+
+        # parsed values of repeated timestamps are shared within the batch
+        self.assertIs(models[0].field_datetime, models[3].field_datetime)
+
+    def test_to_json_many(self):
+        models = [SimpleContainer.from_json(json_data) for json_data in self.json_rows]
+        derived = DerivedContainer(field_extra='extra', field_integer=7)
+        models.append(derived)
+
+        json_rows = SimpleContainer.to_json_many(models)
+        self.assertEqual(len(json_rows), 11)
+        for model, json_data in zip(models, json_rows):
+            self.assertEqual(json.dumps(json_data), json.dumps(model.to_json()))
+        self.assertEqual(json_rows[-1]['field_extra'], 'extra')
+
+    def test_errors_do_not_abort_batch(self):
+        self.json_rows[2]['field_integer'] = 'not a number'
+        self.json_rows[5]['field_datetime'] = 'not a date'
+
+        errors = list()
+        models = SimpleContainer.from_json_many(self.json_rows, errors=errors)
+        self.assertEqual(len(models), 8)
+        self.assertListEqual([index for index, _ in errors], [2, 5])
+        self.assertIsInstance(errors[0][1], ValidationError)
+        self.assertIsInstance(errors[1][1], ValueError)
+
+        try:
+            SimpleContainer.from_json_many(self.json_rows)
+            self.assertTrue(False, 'BatchError should have been thrown')
+        except BatchError as e:
+            self.assertEqual(len(e.errors), 2)
+            self.assertEqual(len(e.results), 8)
+
+    def test_validate_many(self):
+        class FieldContainer(document.BaseDocument):
+            field_string = fields.StringField(null=False)
+
+        models = [FieldContainer(field_string='a'), FieldContainer(), FieldContainer(field_string='c')]
+        errors = list()
+        valid = FieldContainer.validate_many(models, errors=errors)
+        self.assertListEqual(valid, [models[0], models[2]])
+        self.assertEqual(errors[0][0], 1)
+
+        with self.assertRaises(BatchError):
+            FieldContainer.validate_many(models)
+
+        self.assertListEqual(FieldContainer.validate_many(valid), valid)
+
+    def test_to_json_many_datetime(self):
+        now = datetime(2020, 2, 2, 2, 2, 2)
+        models = [SimpleContainer(field_datetime=now) for _ in range(3)]
+        self.assertListEqual(SimpleContainer.to_json_many(models),
+                             [{'field_datetime': '2020-02-02 02:02:02'}] * 3)
+
+    def test_to_json_many_aware_datetime(self):
+        # the same instant in different timezones: equal datetimes, formatted differently
+        models = [AwareContainer(field_datetime=datetime(2020, 1, 1, 10, tzinfo=timezone.utc)),
+                  AwareContainer(field_datetime=datetime(2020, 1, 1, 11, tzinfo=timezone(timedelta(hours=1))))]
+        self.assertListEqual(AwareContainer.to_json_many(models), [model.to_json() for model in models])
+        self.assertEqual(AwareContainer.to_json_many(models)[1], {'field_datetime': '2020-01-01 11:00:00+0100'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+__author__ = 'Bohdan Mushkevych'
+
+import decimal
+import json
+import unittest
+from datetime import datetime, date, timezone
+
+from odm import document, fields
+from odm.errors import ValidationError
+from tests.test_codegen import UpperStringField
+
+
+class BinaryNested(document.BaseDocument):
+    field_string = fields.StringField(null=True)
+    field_boolean = fields.BooleanField(null=True)
+
+
+class BinaryContainer(document.BaseDocument):
+    field_id = fields.ObjectIdField(name='_id', null=True)
+    field_integer = fields.IntegerField(null=True)
+    field_big = fields.IntegerField(null=True)
+    field_limited = fields.IntegerField(min_value=0, null=True)
+    field_decimal = fields.DecimalField(precision=3, null=True)
+    field_fixed = fields.DecimalField(fixed_point=True, null=True)
+    field_datetime = fields.DateTimeField(dt_format='%Y-%m-%d %H:%M:%S.%f', null=True)
+    field_true = fields.BooleanField(null=True)
+    field_false = fields.BooleanField(null=True)
+    field_string = fields.StringField(null=True)
+    field_nested = fields.NestedDocumentField(BinaryNested)
+    field_list = fields.ListField(null=True)
+    field_timestamps = fields.ListField(fields.DateTimeField(), null=True)
+    field_dict = fields.DictField(null=True)
+    field_upper = UpperStringField(null=True)
+
+
+class CompactBinaryContainer(document.BaseDocument):
+    __slots__ = ()
+    field_integer = fields.IntegerField()
+    field_string = fields.StringField(default='default')
+
+
+class StringDecimalContainer(document.BaseDocument):
+    field_assigned = fields.DecimalField(precision=2, force_string=True, null=True)
+    field_default = fields.DecimalField(precision=2, force_string=True, default='1.5')
+    field_fixed = fields.DecimalField(precision=2, force_string=True, fixed_point=True, default='1.5')
+
+
+class DecimalVariantsContainer(document.BaseDocument):
+    field_decimal = fields.DecimalField(precision=2, null=True)
+    field_string = fields.DecimalField(precision=2, force_string=True, null=True)
+    field_fixed = fields.DecimalField(precision=2, fixed_point=True, null=True)
+    field_prices = fields.ListField(fields.DecimalField(precision=2, fixed_point=True), null=True)
+    field_rates = fields.DictField(value=fields.DecimalField(precision=2), null=True)
+
+
+class OtherContainer(document.BaseDocument):
+    field_integer = fields.IntegerField(null=True)
+
+
+class TestBinary(unittest.TestCase):
+    def setUp(self):
+        self.model = BinaryContainer()
+        self.model.field_id = 'a1b2c3'
+        self.model.field_integer = -300
+        self.model.field_big = 2 ** 80
+        self.model.field_limited = 5
+        self.model.field_decimal = '-12.3456'
+        self.model.field_fixed = 99.99
+        self.model.field_datetime = datetime(1960, 5, 6, 7, 8, 9, 123456)
+        self.model.field_true = True
+        self.model.field_false = False
+        self.model.field_string = 'юнікод'
+        self.model.field_nested.field_boolean = True
+        self.model.field_list = [1, 'two', {'three': 3}]
+        self.model.field_timestamps = [datetime(2021, 1, 1)]
+        self.model.field_dict = {'a': None}
+        self.model.field_upper = 'upper'
+
+    def test_roundtrip(self):
+        data = self.model.to_bytes()
+        model = BinaryContainer.from_bytes(data)
+        self.assertEqual(model.to_json(), self.model.to_json())
+        self.assertEqual(model._data['field_decimal'], decimal.Decimal('-12.346'))
+        self.assertEqual(model._data['field_fixed'], 9999)
+        self.assertEqual(model.field_datetime, datetime(1960, 5, 6, 7, 8, 9, 123456))
+        self.assertIs(model.field_false, False)
+        self.assertIsNone(model.field_nested.field_string)
+
+    def test_size(self):
+        model = BinaryContainer(field_integer=1, field_string='string', field_true=True,
+                                field_datetime=datetime(2021, 1, 1))
+        self.assertLess(len(model.to_bytes()) * 3, len(json.dumps(model.to_json())))
+
+    def test_empty(self):
+        model = BinaryContainer.from_bytes(BinaryContainer().to_bytes())
+        self.assertEqual(model.to_json(), {})
+
+    def test_datetime_variants(self):
+        model = BinaryContainer(field_datetime=datetime(2021, 1, 1, 12, tzinfo=timezone.utc))
+        self.assertEqual(BinaryContainer.from_bytes(model.to_bytes()).field_datetime, datetime(2021, 1, 1, 12))
+
+        model.field_datetime = date(2021, 1, 1)
+        self.assertEqual(BinaryContainer.from_bytes(model.to_bytes()).field_datetime, datetime(2021, 1, 1))
+
+    def test_defaults(self):
+        model = CompactBinaryContainer(field_integer=1)
+        data = model.to_bytes()
+        self.assertEqual(CompactBinaryContainer.from_bytes(data).to_json(),
+                         {'field_integer': 1, 'field_string': 'default'})
+
+    def test_force_string_decimal(self):
+        model = StringDecimalContainer(field_assigned='1.5')
+        expected = {'field_assigned': '1.50', 'field_default': '1.50', 'field_fixed': '1.50'}
+        self.assertEqual(model.to_json(), expected)
+        self.assertEqual(StringDecimalContainer.from_bytes(model.to_bytes()).to_json(), expected)
+
+        model = StringDecimalContainer.from_json({'field_assigned': '1.5'})
+        self.assertEqual(model.to_json(), expected)
+        self.assertEqual(StringDecimalContainer.from_bytes(model.to_bytes()).to_json(), expected)
+
+        # values placed into the storage without the conversion
+        model = StringDecimalContainer()
+        model._data['field_assigned'] = '1.5'
+        self.assertEqual(model.to_json()['field_assigned'], '1.50')
+        self.assertEqual(StringDecimalContainer.from_bytes(model.to_bytes()).field_assigned, '1.50')
+
+    def test_decimal_roundtrip(self):
+        for value in (decimal.Decimal('1.005'), decimal.Decimal('1.5'), '1.5', 1.005, 2, '-0.125'):
+            model = DecimalVariantsContainer(field_decimal=value, field_string=value, field_fixed=value,
+                                             field_prices=[value, 1.5], field_rates={'a': value})
+            restored = DecimalVariantsContainer.from_bytes(model.to_bytes())
+            self.assertEqual(restored.to_json(), model.to_json())
+
+    def test_decimal_not_encodable(self):
+        model = DecimalVariantsContainer(field_decimal=decimal.Decimal('NaN'))
+        self.assertRaises(ValueError, model.to_bytes)
+
+    def test_lazy(self):
+        model = BinaryContainer.from_json_lazy(self.model.to_json())
+        self.assertEqual(BinaryContainer.from_bytes(model.to_bytes()).to_json(), self.model.to_json())
+
+    def test_validation(self):
+        self.model._data['field_limited'] = -1
+        data = self.model.to_bytes()
+        with self.assertRaises(ValidationError):
+            BinaryContainer.from_bytes(data)
+        self.assertEqual(BinaryContainer.from_bytes(data, validate=False).field_limited, -1)
+
+    def test_schema_mismatch(self):
+        data = OtherContainer(field_integer=1).to_bytes()
+        with self.assertRaises(ValueError):
+            BinaryContainer.from_bytes(data)
+        with self.assertRaises(ValueError):
+            OtherContainer.from_bytes(data + b'\x00')
+
+    def test_fingerprint(self):
+        class SameLayout(document.BaseDocument):
+            field_integer = fields.IntegerField()
+
+        class OtherLayout(document.BaseDocument):
+            field_integer = fields.DecimalField()
+
+        self.assertEqual(SameLayout._schema.fingerprint, OtherContainer._schema.fingerprint)
+        self.assertNotEqual(OtherLayout._schema.fingerprint, OtherContainer._schema.fingerprint)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+__author__ = 'Bohdan Mushkevych'
+
+import copy
+import pickle
+import unittest
+
+from odm import document, fields
+
+
+class TrackedNested(document.BaseDocument):
+    field_string = fields.StringField(null=True)
+    field_integer = fields.IntegerField(null=True)
+
+
+class TrackedContainer(document.BaseDocument):
+    track_changes = True
+
+    field_nested = fields.NestedDocumentField(TrackedNested, null=True)
+    field_list = fields.ListField(null=True)
+    field_dict = fields.DictField(null=True)
+    field_string = fields.StringField(name='s', null=True)
+    field_decimal = fields.DecimalField(null=True)
+    field_default = fields.IntegerField(default=7)
+
+
+def apply_delta(json_data, delta):
+    """ reference implementation of the `$set`/`$unset` operators """
+    for path, value in delta.get('$set', {}).items():
+        *parents, name = path.split('.')
+        target = json_data
+        for parent in parents:
+            target = target.setdefault(parent, dict())
+        target[name] = value
+    for path in delta.get('$unset', {}):
+        *parents, name = path.split('.')
+        target = json_data
+        for parent in parents:
+            target = target[parent]
+        target.pop(name, None)
+    return json_data
+
+
+class TestChangeTracking(unittest.TestCase):
+    def setUp(self):
+        self.json_data = {
+            'field_nested': {'field_string': 'nested', 'field_integer': 1},
+            'field_list': [1, 2],
+            'field_dict': {'a': {'b': 1}},
+            's': 'string',
+            'field_decimal': 1.5,
+            'field_default': 7,
+        }
+        self.model = TrackedContainer.from_json(self.json_data)
+
+    def assertDelta(self, expected):
+        delta = self.model.to_json_delta()
+        self.assertEqual(delta, expected)
+        self.assertEqual(apply_delta(dict(self.json_data), delta), self.model.to_json())
+
+    def test_clean(self):
+        self.assertDelta({})
+        self.assertEqual(self.model.field_list, [1, 2])
+        self.assertDelta({})
+
+    def test_assigned(self):
+        self.model.field_string = 'new string'
+        self.model.field_decimal = 2.25
+        self.assertDelta({'$set': {'s': 'new string', 'field_decimal': 2.25}})
+
+    def test_unset(self):
+        self.model.field_string = None
+        del self.model.field_decimal
+        self.assertDelta({'$unset': {'s': '', 'field_decimal': ''}})
+
+    def test_default(self):
+        self.model.field_default = None
+        self.model.field_default = 8
+        self.assertDelta({'$set': {'field_default': 8}})
+
+    def test_mutated_in_place(self):
+        self.model.field_list.append(3)
+        self.model.field_dict['a']['b'] = 2
+        self.assertDelta({'$set': {'field_list': [1, 2, 3], 'field_dict': {'a': {'b': 2}}}})
+
+    def test_nested(self):
+        self.model.field_nested.field_integer = 2
+        self.model.field_nested.field_string = None
+        self.assertDelta({'$set': {'field_nested.field_integer': 2}, '$unset': {'field_nested.field_string': ''}})
+
+    def test_nested_replaced(self):
+        self.model.field_nested = TrackedNested(field_integer=3)
+        self.assertDelta({'$set': {'field_nested': {'field_integer': 3}}})
+
+        self.model.mark_clean()
+        self.model.field_nested.field_integer = 4
+        self.assertEqual(self.model.to_json_delta(), {'$set': {'field_nested.field_integer': 4}})
+
+    def test_mark_clean(self):
+        self.model.field_string = 'new string'
+        self.model.field_list.append(3)
+        self.model.mark_clean()
+        self.assertEqual(self.model.to_json_delta(), {})
+
+    def test_untracked(self):
+        model = TrackedNested(field_integer=1)
+        self.assertEqual(model.to_json_delta(), {'$set': {'field_integer': 1}})
+
+        model.mark_clean()
+        model.field_string = 'string'
+        self.assertEqual(model.to_json_delta(), {'$set': {'field_string': 'string'}})
+
+    def test_loaded(self):
+        models = TrackedContainer.from_json_many([copy.deepcopy(self.json_data) for _ in range(2)])
+        models.append(TrackedContainer.from_json_lazy(copy.deepcopy(self.json_data)))
+        for model in models:
+            self.assertEqual(model.to_json_delta(), {})
+            model.field_list.append(3)
+            self.assertEqual(model.to_json_delta(), {'$set': {'field_list': [1, 2, 3]}})
+
+    def test_pickle(self):
+        self.model.field_string = 'new string'
+        model = pickle.loads(pickle.dumps(self.model))
+        self.assertEqual(model.to_json_delta(), {'$set': {'s': 'new string'}})
+        model.field_list.append(3)
+        self.assertEqual(model.to_json_delta(), {'$set': {'s': 'new string', 'field_list': [1, 2, 3]}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+__author__ = 'Bohdan Mushkevych'
+
+import unittest
+from datetime import datetime
+
+from odm import document, fields
+
+
+class CloneNested(document.BaseDocument):
+    field_string = fields.StringField(null=True)
+    field_list = fields.ListField(null=True)
+
+
+class CloneContainer(document.BaseDocument):
+    field_nested = fields.NestedDocumentField(CloneNested, null=True)
+    field_list = fields.ListField(null=True)
+    field_dict = fields.DictField(null=True)
+    field_raw = fields.BaseField(null=True)
+    field_string = fields.StringField(null=True)
+    field_datetime = fields.DateTimeField(null=True)
+
+
+class CompactCloneContainer(document.BaseDocument):
+    __slots__ = ()
+    field_list = fields.ListField(null=True)
+    field_integer = fields.IntegerField(null=True)
+
+
+class TestClone(unittest.TestCase):
+    def setUp(self):
+        self.model = CloneContainer()
+        self.model.field_nested = CloneNested(field_string='nested', field_list=[{'a': 1}])
+        self.model.field_list = [1, [2, 3]]
+        self.model.field_dict = {'a': {'b': 1}}
+        self.model.field_raw = {'raw': [1]}
+        self.model.field_string = 'string'
+        self.model.field_datetime = datetime(2021, 1, 1)
+
+    def test_equal(self):
+        clone = self.model.clone()
+        self.assertIsInstance(clone, CloneContainer)
+        self.assertEqual(clone.to_json(), self.model.to_json())
+
+    def test_immutable_values_shared(self):
+        clone = self.model.clone()
+        self.assertIs(clone._data['field_string'], self.model._data['field_string'])
+        self.assertIs(clone._data['field_datetime'], self.model._data['field_datetime'])
+
+    def test_copy_on_access(self):
+        clone = self.model.clone()
+        self.assertIs(clone._data['field_list'], self.model._data['field_list'])
+
+        clone.field_list[1].append(4)
+        clone.field_dict['a']['b'] = 2
+        self.assertEqual(clone.field_list, [1, [2, 3, 4]])
+        self.assertEqual(self.model.field_list, [1, [2, 3]])
+        self.assertEqual(self.model.field_dict, {'a': {'b': 1}})
+
+        self.model.field_dict['c'] = 3
+        self.assertEqual(clone.field_dict, {'a': {'b': 2}})
+
+    def test_nested(self):
+        clone = self.model.clone()
+        self.assertIs(clone._data['field_nested'], self.model._data['field_nested'])
+
+        clone.field_nested.field_string = 'changed'
+        clone.field_nested.field_list[0]['a'] = 2
+        self.assertEqual(self.model.field_nested.field_string, 'nested')
+        self.assertEqual(self.model.field_nested.field_list, [{'a': 1}])
+
+    def test_references_read_before_cloning(self):
+        # references obtained before the cloning point to the values shared with the clone
+        field_list, field_nested = self.model.field_list, self.model.field_nested
+        clone = self.model.clone()
+        field_list.append(4)
+        field_nested.field_string = 'changed'
+        self.assertEqual(clone.field_list, [1, [2, 3], 4])
+        self.assertEqual(clone.field_nested.field_string, 'changed')
+
+        # values read after the cloning are private copies
+        self.model.field_list.append(5)
+        self.model.field_nested.field_string = 'private'
+        self.assertEqual(clone.field_list, [1, [2, 3], 4])
+        self.assertEqual(clone.field_nested.field_string, 'changed')
+
+    def test_other_fields_copied(self):
+        clone = self.model.clone()
+        clone._data['field_raw']['raw'].append(2)
+        self.assertEqual(self.model.field_raw, {'raw': [1]})
+
+    def test_assignment_not_copied(self):
+        clone = self.model.clone()
+        values = [5]
+        clone.field_list = values
+        values.append(6)
+        self.assertIs(clone.field_list, values)
+
+    def test_lazy(self):
+        model = CloneContainer.from_json_lazy(self.model.to_json())
+        clone = model.clone()
+        clone.field_list.append(4)
+        clone.field_nested.field_list.append(5)
+        self.assertEqual(model.field_list, [1, [2, 3]])
+        self.assertEqual(model.field_nested.field_list, [{'a': 1}])
+
+    def test_compact(self):
+        model = CompactCloneContainer(field_list=[1], field_integer=2)
+        clone = model.clone()
+        clone.field_list.append(2)
+        self.assertEqual(model.to_json(), {'field_list': [1], 'field_integer': 2})
+        self.assertEqual(clone.to_json(), {'field_list': [1, 2], 'field_integer': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
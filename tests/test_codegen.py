@@ -0,0 +1,106 @@
+__author__ = 'Bohdan Mushkevych'
+
+import json
+import unittest
+from datetime import datetime
+
+from odm import document, fields
+from odm.errors import ValidationError
+from tests.test_document_operations import SimpleContainer
+
+
+class UpperStringField(fields.StringField):
+    """ custom field with non-standard conversions """
+    def to_json(self, value):
+        return None if value is None else value.upper()
+
+
+class WideContainer(document.BaseDocument):
+    field_nested = fields.NestedDocumentField(SimpleContainer)
+    field_nested_nullable = fields.NestedDocumentField(SimpleContainer, null=True)
+    field_list = fields.ListField()
+    field_dict = fields.DictField(null=True)
+    field_id = fields.ObjectIdField(name='_id', null=True)
+    field_string = fields.StringField(default='default string')
+    field_integer = fields.IntegerField(name='i', null=True)
+    field_decimal = fields.DecimalField(default=12.345)
+    field_decimal_str = fields.DecimalField(force_string=True, null=True)
+    field_boolean = fields.BooleanField(null=True)
+    field_datetime = fields.DateTimeField(null=True)
+    field_upper = UpperStringField(null=True)
+
+
+def generic_to_json(model):
+    """ reference implementation: field-by-field loop over descriptors """
+    json_data = dict()
+    for field_name, field_obj in model._get_fields().items():
+        if isinstance(field_obj, fields.NestedDocumentField):
+            # unset nested documents are skipped
+            nested_document = model._data.get(field_name)
+            value = None if nested_document is None else generic_to_json(nested_document)
+        else:
+            value = field_obj.to_json(field_obj.__get__(model, model.__class__))
+        if value is not None:
+            json_data[field_name] = value
+    return json_data
+
+
+class TestCodegen(unittest.TestCase):
+    def setUp(self):
+        self.model = WideContainer()
+        self.model.field_nested.field_string = 'nested string'
+        self.model.field_nested.field_datetime = datetime(2020, 2, 29, 12, 30, 45)
+        self.model.field_list = [1, 2, 3]
+        self.model.field_dict = {'a': 'b'}
+        self.model.field_id = 123456
+        self.model.field_integer = '42'
+        self.model.field_decimal_str = 1.1
+        self.model.field_boolean = 'yes'
+        self.model.field_datetime = datetime(2021, 12, 31, 23, 59, 59)
+        self.model.field_upper = 'lower case'
+
+    def test_to_json_identical(self):
+        expected = json.dumps(generic_to_json(self.model))
+        self.assertEqual(json.dumps(self.model.to_json()), expected)
+        self.assertEqual(json.dumps(WideContainer().to_json()), json.dumps(generic_to_json(WideContainer())))
+
+    def test_from_json_roundtrip(self):
+        json_data = self.model.to_json()
+        m2 = WideContainer.from_json(json_data)
+        self.assertEqual(json.dumps(m2.to_json()), json.dumps(json_data))
+        self.assertIsInstance(m2.field_nested, SimpleContainer)
+        self.assertIsNone(m2.field_nested_nullable)
+        self.assertEqual(m2.field_integer, 42)
+        self.assertEqual(m2.field_upper, 'LOWER CASE')
+
+    def test_from_json_validates(self):
+        with self.assertRaises(ValueError):
+            WideContainer.from_json({'field_boolean': 'maybe'})
+        with self.assertRaises(Exception):
+            WideContainer.from_json({'field_nested': {'field_integer': 'not a number'}})
+
+    def test_generated_once(self):
+        schema = WideContainer._schema
+        self.assertIs(schema.to_json, schema.to_json)
+        self.assertIs(schema.from_json, schema.from_json)
+        self.assertIn('def to_json', schema.to_json.__source__)
+        self.assertIs(schema.validate, schema.validate)
+
+    def test_validate(self):
+        self.model.field_nested.field_integer = 1
+        self.model.field_nested.field_boolean = True
+        self.model.field_nested.field_decimal = 1.5
+        self.model.validate()
+
+        self.model._data['i'] = 'not a number'
+        with self.assertRaises(ValidationError):
+            self.model.validate()
+
+        self.model._data['i'] = 42
+        del self.model._data['field_list']
+        self.model.validate()
+        self.assertEqual(self.model.field_list, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
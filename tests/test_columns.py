@@ -0,0 +1,137 @@
+__author__ = 'Bohdan Mushkevych'
+
+import unittest
+from datetime import datetime
+
+from odm import columns, document, fields
+from odm.errors import ValidationError
+from tests.test_document_operations import SimpleContainer
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class NullableContainer(document.BaseDocument):
+    __slots__ = ()
+
+    field_string = fields.StringField(null=True)
+    field_integer = fields.IntegerField(null=True, max_value=100)
+    field_decimal = fields.DecimalField(null=True, precision=2)
+    field_datetime = fields.DateTimeField(null=True)
+    field_boolean = fields.BooleanField(null=True)
+
+
+@unittest.skipIf(np is None, 'NumPy is not installed')
+class TestColumns(unittest.TestCase):
+    def setUp(self):
+        self.models = [SimpleContainer(field_string=f'string {i}',
+                                       field_integer=i,
+                                       field_boolean=i % 2 == 0,
+                                       field_datetime=datetime(2020, 1, 1, 10, 0, i),
+                                       field_decimal=i + 0.125) for i in range(5)]
+
+    def test_dtypes(self):
+        result = columns.to_columns(self.models)
+        self.assertListEqual(list(result), SimpleContainer._get_ordered_field_names())
+        self.assertEqual(result['field_integer'].dtype, np.int64)
+        self.assertEqual(result['field_decimal'].dtype, np.float64)
+        self.assertEqual(result['field_boolean'].dtype, np.bool_)
+        self.assertEqual(result['field_datetime'].dtype, np.dtype('datetime64[us]'))
+        self.assertEqual(result['field_string'].dtype, object)
+        self.assertListEqual(result['field_integer'].tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(result['field_datetime'][3], np.datetime64('2020-01-01T10:00:03'))
+
+    def test_scaled_and_fixed_width(self):
+        result = columns.to_columns(self.models, decimal_scaled=True, fixed_width_strings=True)
+        self.assertEqual(result['field_decimal'].dtype, np.int64)
+        self.assertListEqual(result['field_decimal'].tolist(), [125, 1125, 2125, 3125, 4125])
+        self.assertEqual(result['field_string'].dtype.kind, 'U')
+
+        models = columns.from_columns(SimpleContainer, result)
+        for expected, model in zip(self.models, models):
+            self.assertDictEqual(model.to_json(), expected.to_json())
+
+    def test_fixed_point(self):
+        class FixedPointContainer(document.BaseDocument):
+            field_decimal = fields.DecimalField(precision=2, fixed_point=True)
+
+        models = [FixedPointContainer(field_decimal=i + 0.25) for i in range(3)]
+        self.assertListEqual(columns.to_columns(models)['field_decimal'].tolist(), [0.25, 1.25, 2.25])
+
+        scaled = columns.to_columns(models, decimal_scaled=True)
+        self.assertListEqual(scaled['field_decimal'].tolist(), [25, 125, 225])
+        restored = columns.from_columns(FixedPointContainer, scaled)
+        self.assertListEqual([m._data['field_decimal'] for m in restored], [25, 125, 225])
+
+    def test_roundtrip(self):
+        models = columns.from_columns(SimpleContainer, columns.to_columns(self.models))
+        self.assertEqual(len(models), 5)
+        for expected, model in zip(self.models, models):
+            self.assertDictEqual(model.to_json(), expected.to_json())
+
+    def test_nullable_mask(self):
+        models = [NullableContainer(field_integer=1, field_string='a'),
+                  NullableContainer(field_decimal=1.5, field_datetime=datetime(2020, 1, 1), field_boolean=True)]
+        result = columns.to_columns(models)
+        for column in result.values():
+            self.assertIsInstance(column, np.ma.MaskedArray)
+        self.assertListEqual(result['field_integer'].mask.tolist(), [False, True])
+        self.assertListEqual(result['field_decimal'].mask.tolist(), [True, False])
+
+        restored = columns.from_columns(NullableContainer, result)
+        self.assertDictEqual(restored[0].to_json(), {'field_integer': 1, 'field_string': 'a'})
+        self.assertDictEqual(restored[1].to_json(), models[1].to_json())
+        self.assertNotIn('field_integer', restored[1])
+
+    def test_validation(self):
+        with self.assertRaises(ValidationError):
+            columns.from_columns(NullableContainer, {'field_integer': np.array([1, 200])})
+
+        masked = np.ma.MaskedArray(np.array([1, 200]), mask=[False, True])
+        models = columns.from_columns(NullableContainer, {'field_integer': masked})
+        self.assertEqual(models[0].field_integer, 1)
+        self.assertIsNone(models[1].field_integer)
+
+        objects = np.array([1, 'not a number'], dtype=object)
+        with self.assertRaises(ValidationError):
+            columns.from_columns(NullableContainer, {'field_integer': objects})
+
+        with self.assertRaises(KeyError):
+            columns.from_columns(NullableContainer, {'unknown': np.array([1])})
+
+    def test_tracked_and_deferred(self):
+        class TrackedContainer(document.BaseDocument):
+            __slots__ = ()
+            track_changes = True
+
+            field_integer = fields.IntegerField(null=True, max_value=100)
+
+        models = columns.from_columns(TrackedContainer, {'field_integer': np.array([1, 2])})
+        self.assertDictEqual(models[0].to_json_delta(), {})
+        models[0].field_integer = 3
+        self.assertDictEqual(models[0].to_json_delta(), {'$set': {'field_integer': 3}})
+        self.assertDictEqual(models[1].to_json_delta(), {})
+
+        class DeferredContainer(document.BaseDocument):
+            __slots__ = ()
+            deferred_validation = True
+
+            field_integer = fields.IntegerField(null=True, max_value=100)
+            field_string = fields.StringField(null=True)
+
+        masked = np.ma.MaskedArray(np.array([200, 1]), mask=[False, True])
+        models = columns.from_columns(DeferredContainer, {'field_integer': masked}, validate=False)
+        self.assertSetEqual(models[0]._pending, {'field_integer'})
+        self.assertSetEqual(models[1]._pending, set())
+        with self.assertRaises(ValidationError):
+            models[0].validate()
+        models[1].validate()
+
+        models = columns.from_columns(DeferredContainer, {'field_integer': np.array([1])})
+        self.assertSetEqual(models[0]._pending, set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+__author__ = 'Bohdan Mushkevych'
+
+import pickle
+import tracemalloc
+import unittest
+from datetime import datetime
+
+from odm import document, fields
+from tests.test_document_operations import SimpleContainer
+
+
+class CompactContainer(document.BaseDocument):
+    __slots__ = ()
+
+    field_string = fields.StringField()
+    field_integer = fields.IntegerField()
+    field_boolean = fields.BooleanField()
+    field_datetime = fields.DateTimeField()
+    field_decimal = fields.DecimalField(precision=3)
+
+
+class CompactNested(document.BaseDocument):
+    __slots__ = ()
+
+    field_nested = fields.NestedDocumentField(CompactContainer)
+    field_list = fields.ListField()
+
+
+def allocated_bytes(klass, count=2000):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        documents = [klass(field_string='abc', field_integer=i, field_boolean=True) for i in range(count)]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del documents
+    return sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+
+
+class TestCompactDocuments(unittest.TestCase):
+    def test_schema(self):
+        self.assertTrue(CompactContainer._schema.compact)
+        self.assertFalse(SimpleContainer._schema.compact)
+        self.assertIs(SimpleContainer._schema.data_klass, dict)
+
+    def test_no_instance_dict(self):
+        model = CompactContainer()
+        self.assertFalse(hasattr(model, '__dict__'))
+        with self.assertRaises(AttributeError):
+            model.other = 'something else'
+
+    def test_getter_setter(self):
+        now = datetime.now()
+        model = CompactContainer(field_string='a short string description', field_integer=123)
+        model.field_boolean = True
+        model['field_datetime'] = now
+        model.field_decimal = 123.123
+
+        self.assertEqual(model.field_string, 'a short string description')
+        self.assertEqual(model.field_integer, 123)
+        self.assertTrue(model.field_boolean)
+        self.assertEqual(model.field_datetime, now)
+        self.assertEqual(model.field_decimal, 123.123)
+        self.assertEqual(len(model), 5)
+
+        del model.field_integer
+        del model['field_string']
+        self.assertNotIn('field_integer', model)
+        self.assertNotIn('field_string', model)
+        self.assertEqual(len(model), 3)
+
+    def test_jsonification(self):
+        model = CompactNested()
+        model.field_nested.field_integer = 42
+        model.field_nested.field_string = 'nested'
+        model.field_list.append(1)
+
+        json_data = model.to_json()
+        self.assertDictEqual(json_data, {'field_nested': {'field_integer': 42, 'field_string': 'nested'},
+                                         'field_list': [1]})
+        m2 = CompactNested.from_json(json_data)
+        self.assertDictEqual(m2.to_json(), json_data)
+
+    def test_pickle(self):
+        model = CompactContainer(field_string='abc', field_integer=7)
+        m2 = pickle.loads(pickle.dumps(model))
+        self.assertEqual(m2.field_string, 'abc')
+        self.assertEqual(m2.field_integer, 7)
+
+    def test_memory_footprint(self):
+        class RegularContainer(document.BaseDocument):
+            field_string = fields.StringField()
+            field_integer = fields.IntegerField()
+            field_boolean = fields.BooleanField()
+
+        class SlottedContainer(document.BaseDocument):
+            __slots__ = ()
+            field_string = fields.StringField()
+            field_integer = fields.IntegerField()
+            field_boolean = fields.BooleanField()
+
+        regular = allocated_bytes(RegularContainer)
+        compact = allocated_bytes(SlottedContainer)
+        self.assertLess(compact, regular * 0.6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+__author__ = 'Bohdan Mushkevych'
+
+import unittest
+
+from odm import document, fields
+from odm.errors import ValidationError
+
+COLORS = [f'color_{i}' for i in range(64)]
+
+
+class EnumContainer(document.BaseDocument):
+    field_color = fields.StringField(choices=COLORS, null=True)
+    field_size = fields.IntegerField(choices=[(1, 'small'), (2, 'medium'), (3, 'large')], null=True)
+    field_rate = fields.DecimalField(choices=[0.5, 1, 1.25], null=True)
+    field_dict = fields.DictField(choices=[{'a': 1}, {'b': 2}], null=True)
+
+
+class TestCompiledValidators(unittest.TestCase):
+    def test_choices(self):
+        model = EnumContainer()
+        model.field_color = 'color_63'
+        self.assertEqual(model.field_color, 'color_63')
+
+        with self.assertRaises(ValidationError) as context:
+            model.field_color = 'color_64'
+        self.assertIn('is not listed among valid choices', str(context.exception))
+
+    def test_pair_choices(self):
+        model = EnumContainer()
+        model.field_size = '2'
+        self.assertEqual(model.field_size, 2)
+
+        with self.assertRaises(ValidationError) as context:
+            model.field_size = 4
+        self.assertIn('[1, 2, 3]', str(context.exception))
+
+    def test_decimal_choices(self):
+        model = EnumContainer()
+        model.field_rate = '1.25'
+        model.field_rate = 1
+        with self.assertRaises(ValidationError):
+            model.field_rate = 1.3
+
+    def test_unhashable_choices(self):
+        model = EnumContainer()
+        model.field_dict = {'b': 2}
+        with self.assertRaises(ValidationError):
+            model.field_dict = {'c': 3}
+
+    def test_unhashable_value(self):
+        field = fields.BaseField(name='field', choices=['a', 'b'])
+        field.validate('a')
+        with self.assertRaises(ValidationError):
+            field.validate(['a'])
+
+    def test_recompiled_on_change(self):
+        field = fields.StringField(name='field', max_length=3)
+        field.validate('abc')
+        field.max_length = 2
+        with self.assertRaises(ValidationError):
+            field.validate('abc')
+
+        field.choices = ['ab']
+        field.validate('ab')
+        with self.assertRaises(ValidationError):
+            field.validate('cd')
+
+    def test_fixed_point_recompiled_on_change(self):
+        field = fields.DecimalField(name='field', fixed_point=True, min_value=1)
+        field.validate(field.from_json(5))
+        field.min_value = 10
+        with self.assertRaises(ValidationError):
+            field.validate(field.from_json(5))
+        field.validate(field.from_json(10))
+
+        field.max_value = 20
+        with self.assertRaises(ValidationError):
+            field.validate(field.from_json(20.01))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -114,6 +114,38 @@ class TestDocument(unittest.TestCase):
 
         self.assertIsNone(m2.field_datetime)
 
+    def test_iso_fast_path(self):
+        fixtures = {
+            fields.DEFAULT_DT_FORMAT: ['2015-01-01 23:59:59', '2015-1-1 3:5:9', '0999-12-31 00:00:00'],
+            '%Y-%m-%dT%H:%M:%S.%f': ['2015-01-01T23:59:59.123456', '2015-01-01T23:59:59.1'],
+            '%Y-%m-%d': ['2015-01-01', '2015-1-01'],
+            '%d/%m/%Y %H:%M': ['01/02/2015 23:59'],
+        }
+
+        for dt_format, values in fixtures.items():
+            field = fields.DateTimeField(dt_format=dt_format)
+            for value in values:
+                self.assertEqual(field.from_json(value), datetime.datetime.strptime(value, dt_format))
+
+    def test_iso_fast_path_errors(self):
+        field = fields.DateTimeField()
+        for value in ['2015-02-30 23:59:59', '2015-01-01 24:00:00', '2015-01-01T23:59:59', '2015-01-01 10:00+01',
+                      '2015-01-01 23:59:59.000']:
+            try:
+                field.from_json(value)
+                self.assertTrue(False, 'ValueError should have been thrown')
+            except ValueError:
+                self.assertTrue(True, 'ValueError was expected and caught')
+
+    def test_parse_cache(self):
+        class FieldContainer(document.BaseDocument):
+            field_datetime = fields.DateTimeField(cache_size=2)
+
+        m1 = FieldContainer.from_json({'field_datetime': '2015-01-01 23:59:59'})
+        m2 = FieldContainer.from_json({'field_datetime': '2015-01-01 23:59:59'})
+        self.assertIs(m1.field_datetime, m2.field_datetime)
+        self.assertEqual(FieldContainer.field_datetime._parse.cache_info().hits, 1)
+
 
 if __name__ == '__main__':
     unittest.main()
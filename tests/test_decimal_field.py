@@ -211,6 +211,80 @@ class TestDocument(unittest.TestCase):
 
         self.assertIsNone(m2.field_decimal)
 
+    def test_fixed_point_storage(self):
+        class FieldContainer(document.BaseDocument):
+            field_decimal = fields.DecimalField(null=False, precision=3, fixed_point=True)
+
+        fixtures = {
+            '1': 1,
+            1: 1,
+            150.0015: 150.002,
+            '7654321.1234567': 7654321.123,
+            '-0.0004': 0,
+        }
+
+        model = FieldContainer()
+        for key, value in fixtures.items():
+            model.field_decimal = key
+            self.assertEqual(model.field_decimal, value)
+            self.assertIsInstance(model._data['field_decimal'], int)
+
+        model.field_decimal = 12.5
+        self.assertEqual(model._data['field_decimal'], 12500)
+        self.assertEqual(sum(m._data['field_decimal'] for m in [model, model]), 25000)
+
+    def test_fixed_point_constraints(self):
+        class FieldContainer(document.BaseDocument):
+            field_decimal = fields.DecimalField(min_value=5.01, max_value=10, choices=[5.01, 7.5, 10],
+                                                fixed_point=True)
+
+        model = FieldContainer()
+        for value in [5.01, '7.50', 10]:
+            model.field_decimal = value
+            self.assertEqual(model.field_decimal, float(value))
+
+        for value in [5.00, 10.01, 8, 'not a number']:
+            try:
+                model.field_decimal = value
+                self.assertTrue(False, 'ValidationError should have been thrown')
+            except ValidationError:
+                self.assertTrue(True, 'ValidationError was expected and caught')
+
+    def test_fixed_point_jsonification(self):
+        class FieldContainer(document.BaseDocument):
+            field_decimal = fields.DecimalField(precision=2, fixed_point=True)
+            field_string = fields.DecimalField(precision=5, fixed_point=True, force_string=True)
+            field_default = fields.DecimalField(precision=2, fixed_point=True, default=DEFAULT_VALUE)
+
+        model = FieldContainer(field_decimal=123.456, field_string=1)
+        self.assertEqual(model.field_default, DEFAULT_VALUE)
+        self.assertEqual(model._data['field_default'], 98765)
+
+        json_data = model.to_json()
+        self.assertDictEqual(json_data, {'field_decimal': 123.46, 'field_string': '1.00000',
+                                         'field_default': DEFAULT_VALUE})
+        m2 = FieldContainer.from_json(json_data)
+        self.assertEqual(m2._data['field_decimal'], 12346)
+        self.assertEqual(m2._data['field_string'], 100000)
+        self.assertDictEqual(m2.to_json(), json_data)
+
+    def test_fixed_point_default_reset(self):
+        class FieldContainer(document.BaseDocument):
+            field_decimal = fields.DecimalField(precision=2, fixed_point=True, default=1.5)
+
+        self.assertEqual(FieldContainer.field_decimal.default, 1.5)
+
+        model = FieldContainer(field_decimal=7.25)
+        self.assertEqual(model._data['field_decimal'], 725)
+
+        del model.field_decimal
+        self.assertEqual(model.field_decimal, 1.5)
+        self.assertEqual(model._data['field_decimal'], 150)
+
+        model.field_decimal = None
+        self.assertEqual(model.field_decimal, 1.5)
+        self.assertEqual(model._data['field_decimal'], 150)
+
 
 if __name__ == '__main__':
     unittest.main()
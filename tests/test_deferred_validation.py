@@ -0,0 +1,113 @@
+__author__ = 'Bohdan Mushkevych'
+
+import unittest
+
+from odm import document, fields
+from odm.errors import ValidationError
+from tests.test_document_operations import SimpleContainer
+
+
+class DeferredContainer(document.BaseDocument):
+    deferred_validation = True
+
+    field_string = fields.StringField(null=True, max_length=5)
+    field_integer = fields.IntegerField(null=False, max_value=10)
+    field_default = fields.IntegerField(null=False, default=3)
+
+
+class DeferredHost(document.BaseDocument):
+    deferred_validation = True
+
+    field_nested = fields.NestedDocumentField(DeferredContainer)
+    field_list = fields.ListField(null=True)
+
+
+class ImmediateContainer(document.BaseDocument):
+    field_integer = fields.IntegerField(max_value=10)
+
+
+class TestDeferredValidation(unittest.TestCase):
+    def test_assignment_skips_validation(self):
+        model = DeferredContainer(field_string='too long string')
+        model.field_integer = 100
+        self.assertSetEqual(model._pending, {'field_string', 'field_integer'})
+
+        with self.assertRaises(ValidationError):
+            model.validate()
+
+        model.field_string = 'short'
+        model.field_integer = 5
+        model.validate()
+        self.assertSetEqual(model._pending, set())
+
+    def test_only_pending_fields_are_validated(self):
+        model = DeferredContainer(field_string='short', field_integer=1)
+        model.validate()
+
+        # bypass the descriptor: the value is not pending, hence is not re-validated
+        model._data['field_string'] = 'too long string'
+        model.validate()
+
+        model.field_integer = None
+        with self.assertRaises(ValidationError):
+            model.validate()
+
+    def test_non_nullable_presence(self):
+        model = DeferredContainer(field_string='short')
+        with self.assertRaises(ValidationError):
+            model.validate()
+
+        model.field_default = None
+        self.assertEqual(model.field_default, 3)
+
+    def test_from_json_per_call(self):
+        json_data = {'field_string': 'too long string', 'field_integer': 1}
+        with self.assertRaises(ValidationError):
+            SimpleContainer.from_json({'field_integer': 'abc'})
+
+        model = SimpleContainer.from_json({'field_integer': 'abc'}, deferred_validation=True)
+        self.assertSetEqual(model._pending, {'field_integer'})
+        with self.assertRaises(ValidationError):
+            model.validate()
+
+        with self.assertRaises(ValidationError):
+            DeferredContainer.from_json(json_data, deferred_validation=False)
+        model = DeferredContainer.from_json(json_data)
+        self.assertSetEqual(model._pending, {'field_string', 'field_integer'})
+
+        models = SimpleContainer.from_json_many([{'field_integer': 'abc'}], deferred_validation=True)
+        self.assertSetEqual(models[0]._pending, {'field_integer'})
+
+    def test_per_call_mode_ends_with_validation(self):
+        model = ImmediateContainer.from_json({'field_integer': 100}, deferred_validation=True)
+        self.assertRaises(ValidationError, model.validate)
+
+        model.field_integer = 2
+        model.validate()
+        self.assertIsNone(model._pending)
+        with self.assertRaises(ValidationError):
+            model.field_integer = 100
+
+        # class-level deferred mode continues after the validation
+        model = DeferredContainer.from_json({'field_integer': 1})
+        model.validate()
+        model.field_integer = 100
+        self.assertSetEqual(model._pending, {'field_integer'})
+
+    def test_nested(self):
+        model = DeferredHost.from_json({'field_nested': {'field_integer': 100}})
+        self.assertSetEqual(model._pending, {'field_nested'})
+        self.assertSetEqual(model.field_nested._pending, {'field_integer'})
+        with self.assertRaises(ValidationError):
+            model.validate()
+
+        model.field_nested.field_integer = 1
+        model.validate()
+
+        model.field_nested = 'not a document'
+        with self.assertRaises(ValidationError):
+            model.validate()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+__author__ = 'Bohdan Mushkevych'
+
+import gc
+import unittest
+
+from odm import document, fields
+from odm.collection import DocumentCollection, merge_fields
+from odm.errors import ValidationError
+
+
+class Account(document.BaseDocument):
+    account_id = fields.IntegerField()
+    name = fields.StringField(null=True)
+    balance = fields.IntegerField(null=True)
+
+    @classmethod
+    def key_fields(cls):
+        return cls.account_id.name
+
+
+class Position(document.BaseDocument):
+    account_id = fields.IntegerField()
+    symbol = fields.StringField()
+    quantity = fields.IntegerField(null=True)
+
+    @classmethod
+    def key_fields(cls):
+        return cls.account_id.name, cls.symbol.name
+
+
+class Unkeyed(document.BaseDocument):
+    field_integer = fields.IntegerField(null=True)
+
+
+class TestDocumentCollection(unittest.TestCase):
+    def test_operations(self):
+        accounts = DocumentCollection[Account]()
+        first = accounts.upsert(Account(account_id=1, name='first'))
+        accounts.upsert(Account(account_id=2, name='second'))
+
+        self.assertEqual(len(accounts), 2)
+        self.assertIn(1, accounts)
+        self.assertNotIn(3, accounts)
+        self.assertIs(accounts[1], first)
+        self.assertIs(accounts.get(1), first)
+        self.assertIsNone(accounts.get(3))
+        self.assertEqual(sorted(accounts.keys()), [1, 2])
+        self.assertEqual(sorted(account.name for account in accounts), ['first', 'second'])
+
+        self.assertIs(accounts.delete(1), first)
+        self.assertRaises(KeyError, accounts.delete, 1)
+        accounts.discard(1)
+        del accounts[2]
+        self.assertEqual(len(accounts), 0)
+
+    def test_parametrized_klass(self):
+        self.assertIs(DocumentCollection[Account], DocumentCollection[Account])
+        self.assertIs(DocumentCollection[Account].document_klass, Account)
+        self.assertRaises(TypeError, DocumentCollection)
+        self.assertRaises(NotImplementedError, DocumentCollection[Unkeyed])
+        self.assertRaises(TypeError, DocumentCollection[Account]().upsert, Unkeyed())
+
+    def test_last_writer_wins(self):
+        accounts = DocumentCollection[Account]([Account(account_id=1, name='first')])
+        second = Account(account_id=1, balance=10)
+        accounts.extend([second])
+        self.assertIs(accounts[1], second)
+        self.assertIsNone(accounts[1].name)
+
+    def test_merge(self):
+        first = Account(account_id=1, name='first')
+        accounts = DocumentCollection[Account]([first], merge=merge_fields)
+        self.assertIs(accounts.upsert(Account(account_id=1, balance=10)), first)
+        self.assertEqual(first.to_json(), {'account_id': 1, 'name': 'first', 'balance': 10})
+
+        # per-call policy overrides the collection's one
+        replacement = Account(account_id=1)
+        accounts.extend([replacement], merge=lambda existing, incoming: incoming)
+        self.assertIs(accounts[1], replacement)
+
+    def test_key_reassignment(self):
+        account = Account(account_id=1)
+        accounts = DocumentCollection[Account]([account])
+        account.account_id = 5
+        self.assertNotIn(1, accounts)
+        self.assertIs(accounts[5], account)
+
+        # failed assignment keeps the document under its key
+        self.assertRaises(ValidationError, setattr, account, 'account_id', 'not a number')
+        self.assertIs(accounts[5], account)
+
+        # other fields, and documents outside of the collection do not affect the index
+        account.name = 'renamed'
+        Account(account_id=5)
+        self.assertEqual(list(accounts.keys()), [5])
+
+    def test_key_reassignment_collision(self):
+        first, second = Account(account_id=1, name='first'), Account(account_id=2, balance=20)
+        accounts = DocumentCollection[Account]([first, second], merge=merge_fields)
+        second.account_id = 1
+        self.assertEqual(len(accounts), 1)
+        self.assertIs(accounts[1], first)
+        self.assertEqual(first.to_json(), {'account_id': 1, 'name': 'first', 'balance': 20})
+
+    def test_composite_key_reassignment(self):
+        position = Position(account_id=1, symbol='A')
+        other = Position(account_id=2, symbol='B')
+        positions = DocumentCollection[Position]([position, other])
+
+        # intermediate key (2, 'A') is never indexed
+        position.key = (2, 'C')
+        self.assertEqual(sorted(positions.keys()), [(2, 'B'), (2, 'C')])
+        self.assertIs(positions[(2, 'B')], other)
+        self.assertIs(positions[(2, 'C')], position)
+
+        position.symbol = 'D'
+        self.assertIs(positions[(2, 'D')], position)
+
+    def test_several_collections(self):
+        account = Account(account_id=1)
+        first, second = DocumentCollection[Account]([account]), DocumentCollection[Account]([account])
+        account.account_id = 2
+        self.assertIs(first[2], account)
+        self.assertIs(second[2], account)
+
+    def test_released_collection(self):
+        accounts = DocumentCollection[Account]([Account(account_id=1)])
+        observers = Account.account_id._observers
+        self.assertIn(accounts, observers)
+        del accounts
+        gc.collect()
+        self.assertEqual(len(observers), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+__author__ = 'Bohdan Mushkevych'
+
+import unittest
+
+from odm import document, fields
+from tests.test_document_operations import SimpleContainer
+
+
+class NestedContainer(document.BaseDocument):
+    field_nested = fields.NestedDocumentField(SimpleContainer)
+    field_integer = fields.IntegerField(name='i')
+
+
+class TestDocumentSchema(unittest.TestCase):
+    def test_schema_is_per_class(self):
+        class Parent(document.BaseDocument):
+            a = fields.StringField()
+
+        class Child(Parent):
+            b = fields.IntegerField()
+
+        self.assertIsNot(Parent._schema, Child._schema)
+        self.assertListEqual(list(Parent._get_fields()), ['a'])
+        self.assertListEqual(list(Child._get_fields()), ['a', 'b'])
+        self.assertListEqual(Child._get_ordered_field_names(), ['a', 'b'])
+
+    def test_override_in_subclass(self):
+        class Parent(document.BaseDocument):
+            a = fields.StringField()
+            b = fields.StringField()
+
+        class Child(Parent):
+            b = None
+
+        self.assertListEqual(list(Parent._get_fields()), ['a', 'b'])
+        self.assertListEqual(list(Child._get_fields()), ['a'])
+
+    def test_schema_maps(self):
+        schema = NestedContainer._schema
+        self.assertSetEqual(set(schema.fields), {'field_nested', 'i'})
+        self.assertSetEqual(set(schema.attributes), {'field_nested', 'field_integer'})
+        self.assertSetEqual(set(schema.nested_fields), {'field_nested'})
+        self.assertSetEqual(set(schema.plain_fields), {'i'})
+        self.assertTupleEqual(schema.ordered_field_names, ('field_nested', 'i'))
+
+    def test_instances_share_schema(self):
+        model_a = NestedContainer()
+        model_b = NestedContainer()
+        self.assertIs(model_a._fields, model_b._fields)
+        self.assertIs(model_a._attributes, NestedContainer._schema.attributes)
+        self.assertNotIn('_fields', model_a.__dict__)
+
+    def test_lazy_key_fields(self):
+        class Example(document.BaseDocument):
+            alpha = fields.IntegerField()
+
+            @classmethod
+            def key_fields(cls):
+                return Example.alpha.name
+
+        self.assertTupleEqual(Example._schema.key_fields, ('alpha',))
+        self.assertFalse(Example._schema.composite_key)
+
+        with self.assertRaises(NotImplementedError):
+            _ = NestedContainer._schema.key_fields
+
+
+if __name__ == '__main__':
+    unittest.main()
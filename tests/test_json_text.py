@@ -0,0 +1,119 @@
+__author__ = 'Bohdan Mushkevych'
+
+import json
+import unittest
+from datetime import datetime
+
+from odm import document, fields
+from odm.errors import ValidationError
+from tests.test_codegen import UpperStringField
+
+
+class TextNested(document.BaseDocument):
+    field_string = fields.StringField(null=True)
+    field_boolean = fields.BooleanField(null=True)
+
+
+class TextContainer(document.BaseDocument):
+    field_id = fields.ObjectIdField(name='_id', null=True)
+    field_integer = fields.IntegerField(name='"quoted"\tkey', null=True)
+    field_decimal = fields.DecimalField(precision=3, null=True)
+    field_fixed = fields.DecimalField(fixed_point=True, null=True)
+    field_float = fields.DecimalField(null=True)
+    field_forced = fields.DecimalField(force_string=True, null=True)
+    field_datetime = fields.DateTimeField(null=True)
+    field_boolean = fields.BooleanField(null=True)
+    field_string = fields.StringField(null=True)
+    field_nested = fields.NestedDocumentField(TextNested)
+    field_list = fields.ListField(null=True)
+    field_timestamps = fields.ListField(fields.DateTimeField(), null=True)
+    field_dict = fields.DictField(null=True)
+    field_upper = UpperStringField(null=True)
+    field_any = fields.BaseField('any', null=True)
+
+
+class CompactTextContainer(document.BaseDocument):
+    __slots__ = ()
+    field_integer = fields.IntegerField()
+    field_string = fields.StringField(default='default')
+
+
+class TestJsonText(unittest.TestCase):
+    def assert_identical(self, model):
+        self.assertEqual(model.to_json_str(), json.dumps(model.to_json()))
+        self.assertEqual(model.to_json_bytes(), json.dumps(model.to_json()).encode('utf-8'))
+
+    def test_all_fields(self):
+        model = TextContainer()
+        model.field_id = 'a1b2c3'
+        model.field_integer = -2 ** 80
+        model.field_decimal = '-12.3456'
+        model.field_fixed = 99.99
+        model.field_forced = 1.5
+        model.field_datetime = datetime(2021, 5, 6, 7, 8, 9, 123456)
+        model.field_boolean = False
+        model.field_string = 'юнікод "quoted"\n  😀'
+        model.field_nested.field_boolean = True
+        model.field_list = [1, 'two', {'three': 3.0}, None]
+        model.field_timestamps = [datetime(2021, 1, 1)]
+        model.field_dict = {'a': None, 'ключ': [True]}
+        model.field_upper = 'upper'
+        model.field_any = {'nested': {'deeper': 1}}
+        self.assert_identical(model)
+
+    def test_special_floats(self):
+        for value in (float('nan'), 0.1, -0.0, 12345.678):
+            model = TextContainer(field_float=value, field_forced=value, field_any=[float('inf'), float('-inf')])
+            self.assert_identical(model)
+
+    def test_empty(self):
+        model = TextContainer()
+        self.assertEqual(model.to_json_str(), '{}')
+        self.assert_identical(model)
+
+    def test_subclassed_values(self):
+        class Text(str):
+            pass
+
+        model = TextContainer()
+        model._data['field_string'] = Text('subclass')
+        model._data['field_boolean'] = 1
+        self.assert_identical(model)
+
+    def test_compact(self):
+        model = CompactTextContainer(field_integer=7)
+        self.assertEqual(model.to_json_str(), '{"field_integer": 7, "field_string": "default"}')
+        self.assert_identical(model)
+
+    def test_lazy(self):
+        json_data = {'_id': 'abc', 'field_string': 'lazy', 'field_nested': {'field_string': 'nested'},
+                     'field_list': [1, 2]}
+        model = TextContainer.from_json_lazy(json_data)
+        self.assertEqual(model.to_json_str(), json.dumps(json_data, sort_keys=True))
+        self.assert_identical(model)
+
+        model.field_string = 'touched'
+        self.assert_identical(model)
+
+    def test_from_json_str(self):
+        model = TextContainer(field_id='abc', field_integer=7, field_string='юнікод', field_list=[1, {'a': 2}],
+                              field_datetime=datetime(2021, 5, 6, 7, 8, 9))
+        model.field_nested.field_string = 'nested'
+        for text in (model.to_json_str(), model.to_json_bytes(), model.to_json_str().encode('utf-16')):
+            restored = TextContainer.from_json_str(text)
+            self.assertEqual(restored.to_json(), model.to_json())
+            self.assertIsInstance(restored.field_nested, TextNested)
+            self.assertEqual(restored.field_datetime, datetime(2021, 5, 6, 7, 8, 9))
+
+    def test_from_json_str_unknown_keys(self):
+        model = CompactTextContainer.from_json_str('{"field_integer": 1, "unknown": {"deep": [1, 2]}}')
+        self.assertEqual(model.to_json(), {'field_integer': 1, 'field_string': 'default'})
+
+    def test_from_json_str_errors(self):
+        self.assertRaises(ValueError, CompactTextContainer.from_json_str, '{"field_integer": ')
+        self.assertRaises(ValueError, CompactTextContainer.from_json_str, '[{"field_integer": 1}]')
+        self.assertRaises(ValidationError, CompactTextContainer.from_json_str, '{"field_integer": "text"}')
+
+
+if __name__ == '__main__':
+    unittest.main()
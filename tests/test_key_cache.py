@@ -0,0 +1,80 @@
+__author__ = 'Bohdan Mushkevych'
+
+import unittest
+
+from odm import document, fields
+
+
+class Trade(document.BaseDocument):
+    trade_id = fields.IntegerField()
+    venue = fields.StringField(default='NYSE')
+    price = fields.DecimalField(null=True)
+    quantity = fields.IntegerField(null=True)
+
+    @classmethod
+    def key_fields(cls):
+        return cls.trade_id.name, cls.venue.name, cls.price.name
+
+
+class CachedTrade(Trade):
+    cache_key = True
+
+
+class CompactCachedTrade(Trade):
+    __slots__ = ()
+    cache_key = True
+
+
+class Order(document.BaseDocument):
+    cache_key = True
+    order_id = fields.StringField()
+
+    @classmethod
+    def key_fields(cls):
+        return cls.order_id.name
+
+
+class TestKeyCache(unittest.TestCase):
+    def test_generated_key(self):
+        model = Trade(trade_id=1, price='10.5')
+        # defaults are applied, and the values are read as through the descriptors
+        self.assertEqual(model.key, (1, 'NYSE', 10.5))
+        self.assertEqual(Order(order_id='a').key, 'a')
+        self.assertIsNone(Order().key)
+
+    def test_cached_key(self):
+        for klass in (CachedTrade, CompactCachedTrade):
+            model = klass(trade_id=1, price=10)
+            key = model.key
+            self.assertIs(model.key, key)
+            self.assertEqual(hash(model), hash((1, 'NYSE', 10.0)))
+
+            model.trade_id = 2
+            self.assertEqual(model.key, (2, 'NYSE', 10.0))
+            model.key = (3, 'LSE', 11)
+            self.assertEqual(model.key, (3, 'LSE', 11.0))
+            del model.price
+            self.assertEqual(model.key, (3, 'LSE', None))
+
+    def test_uncached_key(self):
+        model = Trade(trade_id=1)
+        self.assertIsNot(model.key, model.key)
+        self.assertIsNone(model._key)
+
+    def test_clone(self):
+        model = CachedTrade(trade_id=1)
+        key = model.key
+        duplicate = model.clone()
+        self.assertIs(duplicate.key, key)
+        duplicate.trade_id = 2
+        self.assertIs(model.key, key)
+        self.assertEqual(duplicate.key, (2, 'NYSE', None))
+
+    def test_set_membership(self):
+        models = {CachedTrade(trade_id=i) for i in range(3)}
+        self.assertIn(CachedTrade(trade_id=1), models)
+        self.assertNotIn(CachedTrade(trade_id=1, venue='LSE'), models)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+__author__ = 'Bohdan Mushkevych'
+
+import pickle
+import unittest
+from datetime import datetime
+from decimal import Decimal
+
+from odm import document, fields
+from odm.errors import ValidationError
+from tests.test_document_operations import SimpleContainer
+from tests.test_nested_documents import NestedDocuments
+
+
+class TestLazyDocuments(unittest.TestCase):
+    def setUp(self):
+        self.json_data = {'field_string': 'a short string description',
+                          'field_integer': 123,
+                          'field_boolean': True,
+                          'field_datetime': '2020-01-01 23:59:59',
+                          'field_decimal': 123.1234}
+
+    def test_conversion_on_access(self):
+        model = SimpleContainer.from_json_lazy(self.json_data)
+        self.assertEqual(len(model._data.pending), 5)
+
+        self.assertEqual(model.field_datetime, datetime(2020, 1, 1, 23, 59, 59))
+        self.assertIsInstance(model._data['field_datetime'], datetime)
+        self.assertNotIn('field_datetime', model._data.pending)
+        self.assertEqual(len(model._data.pending), 4)
+        self.assertEqual(len(model), 5)
+
+        self.assertEqual(model.field_decimal, 123.123)
+        self.assertIsInstance(model._data['field_decimal'], Decimal)
+
+    def test_pass_through(self):
+        model = SimpleContainer.from_json_lazy(self.json_data)
+        self.assertDictEqual(model.to_json(), self.json_data)
+
+        # converted fields are serialized as usual, pending fields are passed as is
+        _ = model.field_decimal
+        json_data = model.to_json()
+        self.assertEqual(json_data['field_decimal'], 123.123)
+        self.assertEqual(json_data['field_datetime'], '2020-01-01 23:59:59')
+        self.assertListEqual(list(json_data), list(SimpleContainer.from_json(self.json_data).to_json()))
+
+        self.assertEqual(SimpleContainer.to_json_many([model])[0]['field_decimal'], 123.123)
+
+    def test_assignment_and_deletion(self):
+        model = SimpleContainer.from_json_lazy(self.json_data)
+        model.field_integer = 456
+        del model.field_string
+        self.assertEqual(model.field_integer, 456)
+        self.assertIsNone(model.field_string)
+        self.assertNotIn('field_integer', model._data.pending)
+        self.assertNotIn('field_string', model.to_json())
+
+    def test_deferred_errors(self):
+        json_data = dict(self.json_data, field_integer='not a number')
+        model = SimpleContainer.from_json_lazy(json_data)
+        self.assertEqual(model.field_string, 'a short string description')
+        with self.assertRaises(ValidationError):
+            _ = model.field_integer
+        self.assertIn('field_integer', model._data.pending)
+
+        with self.assertRaises(ValidationError):
+            model.validate()
+
+    def test_null_values(self):
+        class FieldContainer(document.BaseDocument):
+            field_integer = fields.IntegerField(null=False, default=5)
+
+        model = FieldContainer.from_json_lazy({'field_integer': None})
+        self.assertEqual(model.field_integer, 5)
+
+    def test_nested(self):
+        json_data = {'field_integer': 1, 'field_nested': self.json_data}
+        model = NestedDocuments.from_json_lazy(json_data)
+        self.assertDictEqual(model.to_json(), json_data)
+
+        nested = model.field_nested
+        self.assertIsInstance(nested, SimpleContainer)
+        self.assertEqual(len(nested._data.pending), 5)
+        self.assertTrue(nested.field_boolean)
+
+    def test_pickle(self):
+        model = SimpleContainer.from_json_lazy(self.json_data)
+        m2 = pickle.loads(pickle.dumps(model))
+        self.assertIs(m2._data.__class__, dict)
+        self.assertDictEqual(m2.to_json(), SimpleContainer.from_json(self.json_data).to_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
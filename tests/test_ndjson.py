@@ -0,0 +1,124 @@
+__author__ = 'Bohdan Mushkevych'
+
+import gzip
+import io
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from odm import document, fields, ndjson
+from odm.errors import BatchError, ValidationError
+from tests.test_document_operations import SimpleContainer
+
+TRACKED_LINES = ['{"field_integer": 1, "field_string": "a"}\n', '{"field_integer": 2, "field_string": "b"}\n'] * 10
+
+NON_OBJECT_LINES = ['[1, 2]\n', '"text"\n', '5\n', 'null\n', '{"field_integer": 1, "field_string": "a"}\n']
+
+# values violate the constraints of the DeferredContainer, which are checked only by its `validate()`
+DEFERRED_LINES = ['{"field_integer": -1, "field_string": "a"}\n', '{"field_integer": 2, "field_string": "b"}\n'] * 10
+
+
+class TrackedContainer(document.BaseDocument):
+    track_changes = True
+
+    field_string = fields.StringField()
+    field_integer = fields.IntegerField()
+
+
+class DeferredContainer(document.BaseDocument):
+    deferred_validation = True
+
+    field_string = fields.StringField()
+    field_integer = fields.IntegerField(min_value=0)
+
+
+class TestNdjson(unittest.TestCase):
+    def setUp(self):
+        self.models = [SimpleContainer(field_string=f'string {i}',
+                                       field_integer=i,
+                                       field_datetime=datetime(2020, 1, 1, 10, 0, i % 60),
+                                       field_decimal=i / 8) for i in range(50)]
+
+    def assert_models(self, models):
+        self.assertEqual(len(models), len(self.models))
+        for expected, model in zip(self.models, models):
+            self.assertDictEqual(model.to_json(), expected.to_json())
+
+    def test_text_roundtrip(self):
+        stream = io.StringIO()
+        self.assertEqual(ndjson.write_ndjson(self.models, stream, batch_size=7, buffer_size=100), 50)
+        self.assertEqual(stream.getvalue().count('\n'), 50)
+
+        stream.seek(0)
+        self.assert_models(list(ndjson.iter_ndjson(SimpleContainer, stream, batch_size=7)))
+
+    def test_binary_and_gzip_streams(self):
+        stream = io.BytesIO()
+        ndjson.write_ndjson(self.models, stream)
+        stream.seek(0)
+        self.assert_models(list(ndjson.iter_ndjson(SimpleContainer, stream)))
+
+        compressed = io.BytesIO()
+        with gzip.GzipFile(fileobj=compressed, mode='wb') as fileobj:
+            ndjson.write_ndjson(self.models, fileobj)
+        compressed.seek(0)
+        self.assert_models(list(ndjson.iter_ndjson(SimpleContainer, compressed)))
+
+    def test_paths(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for file_name in ('documents.ndjson', 'documents.ndjson.gz'):
+                path = os.path.join(directory, file_name)
+                ndjson.write_ndjson(iter(self.models), path)
+                self.assert_models(list(ndjson.iter_ndjson(SimpleContainer, path)))
+
+            with open(os.path.join(directory, 'documents.ndjson.gz'), 'rb') as fileobj:
+                self.assertEqual(fileobj.read(2), ndjson.GZIP_MAGIC)
+
+    def test_errors(self):
+        stream = io.StringIO('{"field_integer": 1}\n'
+                             '\n'
+                             'not a json\n'
+                             '{"field_integer": "not a number"}\n'
+                             '{"field_integer": 4}\n')
+        errors = list()
+        models = list(ndjson.iter_ndjson(SimpleContainer, stream, batch_size=2, errors=errors))
+        self.assertListEqual([model.field_integer for model in models], [1, 4])
+        self.assertListEqual([line_number for line_number, _ in errors], [2, 3])
+
+        stream.seek(0)
+        with self.assertRaises(BatchError):
+            list(ndjson.iter_ndjson(SimpleContainer, stream))
+
+    def test_non_object_lines(self):
+        errors = list()
+        models = list(ndjson.iter_ndjson(TrackedContainer, NON_OBJECT_LINES, errors=errors))
+        self.assertEqual([model.field_integer for model in models], [1])
+        self.assertEqual([line_number for line_number, _ in errors], [0, 1, 2, 3])
+        for _, e in errors:
+            self.assertIsInstance(e, ValueError)
+
+    def test_lazy_iteration(self):
+        # the reader must not consume the whole input before yielding the first document
+        lines = ('{"field_integer": %d}\n' % i for i in range(10 ** 6))
+        iterator = ndjson.iter_ndjson(SimpleContainer, lines, batch_size=10)
+        self.assertEqual(next(iterator).field_integer, 0)
+
+    def test_change_tracking(self):
+        models = list(ndjson.iter_ndjson(TrackedContainer, TRACKED_LINES, batch_size=7))
+        self.assertEqual(len(models), 20)
+        for model in models:
+            self.assertDictEqual(model.to_json_delta(), {})
+
+        models[0].field_integer = 10
+        self.assertDictEqual(models[0].to_json_delta(), {'$set': {'field_integer': 10}})
+
+    def test_deferred_validation(self):
+        models = list(ndjson.iter_ndjson(DeferredContainer, DEFERRED_LINES, batch_size=7))
+        self.assertEqual([model.field_integer for model in models], [-1, 2] * 10)
+        self.assertRaises(ValidationError, models[0].validate)
+        models[1].validate()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+__author__ = 'Bohdan Mushkevych'
+
+import gzip
+import io
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from odm import ndjson, parallel
+from odm.errors import BatchError, ValidationError
+from tests.test_document_operations import SimpleContainer
+from tests.test_ndjson import DEFERRED_LINES, NON_OBJECT_LINES, TRACKED_LINES, DeferredContainer, TrackedContainer
+
+
+def integer_of(document):
+    return document.field_integer
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        self.models = [SimpleContainer(field_string=f'string {i}',
+                                       field_integer=i,
+                                       field_datetime=datetime(2020, 1, 1, 10, 0, i % 60),
+                                       field_decimal=i / 8) for i in range(200)]
+        handle, self.path = tempfile.mkstemp(suffix='.ndjson')
+        os.close(handle)
+        ndjson.write_ndjson(self.models, self.path)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def assert_models(self, models):
+        self.assertEqual([model.to_json() for model in models], [model.to_json() for model in self.models])
+
+    def test_file_ordered(self):
+        models = list(parallel.iter_ndjson(SimpleContainer, self.path, workers=2, chunk_size=500))
+        self.assert_models(models)
+
+    def test_file_unordered(self):
+        values = list(parallel.iter_ndjson(SimpleContainer, self.path, workers=2, chunk_size=500, ordered=False,
+                                           transform=integer_of))
+        self.assertEqual(sorted(values), list(range(200)))
+
+    def test_gzip_and_streams(self):
+        gzip_path = self.path + '.gz'
+        try:
+            ndjson.write_ndjson(self.models, gzip_path)
+            self.assert_models(list(parallel.iter_ndjson(SimpleContainer, gzip_path, workers=2, chunk_size=500)))
+        finally:
+            os.remove(gzip_path)
+
+        with open(self.path, 'rb') as fileobj:
+            stream = io.BytesIO(gzip.compress(fileobj.read()))
+        self.assert_models(list(parallel.iter_ndjson(SimpleContainer, stream, workers=2, chunk_size=500)))
+
+        with open(self.path, 'r') as fileobj:
+            lines = fileobj.readlines()
+        values = parallel.iter_ndjson(SimpleContainer, lines, workers=2, chunk_size=500, transform=integer_of)
+        self.assertEqual(list(values), list(range(200)))
+
+    def test_errors(self):
+        lines = ['{"field_integer": 1}\n', 'not a json\n', '\n', '{"field_integer": "text"}\n'] * 20
+        for ordered in (True, False):
+            errors = list()
+            values = list(parallel.iter_ndjson(SimpleContainer, lines, workers=2, chunk_size=64, ordered=ordered,
+                                               transform=integer_of, errors=errors))
+            self.assertEqual(values, [1] * 20)
+            self.assertEqual([line_number for line_number, _ in errors],
+                             sorted([i * 4 + 1 for i in range(20)] + [i * 4 + 3 for i in range(20)]))
+
+            with self.assertRaises(BatchError):
+                list(parallel.iter_ndjson(SimpleContainer, lines, workers=2, chunk_size=64, ordered=ordered))
+
+    def test_non_object_lines(self):
+        errors = list()
+        models = list(parallel.iter_ndjson(TrackedContainer, NON_OBJECT_LINES, workers=2, errors=errors))
+        self.assertEqual([model.field_integer for model in models], [1])
+        self.assertEqual([line_number for line_number, e in errors if isinstance(e, ValueError)], [0, 1, 2, 3])
+
+    def test_change_tracking(self):
+        for ordered in (True, False):
+            models = list(parallel.iter_ndjson(TrackedContainer, TRACKED_LINES, workers=2, chunk_size=100,
+                                               ordered=ordered))
+            self.assertEqual(len(models), 20)
+            for model in models:
+                self.assertDictEqual(model.to_json_delta(), {})
+
+    def test_deferred_validation(self):
+        for ordered in (True, False):
+            models = list(parallel.iter_ndjson(DeferredContainer, DEFERRED_LINES, workers=2, chunk_size=100,
+                                               ordered=ordered))
+            self.assertEqual(sorted(model.field_integer for model in models), [-1] * 10 + [2] * 10)
+            for model in models:
+                if model.field_integer < 0:
+                    self.assertRaises(ValidationError, model.validate)
+                else:
+                    model.validate()
+
+
+if __name__ == '__main__':
+    unittest.main()
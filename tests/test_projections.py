@@ -0,0 +1,111 @@
+__author__ = 'Bohdan Mushkevych'
+
+import unittest
+from datetime import datetime
+
+from odm import document, fields
+from odm.errors import FieldDoesNotExist, ValidationError
+
+
+class ProjectedLeaf(document.BaseDocument):
+    field_string = fields.StringField(null=True)
+    field_integer = fields.IntegerField(null=True)
+
+
+class ProjectedNested(document.BaseDocument):
+    field_string = fields.StringField(null=True)
+    field_datetime = fields.DateTimeField(null=True)
+    field_leaf = fields.NestedDocumentField(ProjectedLeaf, null=True)
+
+
+class ProjectedContainer(document.BaseDocument):
+    field_id = fields.ObjectIdField(name='_id', null=True)
+    field_integer = fields.IntegerField(null=True)
+    field_decimal = fields.DecimalField(null=True)
+    field_string = fields.StringField(default='default')
+    field_list = fields.ListField(null=True)
+    field_nested = fields.NestedDocumentField(ProjectedNested, null=True)
+
+
+JSON_DATA = {
+    '_id': 'abc',
+    'field_integer': 7,
+    'field_decimal': 1.5,
+    'field_string': 'string',
+    'field_list': [1, 2],
+    'field_nested': {
+        'field_string': 'nested',
+        'field_datetime': '2021-01-01 00:00:00',
+        'field_leaf': {'field_string': 'leaf', 'field_integer': 1},
+    },
+}
+
+
+class TestProjections(unittest.TestCase):
+    def setUp(self):
+        self.model = ProjectedContainer.from_json(JSON_DATA)
+
+    def test_to_json_only(self):
+        self.assertEqual(self.model.to_json(only=['_id', 'field_integer']), {'_id': 'abc', 'field_integer': 7})
+        self.assertEqual(self.model.to_json(only='field_decimal'), {'field_decimal': 1.5})
+        only = ['field_nested.field_leaf.field_integer', 'field_nested.field_string']
+        self.assertEqual(self.model.to_json(only=only),
+                         {'field_nested': {'field_string': 'nested', 'field_leaf': {'field_integer': 1}}})
+        # the whole nested document wins over its paths
+        self.assertEqual(self.model.to_json(only=['field_nested.field_string', 'field_nested']),
+                         {'field_nested': JSON_DATA['field_nested']})
+        self.assertEqual(self.model.to_json(only=[]), {})
+
+    def test_to_json_exclude(self):
+        expected = dict(JSON_DATA)
+        del expected['field_list']
+        expected['field_nested'] = {'field_string': 'nested', 'field_datetime': '2021-01-01 00:00:00',
+                                    'field_leaf': {'field_integer': 1}}
+        self.assertEqual(self.model.to_json(exclude=['field_list', 'field_nested.field_leaf.field_string']), expected)
+        self.assertEqual(self.model.to_json(only=['field_integer', 'field_string'], exclude=['field_string']),
+                         {'field_integer': 7})
+        # keys keep the order of the full JSON
+        self.assertEqual(list(self.model.to_json(exclude=['field_list'])),
+                         [key for key in self.model.to_json() if key != 'field_list'])
+
+    def test_defaults(self):
+        model = ProjectedContainer()
+        self.assertEqual(model.to_json(only=['field_string', 'field_nested.field_string']),
+                         {'field_string': 'default'})
+
+    def test_from_json(self):
+        model = ProjectedContainer.from_json(JSON_DATA, only=['field_integer', 'field_nested.field_datetime'])
+        self.assertEqual(model.field_integer, 7)
+        self.assertIsNone(model.field_id)
+        self.assertEqual(model.field_string, 'default')
+        self.assertEqual(model.field_nested.field_datetime, datetime(2021, 1, 1))
+        self.assertIsNone(model.field_nested.field_string)
+        self.assertIsNone(model.field_nested.field_leaf)
+
+        model = ProjectedContainer.from_json(JSON_DATA, exclude=['field_nested.field_leaf'])
+        self.assertEqual(model.field_list, [1, 2])
+        self.assertIsNone(model.field_nested.field_leaf)
+
+    def test_from_json_skips_excluded_values(self):
+        json_data = dict(JSON_DATA, field_integer='not a number')
+        self.assertRaises(ValidationError, ProjectedContainer.from_json, json_data)
+        model = ProjectedContainer.from_json(json_data, exclude=['field_integer'], deferred_validation=True)
+        model.validate()
+        self.assertEqual(model.field_decimal, 1.5)
+
+    def test_cache(self):
+        schema = ProjectedContainer._schema
+        self.model.to_json(only=['field_integer'])
+        compiled = len(schema._compiled)
+        self.model.to_json(only=['field_integer'])
+        self.model.to_json(only=('field_integer',))
+        self.assertEqual(len(schema._compiled), compiled)
+
+    def test_unknown_paths(self):
+        self.assertRaises(FieldDoesNotExist, self.model.to_json, only=['unknown'])
+        self.assertRaises(FieldDoesNotExist, self.model.to_json, exclude=['field_nested.unknown'])
+        self.assertRaises(FieldDoesNotExist, ProjectedContainer.from_json, JSON_DATA, only=['field_integer.x'])
+
+
+if __name__ == '__main__':
+    unittest.main()
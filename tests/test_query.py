@@ -0,0 +1,119 @@
+__author__ = 'Bohdan Mushkevych'
+
+import unittest
+from datetime import datetime
+
+from odm import document, fields
+from odm.errors import BatchError, FieldDoesNotExist
+
+
+class QueryNested(document.BaseDocument):
+    field_string = fields.StringField(null=True)
+    field_integer = fields.IntegerField(null=True)
+
+
+class QueryContainer(document.BaseDocument):
+    field_id = fields.ObjectIdField(name='_id', null=True)
+    field_integer = fields.IntegerField(null=True)
+    field_decimal = fields.DecimalField(null=True)
+    field_fixed = fields.DecimalField(fixed_point=True, null=True)
+    field_datetime = fields.DateTimeField(null=True)
+    field_boolean = fields.BooleanField(null=True)
+    field_string = fields.StringField(null=True)
+    field_nested = fields.NestedDocumentField(QueryNested, null=True)
+    field_list = fields.ListField(null=True)
+
+
+ROWS = [
+    {'_id': 'a', 'field_integer': 1, 'field_decimal': 1.5, 'field_fixed': 1.25, 'field_boolean': True,
+     'field_datetime': '2021-01-01 10:00:00', 'field_string': 'one', 'field_nested': {'field_string': 'x'}},
+    {'_id': 'b', 'field_integer': 5, 'field_decimal': 2.5, 'field_fixed': 3.5, 'field_boolean': 'no',
+     'field_datetime': '2021-01-01 12:00:00', 'field_nested': {'field_string': 'y', 'field_integer': 7}},
+    {'_id': 'c', 'field_integer': 10, 'field_datetime': '2021-01-02 00:00:00', 'field_string': 'three',
+     'field_list': [1, 2]},
+    {'_id': 'd', 'field_integer': None, 'field_datetime': 'not a datetime', 'unknown': 1},
+]
+
+
+def matching(query):
+    predicate = QueryContainer.compile_query(query)
+    return [row['_id'] for row in ROWS if predicate(row)]
+
+
+class TestQuery(unittest.TestCase):
+    def test_equality(self):
+        self.assertEqual(matching({'field_integer': 5}), ['b'])
+        self.assertEqual(matching({'field_integer': '5'}), ['b'])
+        self.assertEqual(matching({'field_integer': {'$eq': 10}}), ['c'])
+        self.assertEqual(matching({'field_integer': {'$ne': 10}}), ['a', 'b', 'd'])
+        self.assertEqual(matching({'field_integer': None}), ['d'])
+        self.assertEqual(matching({'field_integer': {'$ne': None}}), ['a', 'b', 'c'])
+        self.assertEqual(matching({'field_boolean': False}), ['b'])
+        self.assertEqual(matching({'field_list': [1, 2]}), ['c'])
+
+    def test_membership(self):
+        self.assertEqual(matching({'_id': {'$in': ['a', 'c', 'z']}}), ['a', 'c'])
+        self.assertEqual(matching({'field_string': {'$nin': ['one']}}), ['b', 'c', 'd'])
+        self.assertEqual(matching({'field_string': {'$in': ['one', None]}}), ['a', 'b', 'd'])
+        self.assertEqual(matching({'field_list': {'$in': [[1, 2], [3]]}}), ['c'])
+
+    def test_comparisons(self):
+        self.assertEqual(matching({'field_integer': {'$gt': 1, '$lte': 10}}), ['b', 'c'])
+        self.assertEqual(matching({'field_integer': {'$gte': 1, '$lt': 10}}), ['a', 'b'])
+        self.assertEqual(matching({'field_decimal': {'$gt': 2}}), ['b'])
+        self.assertEqual(matching({'field_fixed': {'$lt': '3.5'}}), ['a'])
+
+    def test_datetime(self):
+        # raw strings are parsed; the unparseable one does not match
+        self.assertEqual(matching({'field_datetime': {'$gte': datetime(2021, 1, 1, 11)}}), ['b', 'c'])
+        self.assertEqual(matching({'field_datetime': {'$lt': '2021-01-01 12:00:00'}}), ['a'])
+
+    def test_exists(self):
+        self.assertEqual(matching({'field_string': {'$exists': True}}), ['a', 'c'])
+        self.assertEqual(matching({'field_string': {'$exists': False}}), ['b', 'd'])
+        self.assertEqual(matching({'field_integer': {'$exists': False}}), ['d'])
+        self.assertEqual(matching({'field_nested': {'$exists': True}}), ['a', 'b'])
+
+    def test_dotted_path(self):
+        self.assertEqual(matching({'field_nested.field_string': 'y'}), ['b'])
+        self.assertEqual(matching({'field_nested.field_integer': {'$gt': 5}}), ['b'])
+        self.assertEqual(matching({'field_nested.field_integer': {'$exists': False}}), ['a', 'c', 'd'])
+
+    def test_conjunction(self):
+        self.assertEqual(matching({'field_integer': {'$gt': 1}, 'field_nested.field_string': {'$exists': True}}),
+                         ['b'])
+        self.assertEqual(matching({}), ['a', 'b', 'c', 'd'])
+
+    def test_malformed(self):
+        self.assertRaises(FieldDoesNotExist, QueryContainer.compile_query, {'unknown': 1})
+        self.assertRaises(FieldDoesNotExist, QueryContainer.compile_query, {'field_nested.unknown': 1})
+        self.assertRaises(FieldDoesNotExist, QueryContainer.compile_query, {'field_string.length': 1})
+        self.assertRaises(ValueError, QueryContainer.compile_query, {'field_integer': {'$regex': 1}})
+        self.assertRaises(ValueError, QueryContainer.compile_query, {'field_integer': {'$gt': None}})
+        self.assertRaises(ValueError, QueryContainer.compile_query, {'field_integer': {'$in': 1}})
+        self.assertRaises(ValueError, QueryContainer.compile_query, {'field_nested': {'$eq': {}}})
+
+    def test_from_json_where(self):
+        documents = QueryContainer.from_json_where(ROWS[:3], {'field_integer': {'$gt': 1}})
+        self.assertEqual([model.field_id for model in documents], ['b', 'c'])
+        self.assertIsInstance(documents[0].field_nested, QueryNested)
+
+        predicate = QueryContainer.compile_query({'field_boolean': True})
+        self.assertEqual(len(QueryContainer.from_json_where(ROWS[:3], predicate)), 1)
+
+    def test_from_json_where_errors(self):
+        rows = [{'_id': 'a', 'field_integer': 1}, {'_id': 'b', 'field_integer': 5, 'field_list': 'not a list'},
+                {'_id': 'c', 'field_integer': 0}, {'_id': 'd', 'field_integer': 7, 'field_list': 'not a list'}]
+        errors = list()
+        documents = QueryContainer.from_json_where(rows, {'field_integer': {'$gt': 0}}, errors=errors)
+        self.assertEqual([model.field_id for model in documents], ['a'])
+        # row indexes refer to the input rows, rather than to the matching ones
+        self.assertEqual([index for index, _ in errors], [1, 3])
+
+        with self.assertRaises(BatchError) as context:
+            QueryContainer.from_json_where(rows, {'field_integer': {'$gt': 0}})
+        self.assertEqual([index for index, _ in context.exception.errors], [1, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+__author__ = 'Bohdan Mushkevych'
+
+import random
+import unittest
+import decimal
+from datetime import datetime, timedelta
+
+from odm import document, fields
+from odm.collection import DocumentCollection, merge_fields
+from odm.indexes import HashIndex, SortedIndex
+
+
+class Event(document.BaseDocument):
+    event_id = fields.IntegerField()
+    source = fields.StringField(null=True)
+    active = fields.BooleanField(null=True)
+    weight = fields.IntegerField(null=True)
+    amount = fields.DecimalField(null=True)
+    timestamp = fields.DateTimeField(null=True)
+    tags = fields.ListField(null=True)
+
+    @classmethod
+    def key_fields(cls):
+        return cls.event_id.name
+
+
+class Price(document.BaseDocument):
+    price_id = fields.IntegerField()
+    price = fields.DecimalField(force_string=True, null=True)
+
+    @classmethod
+    def key_fields(cls):
+        return cls.price_id.name
+
+
+BASE_TIME = datetime(2021, 1, 1)
+
+
+def ids(documents):
+    return sorted(event.event_id for event in documents)
+
+
+class TestSecondaryIndexes(unittest.TestCase):
+    def setUp(self):
+        self.events = DocumentCollection[Event]()
+        self.events.extend(Event(event_id=i, source=f'source_{i % 3}', active=i % 2 == 0, weight=i * 10,
+                                 amount=i / 4, timestamp=BASE_TIME + timedelta(minutes=i)) for i in range(10))
+        self.events.create_index('source')
+        self.events.create_index('active')
+        self.events.create_index('weight')
+        self.events.create_index('amount')
+        self.events.create_index('timestamp')
+
+    def test_index_types(self):
+        self.assertIsInstance(self.events.get_index('source'), HashIndex)
+        self.assertIsInstance(self.events.get_index('active'), HashIndex)
+        self.assertIsInstance(self.events.get_index('weight'), SortedIndex)
+        self.assertIsInstance(self.events.create_index('source', ordered=True), HashIndex)
+        self.assertIsInstance(self.events.create_index('event_id', ordered=True), SortedIndex)
+        self.assertRaises(TypeError, self.events.create_index, 'tags')
+        self.assertRaises(KeyError, self.events.create_index, 'unknown')
+        self.assertRaises(TypeError, self.events.find_range, 'source', 'a', 'b')
+        self.assertRaises(KeyError, self.events.find, 'tags', [])
+
+    def test_find(self):
+        self.assertEqual(ids(self.events.find('source', 'source_1')), [1, 4, 7])
+        self.assertEqual(ids(self.events.find('active', True)), [0, 2, 4, 6, 8])
+        self.assertEqual(ids(self.events.find('weight', 30)), [3])
+        self.assertEqual(self.events.find('source', 'unknown'), [])
+
+    def test_find_range(self):
+        self.assertEqual([event.event_id for event in self.events.find_range('weight', 20, 50)], [2, 3, 4, 5])
+        self.assertEqual(ids(self.events.find_range('weight', 20, 50, include_min=False, include_max=False)),
+                         [3, 4])
+        self.assertEqual(ids(self.events.find_range('weight', min_value=75)), [8, 9])
+        self.assertEqual(ids(self.events.find_range('amount', max_value=0.5)), [0, 1, 2])
+        self.assertEqual(ids(self.events.find_range('timestamp', BASE_TIME + timedelta(minutes=8))), [8, 9])
+
+    def test_maintenance_on_assignment(self):
+        event = self.events[3]
+        event.weight = 1000
+        event.source = 'other'
+        self.assertEqual(ids(self.events.find_range('weight', 500)), [3])
+        self.assertEqual(ids(self.events.find('weight', 30)), [])
+        self.assertEqual(ids(self.events.find('source', 'other')), [3])
+        self.assertEqual(ids(self.events.find('source', 'source_0')), [0, 6, 9])
+
+        del event.weight
+        self.assertEqual(ids(self.events.find('weight', None)), [3])
+        self.assertEqual(len(self.events.find_range('weight')), 9)
+
+        # documents outside of the collection are not indexed
+        Event(event_id=100, weight=1000)
+        self.assertEqual(ids(self.events.find('weight', 1000)), [])
+
+    def test_maintenance_on_collection_changes(self):
+        self.events.delete(1)
+        self.assertEqual(ids(self.events.find('source', 'source_1')), [4, 7])
+
+        replacement = self.events.upsert(Event(event_id=4, source='replacement'))
+        self.assertEqual(ids(self.events.find('source', 'source_1')), [7])
+        self.assertEqual(self.events.find('source', 'replacement'), [replacement])
+
+        self.events.clear()
+        self.assertEqual(self.events.find_range('weight'), [])
+
+    def test_maintenance_on_key_reassignment(self):
+        self.events.merge = merge_fields
+        self.events.create_index('event_id')
+        event = self.events[2]
+        event.event_id = 20
+        self.assertEqual(self.events.find('event_id', 20), [event])
+        self.assertEqual(self.events.find('weight', 20), [event])
+
+        # moved document is merged into the one held under its new key, and leaves the indexes
+        event.event_id = 5
+        self.assertEqual(len(self.events), 9)
+        self.assertEqual(ids(self.events.find('weight', 20)), [5])
+        self.assertEqual(ids(self.events.find('source', 'source_2')), [5, 8])
+        self.assertEqual(ids(self.events.find('event_id', 5)), [5])
+
+    def test_drop_index(self):
+        self.events.drop_index('weight')
+        self.assertIsNone(self.events.get_index('weight'))
+        self.assertNotIn(self.events, Event.weight._observers)
+        self.assertIn(self.events, Event.event_id._observers)
+        self.events[3].weight = 1
+
+    def test_sorted_index_blocks(self):
+        index = SortedIndex(Event.weight)
+        index.BLOCK_SIZE = 4
+        rng = random.Random(7)
+        events = [Event(event_id=i, weight=rng.randrange(20)) for i in range(200)]
+        index.extend(events[:50])
+        for event in events[50:]:
+            index.add(event)
+        for event in events[::3]:
+            self.assertTrue(index.remove(event))
+        self.assertFalse(index.remove(events[0]))
+
+        held = [event for i, event in enumerate(events) if i % 3 != 0]
+        self.assertLessEqual(max(len(block) for block in index._values), 2 * index.BLOCK_SIZE)
+        self.assertEqual([event.weight for event in index.range()], sorted(event.weight for event in held))
+        for weight in range(-1, 21):
+            self.assertEqual(ids(index.find(weight)), ids(event for event in held if event.weight == weight))
+            for include_min in (True, False):
+                for include_max in (True, False):
+                    expected = [event for event in held
+                                if (weight < event.weight or include_min and weight == event.weight)
+                                and (event.weight < weight + 5 or include_max and event.weight == weight + 5)]
+                    self.assertEqual(ids(index.range(weight, weight + 5, include_min, include_max)), ids(expected))
+
+    def test_sorted_index_updates_at_size(self):
+        # insertions into, and deletions from the front of the large index shift a single block only
+        index = SortedIndex(Event.weight)
+        index.extend(Event(event_id=i, weight=i) for i in range(50000))
+        events = [Event(event_id=-i, weight=-i) for i in range(1, 10001)]
+        for event in events:
+            index.add(event)
+        self.assertLessEqual(max(len(block) for block in index._values), 2 * index.BLOCK_SIZE)
+        self.assertEqual(index.range(max_value=-1), events[::-1])
+        for event in events:
+            self.assertTrue(index.remove(event))
+        self.assertEqual(index.find(0)[0].event_id, 0)
+        self.assertEqual(index.range(max_value=-1), [])
+
+    def test_stored_values_and_converted_bounds(self):
+        prices = DocumentCollection[Price]()
+        prices.extend(Price(price_id=i, price=value) for i, value in enumerate(['5', '9.5', '10', '50', '100']))
+        prices.create_index('price')
+
+        # force_string values are indexed as Decimals, rather than as strings in the lexicographic order
+        self.assertEqual([price.price_id for price in prices.find_range('price', '5', '50')], [0, 1, 2, 3])
+        self.assertEqual([price.price_id for price in prices.find_range('price', 9, 60.0)], [1, 2, 3])
+        self.assertEqual([price.price_id for price in prices.find('price', 10)], [2])
+        self.assertEqual([price.price_id for price in prices.find('price', decimal.Decimal('9.50'))], [1])
+
+        self.assertEqual(ids(self.events.find_range('timestamp', '2021-01-01 00:08:00')), [8, 9])
+        self.assertEqual(ids(self.events.find('timestamp', '2021-01-01 00:02:00')), [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+__author__ = 'Bohdan Mushkevych'
+
+import decimal
+import unittest
+from datetime import datetime
+
+from odm import document, fields
+from odm.errors import ValidationError
+
+
+class Point(document.BaseDocument):
+    x = fields.IntegerField()
+    y = fields.IntegerField(null=True)
+
+
+class TypedCollections(document.BaseDocument):
+    track_changes = True
+
+    field_timestamps = fields.ListField(fields.DateTimeField(), null=True)
+    field_points = fields.ListField(fields.NestedDocumentField(Point), null=True)
+    field_prices = fields.DictField(value=fields.DecimalField(min_value=0), null=True)
+    field_tags = fields.ListField(fields.StringField(max_length=3, null=True), null=True)
+    field_untyped = fields.ListField(null=True)
+
+
+class FixedPointCollections(document.BaseDocument):
+    field_list = fields.ListField(fields.DecimalField(fixed_point=True))
+    field_dict = fields.DictField(value=fields.DecimalField(fixed_point=True))
+
+
+class TestTypedCollections(unittest.TestCase):
+    def setUp(self):
+        self.json_data = {
+            'field_timestamps': ['2021-01-01 00:00:00', '2021-01-01 00:00:00', '2021-06-30 12:30:45'],
+            'field_points': [{'x': 1, 'y': 2}, {'x': 3}],
+            'field_prices': {'a': 1.5, 'b': '2.25'},
+            'field_tags': ['abc', None],
+            'field_untyped': ['2021-01-01 00:00:00'],
+        }
+
+    def test_from_json(self):
+        model = TypedCollections.from_json(self.json_data)
+        self.assertEqual(model.field_timestamps[0], datetime(2021, 1, 1))
+        self.assertIs(model.field_timestamps[0], model.field_timestamps[1])
+        self.assertIsInstance(model.field_points[1], Point)
+        self.assertEqual(model.field_points[1].x, 3)
+        self.assertEqual(model.field_prices, {'a': decimal.Decimal('1.50'), 'b': decimal.Decimal('2.25')})
+        self.assertEqual(model.field_untyped, ['2021-01-01 00:00:00'])
+
+    def test_to_json(self):
+        model = TypedCollections.from_json(self.json_data)
+        expected = dict(self.json_data, field_prices={'a': 1.5, 'b': 2.25})
+        self.assertEqual(model.to_json(), expected)
+
+    def test_assignment(self):
+        model = TypedCollections()
+        model.field_timestamps = [datetime(2020, 1, 1), '2021-01-01 00:00:00']
+        self.assertEqual(model.field_timestamps, [datetime(2020, 1, 1), datetime(2021, 1, 1)])
+
+        point = Point(x=5)
+        model.field_points = [point, {'x': 6}]
+        self.assertIs(model.field_points[0], point)
+        self.assertEqual(model.field_points[1].x, 6)
+
+    def test_validation(self):
+        model = TypedCollections()
+        with self.assertRaises(ValidationError) as context:
+            model.field_tags = ['abc', 'abcd']
+        self.assertIn('Element 1', str(context.exception))
+
+        with self.assertRaises(ValidationError):
+            model.field_prices = {'a': -1}
+        with self.assertRaises(ValidationError):
+            model.field_timestamps = [datetime(2020, 1, 1), None]
+        with self.assertRaises(ValidationError):
+            model.field_points = [{'x': 'not a number'}]
+        with self.assertRaises(ValidationError):
+            model.field_timestamps = 'not a list'
+
+    def test_clone(self):
+        model = TypedCollections.from_json(self.json_data)
+        clone = model.clone()
+        clone.field_points[0].x = 10
+        self.assertEqual(model.field_points[0].x, 1)
+
+    def test_delta(self):
+        model = TypedCollections.from_json(self.json_data)
+        self.assertEqual(model.to_json_delta(), {})
+        model.field_points[1].y = 4
+        model.field_prices['c'] = decimal.Decimal('3')
+        self.assertEqual(model.to_json_delta(), {'$set': {
+            'field_points': [{'x': 1, 'y': 2}, {'x': 3, 'y': 4}],
+            'field_prices': {'a': 1.5, 'b': 2.25, 'c': 3.0},
+        }})
+
+    def test_batch(self):
+        models = TypedCollections.from_json_many([self.json_data] * 3)
+        self.assertEqual(TypedCollections.to_json_many(models), [models[0].to_json()] * 3)
+
+    def test_fixed_point_reassignment(self):
+        model = FixedPointCollections(field_list=[1.5, 2.25, 2], field_dict={'a': '0.5'})
+        expected = {'field_list': [1.5, 2.25, 2.0], 'field_dict': {'a': 0.5}}
+        self.assertEqual(model.to_json(), expected)
+
+        model.field_list = model.field_list
+        model.field_dict = model.field_dict
+        self.assertEqual(model.to_json(), expected)
+        self.assertEqual(FixedPointCollections.from_json(expected).to_json(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+__author__ = 'Bohdan Mushkevych'
+
+import copy
+import pickle
+import unittest
+
+from odm import document, fields
+from odm.errors import ValidationError
+
+
+class Leaf(document.BaseDocument):
+    field_string = fields.StringField(default='leaf')
+    field_list = fields.ListField()
+
+
+class Branch(document.BaseDocument):
+    field_leaf = fields.NestedDocumentField(Leaf)
+    field_integer = fields.IntegerField(null=True)
+
+
+class Tree(document.BaseDocument):
+    track_changes = True
+
+    field_branch = fields.NestedDocumentField(Branch)
+    field_explicit = fields.NestedDocumentField(Leaf, default=lambda: Leaf(field_string='explicit'))
+
+
+class CompactTree(document.BaseDocument):
+    __slots__ = ()
+    field_leaf = fields.NestedDocumentField(Leaf)
+
+
+class TestVirtualNestedDefaults(unittest.TestCase):
+    def test_read_does_not_allocate(self):
+        model = Tree()
+        self.assertIsInstance(model.field_branch, Branch)
+        self.assertIsNone(model.field_branch.field_integer)
+        self.assertEqual(model.field_branch.field_leaf.field_string, 'leaf')
+        self.assertNotIn('field_branch', model._data)
+
+    def test_to_json_skips_untouched(self):
+        model = Tree()
+        model.field_branch.validate()
+        self.assertEqual(model.to_json(), {'field_explicit': {'field_list': [], 'field_string': 'explicit'}})
+        self.assertNotIn('field_branch', model._data)
+
+    def test_write_allocates(self):
+        model = Tree()
+        model.field_branch.field_integer = 1
+        self.assertIsInstance(model._data['field_branch'], Branch)
+        self.assertEqual(model.field_branch.field_integer, 1)
+        self.assertEqual(model.to_json()['field_branch'], {'field_integer': 1})
+
+    def test_deep_write(self):
+        model = Tree()
+        model.field_branch.field_leaf.field_string = 'deep'
+        self.assertEqual(model.to_json()['field_branch'], {'field_leaf': {'field_list': [], 'field_string': 'deep'}})
+
+    def test_mutable_read_allocates(self):
+        model = Tree()
+        model.field_branch.field_leaf.field_list.append(1)
+        self.assertEqual(model.field_branch.field_leaf.field_list, [1])
+
+    def test_view_reference(self):
+        model = Tree()
+        branch = model.field_branch
+        branch.field_integer = 1
+        branch['field_integer'] = 2
+        self.assertEqual(model.field_branch.field_integer, 2)
+        self.assertEqual(branch.field_integer, 2)
+
+        del branch.field_integer
+        self.assertIsNone(model.field_branch.field_integer)
+
+    def test_validate(self):
+        model = Tree()
+        model.validate()
+        with self.assertRaises(ValidationError):
+            model.field_branch.field_integer = 'not a number'
+
+    def test_delta(self):
+        model = Tree.from_json({})
+        self.assertEqual(model.to_json_delta(), {})
+        model.field_branch.field_integer = 1
+        self.assertEqual(model.to_json_delta(), {'$set': {'field_branch': {'field_integer': 1}}})
+
+    def test_compact(self):
+        model = CompactTree()
+        self.assertEqual(model.to_json(), {})
+        model.field_leaf.field_string = 'compact'
+        self.assertEqual(model.to_json(), {'field_leaf': {'field_list': [], 'field_string': 'compact'}})
+
+    def test_shared_view(self):
+        model = Tree()
+        self.assertIs(model.field_branch, model.field_branch)
+        self.assertEqual(model.field_branch, model.field_branch)
+
+        first, second = model.field_branch, model.field_branch
+        first.field_integer = 1
+        second.field_leaf.field_string = 'second'
+        self.assertEqual(model.to_json()['field_branch'],
+                         {'field_integer': 1, 'field_leaf': {'field_list': [], 'field_string': 'second'}})
+
+    def test_assigned_meanwhile(self):
+        model = Tree()
+        view = model.field_branch
+        assigned = Branch(field_integer=5)
+        model.field_branch = assigned
+        view.field_leaf.field_string = 'view'
+
+        self.assertIs(model.field_branch, assigned)
+        self.assertEqual(assigned.field_integer, 5)
+        self.assertEqual(assigned.field_leaf.field_string, 'view')
+        self.assertEqual(view, assigned)
+
+    def test_pickle_and_copy(self):
+        model = Tree()
+        view = model.field_branch
+        for value in (pickle.loads(pickle.dumps(view)), copy.copy(view), copy.deepcopy(view)):
+            self.assertIs(type(value), Branch)
+            self.assertIsNone(value.field_integer)
+
+        view.field_integer = 1
+        restored = pickle.loads(pickle.dumps(view))
+        self.assertIs(type(restored), Branch)
+        self.assertEqual(restored.field_integer, 1)
+        self.assertEqual(pickle.loads(pickle.dumps(model)).to_json(), model.to_json())
+
+    def test_clone(self):
+        model = Tree()
+        clone = model.field_branch.clone()
+        self.assertIs(type(clone), Branch)
+        clone.field_integer = 1
+        self.assertNotIn('field_branch', model._data)
+
+        model.field_branch.field_integer = 2
+        clone = model.field_branch.clone()
+        clone.field_integer = 3
+        self.assertEqual(model.field_branch.field_integer, 2)
+
+    def test_materialized_state(self):
+        model = Tree.from_json({})
+        view = model.field_branch
+        view.field_integer = 1
+        self.assertIs(view._data, model.field_branch._data)
+
+        view.mark_clean()
+        self.assertIs(view._changes, model.field_branch._changes)
+        view.field_integer = 2
+        self.assertIn('field_integer', model.field_branch._changes)
+
+
+if __name__ == '__main__':
+    unittest.main()